@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+""" 호가를 받을 때마다 실행되는 함수들의 호출 한 번당 시간을 재고 저장된 기준값과 비교함 -> 기준값보다 threshold 이상 느려진 함수가 있으면 종료 코드 1
+    네트워크, 지갑, MySQL에 연결하지 않고 고정된 설정값과 가짜 호가로 재므로 커밋끼리 같은 조건으로 비교할 수 있음
+    기준값은 컴퓨터마다 다르므로 커밋하지 않음 -> 비교할 컴퓨터에서 바꾸기 전 커밋으로 --save를 실행해서 만들고, 잰 환경(파이썬, CPU, 코인 수 등)도 같이 저장해서 비교할 때 다르면 알려줌
+    ex) python benchmark.py --save (기준값 저장), python benchmark.py (비교), python benchmark.py --coins 100 --filter websocket """
+
+import argparse
+import configparser
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import message_decoder
+import upbit_machine
+import upbit_machine_with_websocket
+import vector_scanner
+from vector_scanner import VectorScanner
+from message_decoder import OrderbookDecoder
+from orderbook_store import OrderbookStore
+from price_history import PriceHistory
+from load_generator import FeedGenerator, get_coin_names
+
+BASELINE_FILE = "benchmark_baseline.json"  # 기준값을 저장하는 파일 -> 잰 컴퓨터에서만 의미가 있으므로 커밋하지 않음 (.gitignore)
+DEFAULT_THRESHOLD = 0.25  # 기준값보다 몇 배 더 걸리면 느려졌다고 볼지 (0.25 = 25%)
+ACCESS_KEY = "benchmark-access-key"
+SECRET_KEY = "benchmark-secret-key"
+QUERY_PARAMS = "market=KRW-C000&side=bid&volume=10.0&price=1000&ord_type=limit"  # 주문 한 번의 JWT 서명에 들어가는 쿼리
+
+# 측정에 사용할 MACHINE 설정값 -> config.ini가 바뀌어도 측정 결과가 바뀌지 않도록 고정함
+MACHINE_CONFIG = {
+    "profit": "1.003",
+    "how_many_coins": "50",
+    "maximum_by_bitcoin": "0.01",
+    "minimum_by_bitcoin": "0.0005",
+    "trade_if_rising": "0",
+    "trade_if_low_orderbook_difference": "1",
+    "orderbook_difference_rate": "1.01",
+    "orderbook_check_interval": "3",
+    "stale_market_seconds": "0",
+    "record_orderbook": "0",
+}
+
+
+""" 짝수 번째 코인은 2번 사이클로 수익이 나고, 홀수 번째 코인은 수익이 나지 않는 호가를 저장소에 씀 -> 수익 계산이 거래 직전까지 모두 실행되도록 함 """
+def fill_store(store, seed=0):
+    generator = random.Random(seed)
+    now = time.time()
+    store.update(store.market_id, 10010000.0, 1.0, 10000000.0, 1.0, shift_previous=False, updated_at=now)
+    for coin_num in range(0, store.coin_count):
+        krw_ask = 990.0 if coin_num % 2 == 0 else 1001.0
+        store.update(coin_num, krw_ask, generator.uniform(50, 150), krw_ask - 1, generator.uniform(50, 150), shift_previous=False, updated_at=now)
+        store.update(store.coin_count + coin_num, 0.0001001, generator.uniform(50, 150), 0.0001, generator.uniform(50, 150), shift_previous=False, updated_at=now)
+
+
+""" REST 버전의 봇 -> __init__은 지갑과 MySQL에 연결하므로 부르지 않고 호가 계산에 필요한 상태만 만듦 """
+def make_rest_machine(coin_count):
+    machine = upbit_machine.UpbitMachine.__new__(upbit_machine.UpbitMachine)
+    machine.access_key = ACCESS_KEY
+    machine.secret_key = SECRET_KEY
+    machine.ALL_COIN = get_coin_names(coin_count)  # 클래스의 ALL_COIN 목록은 바꾸지 않음
+    machine.orderbook_check_interval = int(MACHINE_CONFIG["orderbook_check_interval"])
+    machine.markets_str = machine.get_markets_str()
+    machine.orderbook_store = OrderbookStore.for_coins(machine.ALL_COIN)
+    machine.orderbook_units = [[] for _ in range(0, len(machine.orderbook_store))]
+    machine.price_history = PriceHistory(len(machine.orderbook_store), capacity=max(machine.orderbook_check_interval, machine.price_history_size))
+    fill_store(machine.orderbook_store)
+    return machine
+
+
+""" 웹 소켓 버전의 봇 -> 리플레이처럼 MACHINE 설정값만 불러오고, 거래를 시작하는 대신 아무것도 하지 않음 """
+def make_websocket_machine(coin_count, vectorized_scan=0):
+    config = configparser.ConfigParser()
+    config.read_dict({"MACHINE": dict(MACHINE_CONFIG, vectorized_scan=str(vectorized_scan))})
+    machine = upbit_machine_with_websocket.UpbitMachine.__new__(upbit_machine_with_websocket.UpbitMachine)
+    machine.access_key = ACCESS_KEY
+    machine.secret_key = SECRET_KEY
+    machine.load_machine_config(config)
+    machine.init_feed_state()
+    machine.feed_connected.set()
+    machine.trade_coin_list = get_coin_names(coin_count)
+    machine.trade_coin_str = machine.get_trade_coin_str()
+    if vectorized_scan == 1:
+        machine.vector_scanner = VectorScanner(machine.orderbook_store)
+    machine.start_trade = lambda *args, **kwargs: None
+    fill_store(machine.orderbook_store)
+    return machine
+
+
+""" REST orderbook 응답 본문 -> 마켓마다 15단계 호가 """
+def get_rest_orderbook_content(codes, seed=0):
+    generator = random.Random(seed)
+    orderbook = []
+    for code in codes:
+        price = 10000000.0 if code == "KRW-BTC" else 1000.0 if code.startswith("KRW-") else 0.0001
+        units = [{"ask_price": price * (1 + 0.001 * (level + 1)), "bid_price": price * (1 - 0.001 * level),
+                  "ask_size": generator.uniform(0.1, 10), "bid_size": generator.uniform(0.1, 10)} for level in range(0, 15)]
+        orderbook.append({"market": code, "timestamp": 1560000000000, "total_ask_size": 100.0, "total_bid_size": 100.0, "orderbook_units": units})
+    return json.dumps(orderbook).encode("utf-8")
+
+
+""" 아래 함수들은 측정할 준비를 하고 (인자 없이 호출할 함수, 한 번 측정할 때 호출할 횟수)를 반환함 """
+
+def bench_rest_calc_profit_of_cycle(coin_count):
+    machine = make_rest_machine(coin_count)
+    coin_nums = itertools.cycle(range(0, coin_count))
+    return lambda: machine.calc_profit_of_cycle(next(coin_nums), 2), 10000
+
+
+def bench_rest_get_optimal_volume(coin_count):
+    machine = make_rest_machine(coin_count)
+    coin_nums = itertools.cycle(range(0, coin_count))
+    return lambda: machine.get_optimal_volume(i=next(coin_nums), num=2), 10000
+
+
+def bench_rest_get_correct_krw_price(coin_count):
+    prices = itertools.cycle([3.456, 45.67, 456.7, 4567.0, 45678.0, 456789.0, 876543.0, 1234567.0, 12345678.0])  # 모든 가격 단위 구간
+    return lambda: upbit_machine.UpbitMachine.get_correct_krw_price(next(prices)), 10000
+
+
+def bench_rest_get_coin_orderbook(coin_count):
+    machine = make_rest_machine(coin_count)
+    content = get_rest_orderbook_content(machine.orderbook_store.codes[0:coin_count * 2])
+    machine.get_orderbook = lambda markets: message_decoder.decode(content)  # 응답 본문을 파싱하는 것부터 잼
+    return machine.get_coin_orderbook, 10
+
+
+def bench_rest_jwt_sign(coin_count):
+    machine = make_rest_machine(coin_count)
+    return lambda: machine.get_authorization_header(QUERY_PARAMS), 1000
+
+
+def bench_websocket_calculate_profit_of_cycle(coin_count):
+    machine = make_websocket_machine(coin_count)
+    coin_nums = itertools.cycle(range(0, coin_count))
+    return lambda: machine.calculate_profit_of_cycle(next(coin_nums), 2), 10000
+
+
+def bench_websocket_get_optimal_volume(coin_count):
+    machine = make_websocket_machine(coin_count)
+    coin_nums = itertools.cycle(range(0, coin_count))
+    return lambda: machine.get_optimal_volume(next(coin_nums), 2), 10000
+
+
+def bench_websocket_get_correct_krw_price(coin_count):
+    prices = itertools.cycle([3.456, 45.67, 456.7, 4567.0, 45678.0, 456789.0, 876543.0, 1234567.0, 12345678.0])
+    return lambda: upbit_machine_with_websocket.UpbitMachine.get_correct_krw_price(next(prices)), 10000
+
+
+""" get_orderbook_with_websocket에서 메시지 하나를 받은 뒤의 처리 (디코딩 + apply_orderbook) """
+def bench_websocket_handle_message(coin_count):
+    machine = make_websocket_machine(coin_count)
+    generator = FeedGenerator(coin_count, 0, 0)
+    frames = itertools.cycle([generator.get_message(code, "REALTIME") for code in ["KRW-BTC"] + machine.subscription_codes])
+    decoder = OrderbookDecoder(machine.orderbook_depth)
+
+    def handle_message():
+        if decoder.decode(next(frames)):
+            machine.apply_orderbook(decoder)
+    return handle_message, 1000
+
+
+def bench_websocket_jwt_sign(coin_count):
+    machine = make_websocket_machine(coin_count)
+    return lambda: machine.get_authorization_header(QUERY_PARAMS), 1000
+
+
+""" calculate_profit에서 KRW-BTC가 바뀌어 모든 코인을 다시 계산하는 경우 """
+def bench_websocket_evaluate_all_coins(coin_count):
+    machine = make_websocket_machine(coin_count)
+    return lambda: machine.evaluate_coins(True, set()), 100
+
+
+def bench_websocket_scan_all_coins(coin_count):
+    if not vector_scanner.is_available():
+        return None
+    machine = make_websocket_machine(coin_count, vectorized_scan=1)
+    return lambda: machine.evaluate_coins(True, set()), 100
+
+
+# 측정 이름 -> 준비 함수
+BENCHMARKS = {
+    "rest.calc_profit_of_cycle": bench_rest_calc_profit_of_cycle,
+    "rest.get_optimal_volume": bench_rest_get_optimal_volume,
+    "rest.get_correct_krw_price": bench_rest_get_correct_krw_price,
+    "rest.get_coin_orderbook": bench_rest_get_coin_orderbook,
+    "rest.jwt_sign": bench_rest_jwt_sign,
+    "websocket.calculate_profit_of_cycle": bench_websocket_calculate_profit_of_cycle,
+    "websocket.get_optimal_volume": bench_websocket_get_optimal_volume,
+    "websocket.get_correct_krw_price": bench_websocket_get_correct_krw_price,
+    "websocket.handle_message": bench_websocket_handle_message,
+    "websocket.jwt_sign": bench_websocket_jwt_sign,
+    "websocket.evaluate_all_coins": bench_websocket_evaluate_all_coins,
+    "websocket.scan_all_coins": bench_websocket_scan_all_coins,
+}
+
+
+""" number번 호출하는 것을 repeat번 반복해서 가장 빠른 경우의 호출 한 번당 시간 (ns) -> 다른 프로세스나 GC 때문에 느려진 측정은 버림 """
+def measure(function, number, repeat=5):
+    function()  # 처음 호출할 때만 생기는 비용은 빼고 잼
+    best = None
+    for _ in range(0, repeat):
+        started_at = time.perf_counter_ns()
+        for _ in range(0, number):
+            function()
+        elapsed = (time.perf_counter_ns() - started_at) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+""" {측정 이름: 호출 한 번당 시간 (ns)} -> name_filter가 이름에 들어있는 측정만 실행함 """
+def run_benchmarks(coin_count, name_filter="", repeat=5):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if name_filter not in name:
+            continue
+        prepared = setup(coin_count)
+        if prepared is None:  # numpy가 없는 경우 등
+            continue
+        function, number = prepared
+        results[name] = measure(function, number, repeat)
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def get_environment(coin_count):
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(), "coins": coin_count}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+""" 측정 결과를 기준값으로 저장함 -> 저장된 측정별 threshold는 그대로 유지함 """
+def save_baseline(path, results, coin_count):
+    previous = load_baseline(path) or {}
+    baseline = {"commit": get_commit(), "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"), "environment": get_environment(coin_count),
+                "thresholds": previous.get("thresholds", {}), "results": {name: round(value, 1) for name, value in results.items()}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+""" 기준값과 비교해서 [(측정 이름, 기준값, 측정값, 변화율, 느려졌으면 True), ...]를 반환함 -> 기준값이 없는 측정은 기준값 None """
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    rows = []
+    for name, value in results.items():
+        base = baseline["results"].get(name)
+        if base is None or base <= 0:
+            rows.append((name, None, value, 0.0, False))
+            continue
+        change = value / base - 1
+        rows.append((name, base, value, change, change > baseline.get("thresholds", {}).get(name, threshold)))
+    return rows
+
+
+def print_rows(rows):
+    print("측정\t기준값(ns)\t측정값(ns)\t변화\t결과")
+    for name, base, value, change, regressed in rows:
+        if base is None:
+            print(name + "\t-\t" + "{:.1f}".format(value) + "\t-\t기준값 없음")
+        else:
+            print(name + "\t" + "{:.1f}".format(base) + "\t" + "{:.1f}".format(value) + "\t" + "{:+.1%}".format(change) + "\t" + ("느려짐" if regressed else "통과"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="호가 처리 함수들의 호출 한 번당 시간을 재고 기준값과 비교함")
+    parser.add_argument("--coins", type=int, default=50, help="가짜 코인 수 (모든 코인을 계산하는 측정에 사용)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="기준값 파일")
+    parser.add_argument("--save", action="store_true", help="측정 결과를 기준값으로 저장함")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="기준값 파일에 측정별 값이 없을 때 사용할 허용 변화율")
+    parser.add_argument("--filter", default="", help="이름에 이 문자열이 들어있는 측정만 실행함")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.coins, args.filter, args.repeat)
+    if args.save:
+        save_baseline(args.baseline, results, args.coins)
+        print_rows([(name, None, value, 0.0, False) for name, value in results.items()])
+        print(args.baseline + "에 기준값을 저장했습니다.")
+        return
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print_rows([(name, None, value, 0.0, False) for name, value in results.items()])
+        print(args.baseline + " 파일이 없습니다. --save로 기준값을 먼저 저장하세요.")
+        return
+    if baseline.get("environment") != get_environment(args.coins):
+        print("기준값을 잰 환경이 다릅니다. " + str(baseline.get("environment")) + " -> " + str(get_environment(args.coins)))
+    rows = compare(results, baseline, args.threshold)
+    print_rows(rows)
+    if any(regressed for _, _, _, _, regressed in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import math
+
+INFINITY = float("inf")
+
+
+class CycleEngine:
+    """ 모든 마켓으로 화폐 그래프를 만들고, 3단계(선택하면 4단계) 사이클의 수익률을 -log(가격) 간선 가중치의 합으로 계산함
+        호가가 바뀌면 그 마켓의 간선이 포함된 사이클만 다시 계산함 """
+
+    # 기준 화폐별 거래 수수료
+    FEE = {"KRW": 0.0005, "BTC": 0.0025, "USDT": 0.0025}
+
+    def __init__(self, market_codes, max_length=3, profit=1.0):
+        self.max_length = max_length  # 사이클 최대 단계 수 (3 또는 4)
+        self.profit = profit  # 이 수익률 이상인 사이클을 거래 가능한 사이클로 봄
+        self.currencies = []  # 화폐 번호 -> 화폐 이름
+        self.currency_index = {}  # 화폐 이름 -> 화폐 번호
+        self.adjacency = []  # 화폐 번호 -> [(간선 번호, 도착 화폐 번호), ...]
+
+        # 간선 i : edge_from[i] 화폐로 edge_to[i] 화폐를 사는 거래 (edge_market[i] 시장에서 edge_side[i] 주문)
+        self.edge_from = []
+        self.edge_to = []
+        self.edge_market = []
+        self.edge_side = []
+        self.edge_weight = []  # -log(교환 비율), 호가가 없으면 무한대
+        self.market_edges = {}  # 마켓 코드 -> (매수 간선 번호, 매도 간선 번호)
+
+        self.cycles = []  # 사이클 번호 -> 간선 번호 튜플
+        self.cycle_weight = []  # 사이클 번호 -> 간선 가중치의 합
+        self.edge_cycles = []  # 간선 번호 -> 그 간선을 포함하는 사이클 번호 목록
+        self.profitable = set()  # 현재 수익을 낼 수 있는 사이클 번호
+
+        for code in market_codes:
+            self.add_market(code)
+        self.find_cycles()
+
+    def get_currency(self, name):
+        if name not in self.currency_index:
+            self.currency_index[name] = len(self.currencies)
+            self.currencies.append(name)
+            self.adjacency.append([])
+        return self.currency_index[name]
+
+    def add_edge(self, code, side, from_currency, to_currency):
+        edge = len(self.edge_from)
+        self.edge_from.append(from_currency)
+        self.edge_to.append(to_currency)
+        self.edge_market.append(code)
+        self.edge_side.append(side)
+        self.edge_weight.append(INFINITY)
+        self.edge_cycles.append([])
+        self.adjacency[from_currency].append((edge, to_currency))
+        return edge
+
+    """ 마켓 하나로 간선 두 개를 만듦 -> 기준 화폐로 코인을 사는 간선(bid), 코인을 팔아 기준 화폐를 얻는 간선(ask) """
+    def add_market(self, code):
+        if code in self.market_edges:
+            return
+        quote, base = code.split("-", 1)
+        quote_currency = self.get_currency(quote)
+        base_currency = self.get_currency(base)
+        bid_edge = self.add_edge(code, "bid", quote_currency, base_currency)
+        ask_edge = self.add_edge(code, "ask", base_currency, quote_currency)
+        self.market_edges[code] = (bid_edge, ask_edge)
+
+    """ 길이가 max_length 이하인 모든 사이클을 찾음 -> 같은 사이클을 시작점만 바꿔서 중복으로 세지 않도록 사이클에서 가장 작은 번호의 화폐에서만 시작함 """
+    def find_cycles(self):
+        for start in range(0, len(self.currencies)):
+            self.search_cycles(start, start, [], [start])
+        for cycle_num in range(0, len(self.cycles)):
+            for edge in self.cycles[cycle_num]:
+                self.edge_cycles[edge].append(cycle_num)
+        self.cycle_weight = [INFINITY] * len(self.cycles)
+
+    def search_cycles(self, start, current, edges, visited):
+        for edge, to_currency in self.adjacency[current]:
+            if to_currency == start:
+                if len(edges) + 1 >= 3:
+                    self.cycles.append(tuple(edges + [edge]))
+            elif to_currency > start and to_currency not in visited and len(edges) + 1 < self.max_length:
+                self.search_cycles(start, to_currency, edges + [edge], visited + [to_currency])
+
+    """ 마켓의 최우선 매도, 매수 호가가 바뀌었을 때 호출함 -> 이번 갱신으로 새로 수익을 낼 수 있게 된 사이클 번호 목록을 반환함 """
+    def update_market(self, code, ask_price, bid_price):
+        edges = self.market_edges.get(code)
+        if edges is None:
+            return []
+        fee = self.FEE.get(code.split("-", 1)[0], 0.0025)
+        bid_edge, ask_edge = edges
+        self.edge_weight[bid_edge] = -math.log((1 - fee) / ask_price) if ask_price > 0 else INFINITY  # 매도 호가에 삼
+        self.edge_weight[ask_edge] = -math.log(bid_price * (1 - fee)) if bid_price > 0 else INFINITY  # 매수 호가에 팖
+
+        threshold = -math.log(self.profit)
+        new_cycles = []
+        for edge in edges:
+            for cycle_num in self.edge_cycles[edge]:
+                weight = 0.0
+                for cycle_edge in self.cycles[cycle_num]:
+                    weight = weight + self.edge_weight[cycle_edge]
+                self.cycle_weight[cycle_num] = weight
+                if weight <= threshold:
+                    if cycle_num not in self.profitable:
+                        self.profitable.add(cycle_num)
+                        new_cycles.append(cycle_num)
+                else:
+                    self.profitable.discard(cycle_num)
+        return new_cycles
+
+    def get_cycle_profit(self, cycle_num):
+        weight = self.cycle_weight[cycle_num]
+        return math.exp(-weight) if weight != INFINITY else 0.0
+
+    """ 사이클의 각 단계를 [(마켓 코드, 주문 종류), ...] 형태로 반환함, ex) [("KRW-XRP", "bid"), ("BTC-XRP", "ask"), ("KRW-BTC", "ask")] """
+    def get_cycle_orders(self, cycle_num):
+        return [(self.edge_market[edge], self.edge_side[edge]) for edge in self.cycles[cycle_num]]
+
+    """ 사이클을 사람이 읽기 쉬운 문자열로 만듦, ex) "KRW -> XRP -> BTC -> KRW" """
+    def get_cycle_str(self, cycle_num):
+        edges = self.cycles[cycle_num]
+        names = [self.currencies[self.edge_from[edge]] for edge in edges]
+        names.append(self.currencies[self.edge_to[edges[-1]]])
+        return " -> ".join(names)
+
+    """ 현재 수익을 낼 수 있는 사이클을 수익률이 높은 순으로 [(수익률, 사이클 번호), ...] 형태로 반환함 """
+    def get_best_cycles(self, count=10):
+        best = sorted(((self.get_cycle_profit(cycle_num), cycle_num) for cycle_num in self.profitable), reverse=True)
+        return best[0:count]
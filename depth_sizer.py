@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+""" 호가 여러 단계를 따라 내려가면서 세 번의 거래를 모두 체결했을 때의 평균 체결가(VWAP) 기준 수익률을 계산하고,
+    목표 수익률을 넘는 가장 큰 주문 개수를 찾음
+    units는 REST orderbook의 orderbook_units, ex) [{"ask_price": 1.0, "ask_size": 2.0, "bid_price": 0.9, "bid_size": 3.0}, ...] """
+
+FEE = 0.996502749375  # 세 번의 거래 수수료를 모두 뺀 비율
+SEARCH_ITERATIONS = 30  # 이진 탐색 횟수 -> 최대 개수의 1 / 2^30 까지 정확함
+EPSILON = 1e-12  # 남은 개수가 이 비율보다 작으면 모두 체결된 것으로 봄 (부동소수점 오차)
+
+
+""" 매도 호가를 따라 코인을 quantity개 살 때 드는 금액과 가장 나쁜 가격 -> 호가가 모자라면 None """
+def buy_quantity(units, quantity):
+    cost = 0.0
+    remain = quantity
+    for unit in units:
+        size = min(remain, unit["ask_size"])
+        cost = cost + size * unit["ask_price"]
+        remain = remain - size
+        if remain <= quantity * EPSILON:
+            return cost, unit["ask_price"]
+    return None
+
+
+""" 매수 호가를 따라 코인을 quantity개 팔 때 받는 금액과 가장 나쁜 가격 -> 호가가 모자라면 None """
+def sell_quantity(units, quantity):
+    proceeds = 0.0
+    remain = quantity
+    for unit in units:
+        size = min(remain, unit["bid_size"])
+        proceeds = proceeds + size * unit["bid_price"]
+        remain = remain - size
+        if remain <= quantity * EPSILON:
+            return proceeds, unit["bid_price"]
+    return None
+
+
+""" 매도 호가를 따라 amount만큼의 금액으로 살 수 있는 코인 개수와 가장 나쁜 가격 -> 호가가 모자라면 None """
+def buy_with_amount(units, amount):
+    quantity = 0.0
+    remain = amount
+    for unit in units:
+        spend = min(remain, unit["ask_size"] * unit["ask_price"])
+        quantity = quantity + spend / unit["ask_price"]
+        remain = remain - spend
+        if remain <= amount * EPSILON:
+            return quantity, unit["ask_price"]
+    return None
+
+
+""" 첫 번째 시장에서 코인을 quantity개 사서 두 번째 시장에 팔고, 받은 돈으로 KRW-BTC 거래를 했을 때의 결과
+    -> (수익률, 첫 번째 거래에 쓴 금액, 각 거래의 가장 나쁜 가격 [첫 번째, 두 번째, 세 번째]), 호가가 모자라면 None
+    1번 사이클 : BTC 시장에서 사서 KRW 시장에 판매하고 KRW로 BTC를 삼, 2번 사이클 : KRW 시장에서 사서 BTC 시장에 판매하고 BTC를 KRW로 팖 """
+def get_cycle_result(cycle_num, first_units, second_units, market_units, quantity):
+    first = buy_quantity(first_units, quantity)
+    second = sell_quantity(second_units, quantity)
+    if first is None or second is None:
+        return None
+    if cycle_num == 1:
+        third = buy_with_amount(market_units, second[0])
+    else:
+        third = sell_quantity(market_units, second[0])
+    if third is None:
+        return None
+    return third[0] / first[0] * FEE, first[0], [first[1], second[1], third[1]]
+
+
+""" VWAP 수익률이 profit 이상인 가장 큰 코인 개수를 찾음 -> 많이 살수록 평균 체결가가 나빠지므로 수익률은 개수에 대해 감소함
+    (코인 개수, 수익률, 첫 번째 거래에 쓴 금액, 각 거래의 가장 나쁜 가격)을 반환하고, 최우선 호가에서도 수익이 안 나면 None """
+def find_max_volume(cycle_num, first_units, second_units, market_units, profit):
+    if len(first_units) == 0 or len(second_units) == 0 or len(market_units) == 0:
+        return None
+    max_quantity = min(sum(unit["ask_size"] for unit in first_units), sum(unit["bid_size"] for unit in second_units))
+    if max_quantity <= 0:
+        return None
+    best = None
+    low = 0.0
+    high = max_quantity
+    result = get_cycle_result(cycle_num, first_units, second_units, market_units, high)
+    if result is not None and result[0] >= profit:
+        return (high,) + result
+    for _ in range(0, SEARCH_ITERATIONS):
+        middle = (low + high) / 2
+        result = get_cycle_result(cycle_num, first_units, second_units, market_units, middle)
+        if result is not None and result[0] >= profit:
+            best = (middle,) + result
+            low = middle
+        else:
+            high = middle
+    return best
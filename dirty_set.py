@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from threading import Condition
+
+
+class DirtySet:
+    """ 호가가 바뀐 코인을 모아두고 수익 계산 스레드를 바로 깨움 -> 같은 코인이 여러 번 바뀌어도 한 번만 계산하도록 합쳐둠 """
+
+    def __init__(self):
+        self.condition = Condition()
+        self.keys = set()  # 다시 계산해야 하는 코인 이름
+        self.all = False  # True면 모든 코인을 다시 계산해야 함 (ex. KRW-BTC 호가가 바뀐 경우)
+
+    def mark(self, key):
+        with self.condition:
+            if not self.all:
+                self.keys.add(key)
+            self.condition.notify()
+
+    def mark_all(self):
+        with self.condition:
+            self.all = True
+            self.keys.clear()
+            self.condition.notify()
+
+    """ 바뀐 코인 없이 기다리는 스레드만 깨움 """
+    def wake(self):
+        with self.condition:
+            self.condition.notify()
+
+    """ 바뀐 코인이 생기거나 깨울 때까지 최대 timeout초 기다렸다가 (모든 코인인지, 코인 이름 집합)을 꺼내고 비움 -> 바뀐 코인이 없으면 (False, 빈 집합) """
+    def wait(self, timeout=None):
+        with self.condition:
+            if not self.all and len(self.keys) == 0:
+                self.condition.wait(timeout)
+            all_keys, keys = self.all, self.keys
+            self.all = False
+            self.keys = set()
+            return all_keys, keys
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+""" 업비트 대신 사용할 수 있는 로컬 거래소 -> 봇이 사용하는 REST API와 crix 웹 소켓 호가를 같은 형식으로 제공하고, 주문은 matching_engine으로 체결함
+    config.ini의 api_url을 http://127.0.0.1:8080/v1/, websocket_url을 ws://127.0.0.1:8080/websocket 으로 바꾸면 실제 돈 없이 거래 사이클 전체를 실행할 수 있음
+    ex) python exchange_simulator.py --port 8080 --coins ETH,XRP,EOS --latency 0.02 """
+
+import argparse
+import asyncio
+import configparser
+import json
+import random
+import time
+import jwt
+from aiohttp import web, WSMsgType
+from matching_engine import MatchingEngine, ExchangeError
+from rate_limiter import RateLimiter
+
+DEFAULT_COINS = {"ETH": 300000.0, "XRP": 300.0, "EOS": 4000.0, "ADA": 60.0, "TRX": 25.0}  # 코인 이름 -> 원화 기준 시작 가격
+BTC_PRICE = 10000000.0  # KRW-BTC 시작 가격
+
+
+""" 업비트 원화 마켓 호가 단위 """
+def get_krw_tick(price):
+    if price < 10:
+        return 0.01
+    elif price < 100:
+        return 0.1
+    elif price < 1000:
+        return 1
+    elif price < 10000:
+        return 5
+    elif price < 100000:
+        return 10
+    elif price < 500000:
+        return 50
+    elif price < 1000000:
+        return 100
+    elif price < 2000000:
+        return 500
+    return 1000
+
+
+def get_tick(market, price):
+    return get_krw_tick(price) if market.startswith("KRW-") else 0.00000001
+
+
+class ExchangeSimulator:
+    """ 거래소 하나 -> 코인마다 원화 가치를 무작위로 움직이고, KRW, BTC 마켓 호가를 각각 조금씩 어긋나게 만들어서 가끔 차익 거래 기회가 생기게 함 """
+
+    def __init__(self, access_key, secret_key, coins=None, balances=None, depth=15, tick_interval=0.2, volatility=0.0005, mispricing=0.002,
+                 latency=0.0, seed=0):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.coins = dict(coins or DEFAULT_COINS)  # 코인 이름 -> 원화 가치
+        self.btc_price = BTC_PRICE
+        self.depth = depth  # 만들어줄 호가 단계 수
+        self.tick_interval = tick_interval  # 호가를 바꾸는 간격 (초)
+        self.volatility = volatility  # 한 번에 움직이는 가치의 표준편차 (비율)
+        self.mispricing = mispricing  # KRW, BTC 마켓 호가가 가치에서 어긋나는 정도의 표준편차 (비율)
+        self.latency = latency  # REST 요청마다 추가로 기다리는 시간 (초)
+        self.random = random.Random(seed)
+        self.engine = MatchingEngine(balances or {"KRW": 10000000.0, "BTC": 0.1})
+        self.engine.listeners.append(self.on_book_changed)
+        self.markets = ["KRW-BTC"] + ["KRW-" + coin for coin in self.coins] + ["BTC-" + coin for coin in self.coins]
+        self.acc_trade_price = {market: self.random.uniform(1e8, 1e10) for market in self.markets}  # candles에서 돌려줄 거래 대금
+        self.request_counts = {}  # 요청 그룹 -> [초, 이번 초에 받은 요청 수]
+        self.used_nonces = set()
+        self.clients = []  # [(웹 소켓, 구독한 마켓 코드 집합, 호가 단계 수), ...]
+        for market in self.markets:
+            self.engine.set_market_levels(market, self.make_levels(market))
+
+    """ 업비트와 같은 경로로 REST API와 웹 소켓을 제공하는 aiohttp 앱 """
+    def make_app(self):
+        app = web.Application(middlewares=[self.api_middleware])
+        app.router.add_get("/v1/market/all", self.get_market_all)
+        app.router.add_get("/v1/accounts", self.get_accounts)
+        app.router.add_get("/v1/orders", self.get_orders)
+        app.router.add_post("/v1/orders", self.post_orders)
+        app.router.add_get("/v1/order", self.get_order)
+        app.router.add_delete("/v1/order", self.delete_order)
+        app.router.add_get("/v1/orderbook", self.get_orderbook)
+        app.router.add_get("/v1/ticker", self.get_ticker)
+        app.router.add_get("/v1/candles/minutes/{unit}", self.get_candles)
+        app.router.add_get("/websocket", self.websocket_handler)
+        app.on_startup.append(self.start_price_driver)
+        return app
+
+    """ 가치 하나를 기준으로 호가 depth단계를 만듦 -> [(매도 호가, 매도 잔량, 매수 호가, 매수 잔량), ...] """
+    def make_levels(self, market):
+        if market == "KRW-BTC":
+            value = self.btc_price
+        else:
+            quote, coin = market.split("-")
+            value = self.coins[coin] if quote == "KRW" else self.coins[coin] / self.btc_price
+            value = value * (1 + self.random.gauss(0, self.mispricing))
+        tick = get_tick(market, value)
+        bid_price = max(round(value / tick) * tick, tick)
+        levels = []
+        for level in range(0, self.depth):
+            ask = round(bid_price + tick * (level + 1), 8)
+            bid = round(max(bid_price - tick * level, tick), 8)
+            size = self.random.uniform(0.0005, 0.01) * BTC_PRICE / (value if market.startswith("KRW-") else value * self.btc_price)
+            levels.append((ask, size, bid, size * self.random.uniform(0.5, 1.5)))
+        return levels
+
+    async def start_price_driver(self, app):
+        app["price_driver"] = asyncio.ensure_future(self.drive_prices())
+
+    """ tick_interval마다 가치를 무작위로 움직이고 모든 마켓의 거래소 밖 호가를 다시 만듦 """
+    async def drive_prices(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.btc_price = self.btc_price * (1 + self.random.gauss(0, self.volatility))
+            for coin in self.coins:
+                self.coins[coin] = self.coins[coin] * (1 + self.random.gauss(0, self.volatility))
+            for market in self.markets:
+                self.engine.set_market_levels(market, self.make_levels(market))
+
+    """ 업비트처럼 요청 그룹별로 초당 요청 수를 세서 Remaining-Req 헤더를 붙이고, 넘으면 429를 반환함 """
+    def count_request(self, group):
+        limit = RateLimiter.DEFAULT_RATE.get(group, RateLimiter.DEFAULT_RATE["default"])
+        second = int(time.time())
+        count = self.request_counts.get(group)
+        if count is None or count[0] != second:
+            count = [second, 0]
+            self.request_counts[group] = count
+        count[1] = count[1] + 1
+        return limit - count[1], "group=" + group + "; min=" + str(limit * 60 - count[1]) + "; sec=" + str(max(limit - count[1], 0))
+
+    @staticmethod
+    def get_group(path, method):
+        if path == "orders" and method == "POST":
+            return "order"
+        if path.startswith("candles"):
+            return "candles"
+        if path in ("market/all", "orderbook", "ticker"):
+            return "market" if path == "market/all" else path
+        return "default"
+
+    @staticmethod
+    def error_response(name, message="", status=400):
+        return web.json_response({"error": {"name": name, "message": message}}, status=status)
+
+    @web.middleware
+    async def api_middleware(self, request, handler):
+        if not request.path.startswith("/v1/"):
+            return await handler(request)
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        remaining, header = self.count_request(self.get_group(request.path[4:], request.method))
+        if remaining < 0:
+            response = self.error_response("too_many_requests", "요청 수 제한을 초과했습니다.", 429)
+        else:
+            try:
+                response = await handler(request)
+            except ExchangeError as e:
+                response = self.error_response(e.name, e.message, e.status)
+        response.headers["Remaining-Req"] = header
+        return response
+
+    """ Authorization 헤더의 JWT를 secret key로 확인하고, access key, nonce, 쿼리 문자열이 맞는지 확인함 """
+    def authorize(self, request):
+        authorization = request.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            raise ExchangeError("jwt_verification", "Authorization 헤더가 없습니다.", 401)
+        try:
+            payload = jwt.decode(authorization[7:], self.secret_key, algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            raise ExchangeError("jwt_verification", "잘못된 토큰입니다.", 401)
+        if payload.get("access_key") != self.access_key:
+            raise ExchangeError("invalid_access_key", "잘못된 access key입니다.", 401)
+        nonce = payload.get("nonce")
+        if nonce in self.used_nonces:
+            raise ExchangeError("nonce_used", "이미 사용된 nonce입니다.", 401)
+        self.used_nonces.add(nonce)
+        if request.query_string != "" and payload.get("query") != request.query_string:
+            raise ExchangeError("invalid_query_payload", "쿼리가 토큰과 다릅니다.", 401)
+
+    async def get_market_all(self, request):
+        return web.json_response([{"market": market, "korean_name": market.split("-")[1], "english_name": market.split("-")[1], "market_warning": "NONE"}
+                                  for market in self.markets])
+
+    async def get_accounts(self, request):
+        self.authorize(request)
+        return web.json_response(self.engine.get_accounts())
+
+    async def get_orders(self, request):
+        self.authorize(request)
+        orders = self.engine.get_orders(request.query.get("market"), request.query.get("state", "wait"))
+        return web.json_response([order.to_dict() for order in orders])
+
+    async def post_orders(self, request):
+        self.authorize(request)
+        query = request.query
+        if query.get("market") not in self.markets:
+            raise ExchangeError("market_does_not_exist", "마켓이 없습니다.", 404)
+        order = self.engine.place(query["market"], query.get("side"), query.get("ord_type"), query.get("price"), query.get("volume"))
+        return web.json_response(order.to_dict(), status=201)
+
+    async def get_order(self, request):
+        self.authorize(request)
+        return web.json_response(self.engine.get_order(request.query.get("uuid")).to_dict(with_trades=True))
+
+    async def delete_order(self, request):
+        self.authorize(request)
+        return web.json_response(self.engine.cancel(request.query.get("uuid")).to_dict())
+
+    def get_orderbook_dict(self, market):
+        units = self.engine.get_book(market).get_units(self.depth)
+        return {"market": market, "timestamp": int(time.time() * 1000), "total_ask_size": sum(unit["ask_size"] for unit in units),
+                "total_bid_size": sum(unit["bid_size"] for unit in units), "orderbook_units": units}
+
+    async def get_orderbook(self, request):
+        markets = [market.strip() for market in request.query.get("markets", "").split(",") if market.strip() in self.markets]
+        if len(markets) == 0:
+            raise ExchangeError("market_does_not_exist", "마켓이 없습니다.", 404)
+        return web.json_response([self.get_orderbook_dict(market) for market in markets])
+
+    def get_trade_price(self, market):
+        units = self.engine.get_book(market).get_units(1)
+        trade = self.engine.trade_prices.get(market)
+        if trade is not None:
+            return trade[0]
+        return (units[0]["ask_price"] + units[0]["bid_price"]) / 2 if len(units) > 0 else 0.0
+
+    async def get_ticker(self, request):
+        markets = [market.strip() for market in request.query.get("markets", "").split(",") if market.strip() in self.markets]
+        return web.json_response([{"market": market, "trade_price": self.get_trade_price(market), "change": "EVEN", "timestamp": int(time.time() * 1000)}
+                                  for market in markets])
+
+    async def get_candles(self, request):
+        market = request.query.get("market")
+        if market not in self.markets:
+            raise ExchangeError("market_does_not_exist", "마켓이 없습니다.", 404)
+        price = self.get_trade_price(market)
+        trade = self.engine.trade_prices.get(market, [price, 0.0, 0.0])
+        now = time.time()
+        return web.json_response([{"market": market, "candle_date_time_utc": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)),
+                                   "candle_date_time_kst": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)),
+                                   "opening_price": price, "high_price": price, "low_price": price, "trade_price": price, "timestamp": int(now * 1000),
+                                   "candle_acc_trade_price": self.acc_trade_price[market] + trade[1], "candle_acc_trade_volume": trade[2],
+                                   "unit": int(request.match_info["unit"])}])
+
+    """ crix 웹 소켓 -> 구독 요청을 받으면 마켓마다 SNAPSHOT을 보내고, 이후 호가가 바뀔 때마다 REALTIME을 보냄 (SIMPLE 형식, 바이너리 프레임) """
+    async def websocket_handler(self, request):
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        client = None
+        try:
+            async for message in websocket:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                codes, depth = self.parse_subscription(message.data)
+                client = (websocket, codes, depth)
+                self.clients.append(client)
+                for market in codes:
+                    await websocket.send_bytes(self.get_crix_message(market, depth, "SNAPSHOT"))
+        finally:
+            if client in self.clients:
+                self.clients.remove(client)
+        return websocket
+
+    """ [{"ticket"}, {"format"}, {"type": "crixOrderbook", "codes": ["CRIX.UPBIT.KRW-BTC.1", ...]}] -> (마켓 코드 집합, 호가 단계 수) """
+    def parse_subscription(self, data):
+        codes = set()
+        depth = 1
+        for item in json.loads(data):
+            for code in item.get("codes", []):
+                parts = code.split(".")
+                market = parts[2]
+                if len(parts) > 3:
+                    depth = max(depth, int(parts[3]))
+                if market in self.markets:
+                    codes.add(market)
+        return codes, min(depth, self.depth)
+
+    def get_crix_message(self, market, depth, stream_type):
+        units = self.engine.get_book(market).get_units(depth)
+        return json.dumps({"ty": "crixOrderbook", "cd": "CRIX.UPBIT." + market, "tms": int(time.time() * 1000),
+                           "tas": sum(unit["ask_size"] for unit in units), "tbs": sum(unit["bid_size"] for unit in units),
+                           "obu": [{"ap": unit["ask_price"], "as": unit["ask_size"], "bp": unit["bid_price"], "bs": unit["bid_size"]} for unit in units],
+                           "st": stream_type}, separators=(",", ":")).encode("utf-8")
+
+    def on_book_changed(self, market):
+        for websocket, codes, depth in self.clients:
+            if market in codes and not websocket.closed:
+                asyncio.ensure_future(websocket.send_bytes(self.get_crix_message(market, depth, "REALTIME")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 업비트 거래소 시뮬레이터")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--config", default="config.ini", help="access key, secret key를 불러올 설정 파일")
+    parser.add_argument("--coins", default=",".join(DEFAULT_COINS.keys()), help="거래할 코인 이름, ex) ETH,XRP")
+    parser.add_argument("--krw", type=float, default=10000000.0, help="시작 원화 잔고")
+    parser.add_argument("--btc", type=float, default=0.1, help="시작 비트코인 잔고")
+    parser.add_argument("--tick-interval", type=float, default=0.2, help="호가를 바꾸는 간격 (초)")
+    parser.add_argument("--mispricing", type=float, default=0.002, help="KRW, BTC 마켓 호가가 어긋나는 정도")
+    parser.add_argument("--latency", type=float, default=0.0, help="REST 요청마다 추가로 기다리는 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    config = configparser.ConfigParser()
+    config.read(args.config, encoding="utf-8-sig")
+    coins = {coin: DEFAULT_COINS.get(coin, 1000.0) for coin in args.coins.split(",")}
+    simulator = ExchangeSimulator(config["UPBIT"]["access_key"], config["UPBIT"]["secret_key"], coins=coins, balances={"KRW": args.krw, "BTC": args.btc},
+                                  tick_interval=args.tick_interval, mispricing=args.mispricing, latency=args.latency, seed=args.seed)
+    web.run_app(simulator.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+from array import array
+
+
+class L2Book:
+    """ 한 마켓의 호가 여러 단계를 미리 만들어둔 배열에 덮어써서 관리함 -> 웹 소켓 메시지마다 리스트를 새로 보관하지 않음
+        최우선 호가와 n번째 단계까지의 누적 잔량은 배열에서 바로 읽음 """
+
+    __slots__ = ("depth", "levels", "ask_price", "ask_size", "bid_price", "bid_size", "cumulative_ask_size", "cumulative_bid_size", "timestamp", "update_count")
+
+    def __init__(self, depth=15):
+        self.depth = depth  # 저장할 최대 호가 단계 수
+        self.levels = 0  # 현재 저장된 호가 단계 수
+        self.ask_price = array("d", bytes(8 * depth))
+        self.ask_size = array("d", bytes(8 * depth))
+        self.bid_price = array("d", bytes(8 * depth))
+        self.bid_size = array("d", bytes(8 * depth))
+        self.cumulative_ask_size = array("d", bytes(8 * depth))  # 0번부터 n번 단계까지의 매도 잔량 합
+        self.cumulative_bid_size = array("d", bytes(8 * depth))  # 0번부터 n번 단계까지의 매수 잔량 합
+        self.timestamp = 0  # 거래소에서 이 호가를 만든 시각 (ms)
+        self.update_count = 0  # 호가를 받은 횟수
+
+    """ 웹 소켓 orderbook의 obu([{"ap", "as", "bp", "bs"}, ...])를 그대로 덮어씀 """
+    def apply(self, units, timestamp=0):
+        levels = min(len(units), self.depth)
+        ask_total = 0.0
+        bid_total = 0.0
+        for level in range(0, levels):
+            unit = units[level]
+            self.ask_price[level] = unit["ap"]
+            self.ask_size[level] = unit["as"]
+            self.bid_price[level] = unit["bp"]
+            self.bid_size[level] = unit["bs"]
+            ask_total = ask_total + unit["as"]
+            bid_total = bid_total + unit["bs"]
+            self.cumulative_ask_size[level] = ask_total
+            self.cumulative_bid_size[level] = bid_total
+        self.levels = levels
+        self.timestamp = timestamp
+        self.update_count = self.update_count + 1
+
+    """ OrderbookDecoder처럼 단계별 배열로 읽은 호가를 덮어씀 -> 딕셔너리를 거치지 않음 """
+    def apply_levels(self, ask_price, ask_size, bid_price, bid_size, levels, timestamp=0):
+        levels = min(levels, self.depth)
+        ask_total = 0.0
+        bid_total = 0.0
+        for level in range(0, levels):
+            self.ask_price[level] = ask_price[level]
+            self.ask_size[level] = ask_size[level]
+            self.bid_price[level] = bid_price[level]
+            self.bid_size[level] = bid_size[level]
+            ask_total = ask_total + ask_size[level]
+            bid_total = bid_total + bid_size[level]
+            self.cumulative_ask_size[level] = ask_total
+            self.cumulative_bid_size[level] = bid_total
+        self.levels = levels
+        self.timestamp = timestamp
+        self.update_count = self.update_count + 1
+
+    def get_best_ask(self):
+        return self.ask_price[0] if self.levels > 0 else 0.0
+
+    def get_best_bid(self):
+        return self.bid_price[0] if self.levels > 0 else 0.0
+
+    """ 0번부터 level번 단계까지의 누적 잔량 -> 저장된 단계보다 깊으면 전체 잔량 """
+    def get_cumulative_ask_size(self, level):
+        if self.levels == 0:
+            return 0.0
+        return self.cumulative_ask_size[min(level, self.levels - 1)]
+
+    def get_cumulative_bid_size(self, level):
+        if self.levels == 0:
+            return 0.0
+        return self.cumulative_bid_size[min(level, self.levels - 1)]
+
+    """ REST orderbook의 orderbook_units와 같은 형태로 반환함 -> depth_sizer에서 사용 """
+    def get_units(self):
+        return [{"ask_price": self.ask_price[level], "ask_size": self.ask_size[level], "bid_price": self.bid_price[level], "bid_size": self.bid_size[level]}
+                for level in range(0, self.levels)]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import json
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import time
+
+# (단계 이름, 설명) -> 모든 시각은 time.time() 기준
+STAGES = (
+    ("receive", "거래소에서 호가를 만든 시각 -> 웹 소켓 메시지를 받은 시각 (거래소와 이 컴퓨터의 시계 차이가 포함됨)"),
+    ("book_update", "웹 소켓 메시지를 받은 시각 -> 호가 저장소에 쓴 시각"),
+    ("detect", "거래 기회를 만든 호가를 저장소에 쓴 시각 -> 수익 계산 스레드가 거래 기회를 찾은 시각"),
+    ("order_send", "거래 기회를 찾은 시각 -> 첫 번째 주문을 보낸 시각"),
+    ("order_ack", "주문을 보낸 시각 -> 거래소가 주문을 받았다고 응답한 시각 (모든 주문)"),
+    ("leg1_fill", "첫 번째 거래의 주문을 보낸 시각 -> 첫 번째 거래가 체결된 시각"),
+    ("leg2_fill", "두 번째 거래의 주문을 보낸 시각 -> 두 번째 거래가 체결된 시각"),
+    ("leg3_fill", "세 번째 거래의 주문을 보낸 시각 -> 세 번째 거래가 체결된 시각"),
+    ("cycle", "거래 기회를 찾은 시각 -> 거래 사이클이 끝난 시각"),
+    ("tick_to_trade", "거래 기회를 만든 웹 소켓 메시지를 받은 시각 -> 첫 번째 주문을 보낸 시각"),
+)
+
+BUCKETS = tuple(0.0001 * 2 ** i for i in range(0, 18))  # 히스토그램 구간의 상한 (초), 0.1ms부터 두 배씩 약 13초까지 -> 그보다 긴 시간은 마지막 구간
+
+
+class LatencyHistogram:
+    """ 구간별 개수만 세는 히스토그램 -> 기록할 때 값을 저장하지 않으므로 메모리가 늘어나지 않음 """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 구간 번호 -> 개수
+        self.count = 0
+        self.total = 0.0  # 모든 값의 합 (초)
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count = self.count + 1
+        self.total = self.total + seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    """ percentile 위치의 값이 들어있는 구간의 상한 (초) -> 마지막 구간이면 최댓값 """
+    def get_percentile(self, percentile):
+        if self.count == 0:
+            return 0.0
+        target = self.count * percentile
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative = cumulative + count
+            if cumulative >= target and count > 0:
+                return min(BUCKETS[bucket], self.max) if bucket < len(BUCKETS) else self.max
+        return self.max
+
+
+class LatencyTracer:
+    """ 호가를 받은 순간부터 거래 사이클이 끝날 때까지 단계별 시각을 기록하고, 단계 사이의 시간을 단계별 히스토그램에 모음
+        -> 놓친 거래 기회가 호가 지연, 수익 계산 지연, 주문 왕복 시간 중 어디에서 생기는지 확인함
+        거래는 한 번에 하나씩만 하므로 진행 중인 거래 사이클도 하나만 기록함 """
+
+    def __init__(self, market_count):
+        self.lock = Lock()
+        self.histograms = {stage: LatencyHistogram() for stage, _ in STAGES}  # 단계 이름 -> 히스토그램
+        self.received_at = array("d", bytes(8 * market_count))  # 마켓 번호 -> 마지막으로 웹 소켓 메시지를 받은 시각
+        self.updated_at = array("d", bytes(8 * market_count))  # 마켓 번호 -> 마지막으로 저장소에 쓴 시각
+        self.started_at = time.time()
+        self.cycle_received_at = 0.0  # 진행 중인 거래 사이클을 만든 메시지를 받은 시각 (0이면 진행 중인 거래 없음)
+        self.cycle_detected_at = 0.0  # 진행 중인 거래 사이클의 거래 기회를 찾은 시각
+        self.order_sent = False  # 진행 중인 거래 사이클에서 주문을 한 번이라도 보냈으면 True
+        self.leg_started_at = 0.0  # 진행 중인 거래의 첫 주문을 보낸 시각 (0이면 아직 보내지 않음)
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.histograms[stage].record(max(seconds, 0.0))
+
+    """ 웹 소켓 메시지 하나를 저장소에 썼을 때 -> exchange_time은 거래소에서 호가를 만든 시각 (ms, 0이면 모름) """
+    def frame(self, market_id, exchange_time, received_at, updated_at):
+        self.received_at[market_id] = received_at
+        self.updated_at[market_id] = updated_at
+        with self.lock:
+            if exchange_time > 0:
+                self.histograms["receive"].record(max(received_at - exchange_time / 1000, 0.0))
+            self.histograms["book_update"].record(max(updated_at - received_at, 0.0))
+
+    """ 거래 기회를 찾았을 때 -> market_ids 중 가장 최근에 바뀐 마켓의 호가가 거래 기회를 만들었다고 봄 """
+    def start_cycle(self, market_ids, detected_at=None):
+        detected_at = time.time() if detected_at is None else detected_at
+        trigger = max(market_ids, key=lambda market_id: self.updated_at[market_id])
+        with self.lock:
+            if self.updated_at[trigger] > 0:
+                self.histograms["detect"].record(max(detected_at - self.updated_at[trigger], 0.0))
+            self.cycle_received_at = self.received_at[trigger] if self.received_at[trigger] > 0 else detected_at
+            self.cycle_detected_at = detected_at
+            self.order_sent = False
+            self.leg_started_at = 0.0
+
+    def order_sent_at(self, sent_at):
+        with self.lock:
+            if self.cycle_detected_at == 0.0:
+                return
+            if not self.order_sent:
+                self.order_sent = True
+                self.histograms["order_send"].record(max(sent_at - self.cycle_detected_at, 0.0))
+                self.histograms["tick_to_trade"].record(max(sent_at - self.cycle_received_at, 0.0))
+            if self.leg_started_at == 0.0:
+                self.leg_started_at = sent_at
+
+    def order_acknowledged(self, sent_at, acknowledged_at=None):
+        self.record("order_ack", (time.time() if acknowledged_at is None else acknowledged_at) - sent_at)
+
+    """ leg번째 거래(1~3)가 체결되었을 때 -> 다음에 보내는 주문부터 다음 거래의 주문으로 봄 """
+    def leg_filled(self, leg, filled_at=None):
+        filled_at = time.time() if filled_at is None else filled_at
+        with self.lock:
+            if self.leg_started_at > 0:
+                self.histograms["leg" + str(leg) + "_fill"].record(max(filled_at - self.leg_started_at, 0.0))
+            self.leg_started_at = 0.0
+
+    def complete_cycle(self, completed_at=None):
+        completed_at = time.time() if completed_at is None else completed_at
+        with self.lock:
+            if self.cycle_detected_at > 0:
+                self.histograms["cycle"].record(max(completed_at - self.cycle_detected_at, 0.0))
+            self.cycle_received_at = 0.0
+            self.cycle_detected_at = 0.0
+
+    """ {단계 이름: {"count", "mean", "p50", "p90", "p99", "max"}} (초) """
+    def get_summary(self):
+        summary = {}
+        with self.lock:
+            for stage, _ in STAGES:
+                histogram = self.histograms[stage]
+                summary[stage] = {"count": histogram.count, "mean": histogram.total / histogram.count if histogram.count > 0 else 0.0,
+                                  "p50": histogram.get_percentile(0.5), "p90": histogram.get_percentile(0.9), "p99": histogram.get_percentile(0.99), "max": histogram.max}
+        return summary
+
+    def get_report(self):
+        lines = ["단계별 지연 시간 (ms, " + str(round(time.time() - self.started_at)) + "초 동안)", "단계\t\t개수\t평균\tp50\tp90\tp99\t최대"]
+        for stage, values in self.get_summary().items():
+            lines.append(stage.ljust(16) + str(values["count"]) + "\t" + "\t".join("{:.1f}".format(values[name] * 1000) for name in ("mean", "p50", "p90", "p99", "max")))
+        return "\n".join(lines)
+
+    """ Prometheus 텍스트 형식의 히스토그램 """
+    def get_prometheus(self):
+        lines = ["# HELP upbit_machine_latency_seconds 거래 단계별 지연 시간", "# TYPE upbit_machine_latency_seconds histogram"]
+        with self.lock:
+            for stage, _ in STAGES:
+                histogram = self.histograms[stage]
+                cumulative = 0
+                for bucket, bound in enumerate(BUCKETS):
+                    cumulative = cumulative + histogram.counts[bucket]
+                    lines.append("upbit_machine_latency_seconds_bucket{stage=\"" + stage + "\",le=\"" + repr(bound) + "\"} " + str(cumulative))
+                lines.append("upbit_machine_latency_seconds_bucket{stage=\"" + stage + "\",le=\"+Inf\"} " + str(histogram.count))
+                lines.append("upbit_machine_latency_seconds_sum{stage=\"" + stage + "\"} " + repr(histogram.total))
+                lines.append("upbit_machine_latency_seconds_count{stage=\"" + stage + "\"} " + str(histogram.count))
+        return "\n".join(lines) + "\n"
+
+
+""" 127.0.0.1:port에서 /metrics (Prometheus 형식), /latency (JSON 요약)를 보여주는 HTTP 서버를 데몬 스레드로 띄움 """
+def start_metrics_server(tracer, port, host="127.0.0.1"):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = tracer.get_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/latency":
+                body, content_type = json.dumps(tracer.get_summary()).encode("utf-8"), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # 요청마다 출력하지 않음
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
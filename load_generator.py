@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+""" 가짜 crix 호가(SIMPLE 형식)를 정해진 속도로 보내는 로컬 웹 소켓 서버를 띄우고, 웹 소켓 버전의 호가 처리와 수익 계산이 얼마나 버티는지 측정함
+    마켓 수와 초당 메시지 수를 바꿔가며 호가 처리 지연, 잃어버린 호가, 수익 계산 한 번에 합쳐진 호가, 스레드별 CPU 사용률을 재고 버틸 수 있는 처리량을 표로 출력함
+    ex) python load_generator.py --coins 10,50,100 --rates 1000,5000,20000 --duration 5 --burst-factor 5 --burst-every 2 --burst-length 0.2 """
+
+import argparse
+import asyncio
+import random
+import time
+from multiprocessing import Process, Pipe
+from threading import Thread, Event
+import websockets
+import replay
+
+
+""" 가짜 코인 이름 목록, ex) ["C000", "C001", ...] """
+def get_coin_names(coin_count):
+    return ["C" + str(coin).zfill(3) for coin in range(0, coin_count)]
+
+
+class FeedGenerator:
+    """ 구독한 마켓을 돌아가며 호가를 rate개/초로 보냄 -> burst_every초마다 burst_length초 동안은 burst_factor배로 보냄
+        tms에는 보낸 시각을 넣어서 받는 쪽에서 지연을 잴 수 있게 함 """
+
+    TEMPLATE = "{\"ty\":\"crixOrderbook\",\"cd\":\"CRIX.UPBIT.%s\",\"tms\":%d,\"tas\":1.0,\"tbs\":1.0,\"obu\":[{\"ap\":%.10g,\"as\":%.4f,\"bp\":%.10g,\"bs\":%.4f}],\"st\":\"%s\"}"
+
+    def __init__(self, coin_count, rate, duration, burst_factor=1.0, burst_every=0.0, burst_length=0.0, seed=0):
+        self.rate = rate
+        self.duration = duration
+        self.burst_factor = burst_factor
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.random = random.Random(seed)
+        self.prices = {"KRW-BTC": 10000000.0}  # 마켓 코드 -> 매수 호가
+        for coin in get_coin_names(coin_count):
+            self.prices["KRW-" + coin] = 1000.0
+            self.prices["BTC-" + coin] = 0.0001
+        self.sent = 0
+
+    def get_message(self, code, stream_type):
+        price = self.prices[code] * (1 + self.random.uniform(-0.001, 0.001))
+        self.prices[code] = price
+        return (self.TEMPLATE % (code, int(time.time() * 1000), price * 1.001, self.random.uniform(0.1, 10), price, self.random.uniform(0.1, 10), stream_type)).encode("utf-8")
+
+    """ 지금까지 보냈어야 하는 메시지 수 -> 버스트 구간은 burst_factor배로 계산함 """
+    def get_target(self, elapsed):
+        if self.burst_every <= 0 or self.burst_factor == 1.0:
+            return int(elapsed * self.rate)
+        periods, offset = divmod(elapsed, self.burst_every)
+        burst_time = periods * self.burst_length + min(offset, self.burst_length)
+        return int((elapsed + burst_time * (self.burst_factor - 1)) * self.rate)
+
+    async def handler(self, websocket, path=None):
+        request = await websocket.recv()
+        codes = [code for code in self.prices if "CRIX.UPBIT." + code + "." in request]
+        for code in codes:
+            await websocket.send(self.get_message(code, "SNAPSHOT"))
+        started_at = time.time()
+        index = 0
+        while True:
+            elapsed = time.time() - started_at
+            if elapsed >= self.duration:
+                break
+            for _ in range(0, self.get_target(elapsed) - self.sent):
+                await websocket.send(self.get_message(codes[index], "REALTIME"))
+                index = (index + 1) % len(codes)
+                self.sent = self.sent + 1
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(1)  # 받는 쪽이 남은 메시지를 모두 처리할 시간
+
+
+""" 작업 프로세스에서 생성기 서버를 실행하고, 다 보내면 보낸 메시지 수를 connection으로 알려줌 """
+def run_generator(port, coin_count, rate, duration, burst_factor, burst_every, burst_length, connection):
+    generator = FeedGenerator(coin_count, rate, duration, burst_factor, burst_every, burst_length)
+    done = None
+
+    async def handler(websocket, path=None):
+        await generator.handler(websocket, path)
+        done.set()
+
+    async def main():
+        nonlocal done
+        done = asyncio.Event()
+        async with websockets.serve(handler, "127.0.0.1", port):
+            connection.send("ready")
+            await done.wait()
+        connection.send(generator.sent)
+
+    asyncio.run(main())
+
+
+class LoadTestMachine(replay.ReplayMachine):
+    """ 거래는 하지 않고, 호가 처리 지연과 수익 계산 횟수를 셈 """
+
+    def __init__(self, trade_coin_list, config_path="config.ini"):
+        super().__init__(trade_coin_list, config_path)
+        self.feed_lags = []  # 호가마다 (받아서 저장소에 쓴 시각 - 보낸 시각)
+        self.evaluation_lags = []  # 계산할 때마다 (계산을 시작한 시각 - 계산하지 않은 가장 오래된 호가를 받은 시각)
+        self.applied = 0  # 저장소에 쓴 호가 수
+        self.evaluations = 0  # 수익 계산 횟수 -> 호가 수와의 차이가 수익 계산 한 번에 합쳐진 호가 수
+        self.pending_since = 0.0
+
+    def apply_orderbook(self, decoder, received_at=0.0):
+        super().apply_orderbook(decoder, received_at)
+        now = time.time()
+        if decoder.stream_type != "SNAPSHOT":
+            self.feed_lags.append(now - decoder.timestamp / 1000)
+            self.applied = self.applied + 1
+        if self.pending_since == 0.0:
+            self.pending_since = now
+
+    def evaluate_coins(self, all_coins, dirty_coins):
+        if self.pending_since > 0:
+            self.evaluation_lags.append(time.time() - self.pending_since)
+            self.pending_since = 0.0
+        self.evaluations = self.evaluations + 1
+        super().evaluate_coins(all_coins, dirty_coins)
+
+    def start_trade(self, coin_num, max_profit_cycle_num, max_profit, optimal_volume, order_volume, prices=None):
+        pass
+
+
+def get_percentile(values, percentile):
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percentile), len(values) - 1)]
+
+
+""" 마켓 수 하나, 초당 메시지 수 하나로 duration초 동안 측정하고 결과를 딕셔너리로 반환함 """
+def run_load(coin_count, rate, duration, config_path="config.ini", port=8765, burst_factor=1.0, burst_every=0.0, burst_length=0.0):
+    receiver, sender = Pipe(duplex=False)
+    generator = Process(target=run_generator, args=(port, coin_count, rate, duration, burst_factor, burst_every, burst_length, sender), daemon=True)
+    generator.start()
+    receiver.recv()  # 서버가 준비될 때까지 기다림
+
+    machine = LoadTestMachine(get_coin_names(coin_count), config_path)
+    machine.websocket_url = "ws://127.0.0.1:" + str(port)
+    machine.stale_market_seconds = 0
+    stop = Event()
+    usage = {}  # 스레드 이름 -> CPU 사용률 (1.0 = 코어 하나를 모두 사용)
+
+    """ 스레드 안에서 target을 실행하고, 끝나기 전에 그 스레드가 사용한 CPU 시간으로 사용률을 구함 """
+    def measure(name, target):
+        started_at = time.time()
+        cpu_started_at = time.thread_time()
+        target()
+        usage[name] = (time.thread_time() - cpu_started_at) / max(time.time() - started_at, 1e-9)
+
+    def feed():
+        async def receive():
+            try:
+                await asyncio.wait_for(machine.get_orderbook_with_websocket(["KRW-BTC"] + machine.subscription_codes), duration + 1)
+            except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                pass
+        asyncio.run(receive())
+        stop.set()
+
+    def evaluate():
+        while not stop.is_set():
+            all_coins, dirty_coins = machine.dirty_coins.wait(0.1)
+            if all_coins or len(dirty_coins) > 0:
+                machine.evaluate_coins(all_coins, dirty_coins)
+
+    threads = [Thread(target=measure, args=("feed", feed), name="feed"), Thread(target=measure, args=("evaluation", evaluate), name="calculate_profit")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sent = receiver.recv()
+    generator.join()
+    return {"coins": coin_count, "markets": coin_count * 2 + 1, "rate": rate, "sent": sent, "received": machine.applied,
+            "dropped": max(sent - machine.applied, 0), "conflated": max(machine.applied - machine.evaluations, 0),
+            "feed_lag_p50": get_percentile(machine.feed_lags, 0.5), "feed_lag_p99": get_percentile(machine.feed_lags, 0.99),
+            "evaluation_lag_p99": get_percentile(machine.evaluation_lags, 0.99),
+            "feed_cpu": usage.get("feed", 0.0), "evaluation_cpu": usage.get("evaluation", 0.0)}
+
+
+def print_report(results, max_lag):
+    print("마켓 수\t목표(개/초)\t보냄\t받음\t잃어버림\t합쳐짐\t지연 p50(ms)\t지연 p99(ms)\t계산 지연 p99(ms)\t호가 CPU\t계산 CPU\t버팀")
+    for result in results:
+        sustainable = result["dropped"] == 0 and result["feed_lag_p99"] <= max_lag
+        print("\t".join([str(result["markets"]), str(result["rate"]), str(result["sent"]), str(result["received"]), str(result["dropped"]), str(result["conflated"]),
+                         "{:.1f}".format(result["feed_lag_p50"] * 1000), "{:.1f}".format(result["feed_lag_p99"] * 1000),
+                         "{:.1f}".format(result["evaluation_lag_p99"] * 1000), "{:.0%}".format(result["feed_cpu"]), "{:.0%}".format(result["evaluation_cpu"]),
+                         "O" if sustainable else "X"]))
+    print("\n마켓 수별 버틸 수 있는 최대 처리량 (지연 p99 " + str(int(max_lag * 1000)) + "ms 이하, 잃어버린 호가 없음)")
+    for markets in sorted(set(result["markets"] for result in results)):
+        rates = [result["rate"] for result in results if result["markets"] == markets and result["dropped"] == 0 and result["feed_lag_p99"] <= max_lag]
+        print(str(markets) + "개 마켓 : " + (str(max(rates)) + "개/초" if len(rates) > 0 else "없음"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 호가로 웹 소켓 버전의 처리량 한계를 측정함")
+    parser.add_argument("--coins", default="10,50,100", help="코인 수 목록 (마켓 수 = 코인 수 * 2 + 1)")
+    parser.add_argument("--rates", default="1000,5000,20000", help="초당 메시지 수 목록")
+    parser.add_argument("--duration", type=float, default=5.0, help="측정마다 보내는 시간 (초)")
+    parser.add_argument("--burst-factor", type=float, default=1.0, help="버스트 구간에서 몇 배로 보낼지")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="버스트 간격 (초, 0이면 버스트 없음)")
+    parser.add_argument("--burst-length", type=float, default=0.0, help="버스트 길이 (초)")
+    parser.add_argument("--max-lag", type=float, default=0.05, help="버틴다고 볼 최대 지연 p99 (초)")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    results = []
+    for coin_count in [int(value) for value in args.coins.split(",")]:
+        for rate in [int(value) for value in args.rates.split(",")]:
+            results.append(run_load(coin_count, rate, args.duration, args.config, args.port, args.burst_factor, args.burst_every, args.burst_length))
+    print_report(results, args.max_lag)
+
+
+if __name__ == "__main__":
+    main()
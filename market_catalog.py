@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+
+class MarketCatalog:
+    """ market/all 결과를 기준 화폐(KRW, BTC, USDT)와 코인 이름으로 색인해둔 목록 -> 상장, 상장 폐지된 마켓만 골라서 반영할 수 있음 """
+
+    def __init__(self, markets=None):
+        self.markets = {}  # 마켓 코드 -> market/all의 마켓 정보, ex) "KRW-XRP" -> {"market": "KRW-XRP", ...}
+        self.by_base = {}  # 코인 이름 -> 거래 가능한 기준 화폐 집합, ex) "XRP" -> {"KRW", "BTC"}
+        self.by_quote = {}  # 기준 화폐 -> 거래 가능한 코인 이름 집합, ex) "BTC" -> {"XRP", "ETH", ...}
+        if markets is not None:
+            self.update(markets)
+
+    """ 마켓 코드를 (기준 화폐, 코인 이름)으로 나눔, ex) "KRW-XRP" -> ("KRW", "XRP") """
+    @staticmethod
+    def split_market(code):
+        quote, base = code.split("-", 1)
+        return quote, base
+
+    def add(self, market):
+        code = market["market"]
+        quote, base = self.split_market(code)
+        self.markets[code] = market
+        self.by_base.setdefault(base, set()).add(quote)
+        self.by_quote.setdefault(quote, set()).add(base)
+
+    def remove(self, code):
+        quote, base = self.split_market(code)
+        self.markets.pop(code, None)
+        self.by_base[base].discard(quote)
+        if len(self.by_base[base]) == 0:
+            del self.by_base[base]
+        self.by_quote[quote].discard(base)
+        if len(self.by_quote[quote]) == 0:
+            del self.by_quote[quote]
+
+    """ 새로 불러온 market/all 결과와 비교해서 바뀐 마켓만 반영하고, (새로 상장된 마켓 코드 목록, 없어진 마켓 코드 목록)을 반환함 """
+    def update(self, markets):
+        new_markets = {market["market"]: market for market in markets}
+        added = [code for code in new_markets if code not in self.markets]
+        removed = [code for code in self.markets if code not in new_markets]
+        for code in removed:
+            self.remove(code)
+        for code in added:
+            self.add(new_markets[code])
+        for code in new_markets:  # 이름 등 바뀐 정보는 그대로 덮어씀
+            self.markets[code] = new_markets[code]
+        return added, removed
+
+    def contains(self, code):
+        return code in self.markets
+
+    def get_quotes(self, base):
+        return self.by_base.get(base, set())
+
+    def get_bases(self, quote):
+        return self.by_quote.get(quote, set())
+
+    """ 주어진 기준 화폐 시장 모두에서 거래 가능한 코인 이름 목록, ex) ("KRW", "BTC") -> KRW 시장과 BTC 시장에 모두 있는 코인 """
+    def get_cross_listed_bases(self, quotes=("KRW", "BTC")):
+        bases = None
+        for quote in quotes:
+            if bases is None:
+                bases = set(self.get_bases(quote))
+            else:
+                bases = bases & self.get_bases(quote)
+        return sorted(bases) if bases is not None else []
+
+    """ 두 개 이상의 기준 화폐 시장에서 거래 가능한 코인 이름 -> 기준 화폐 목록 """
+    def get_tradeable_pairs(self):
+        return {base: sorted(quotes) for base, quotes in self.by_base.items() if len(quotes) > 1}
+
+    def to_list(self):
+        return list(self.markets.values())
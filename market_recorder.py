@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import json
+import mmap
+import os
+import struct
+import time
+from queue import Queue, Empty
+from threading import Thread, Lock
+
+# 받은 시각 (time.time()), 거래소 시각 (ms), 마켓 번호, 플래그, 매도 호가, 매도 잔량, 매수 호가, 매수 잔량 -> 56바이트
+RECORD = struct.Struct("<dqiIdddd")
+FLAG_SNAPSHOT = 1  # SNAPSHOT으로 받은 호가
+
+
+""" 받은 시각이 속한 날짜, ex) "20200101" -> 파일을 하루 단위로 나눌 때 사용 """
+def get_day(timestamp):
+    return time.strftime("%Y%m%d", time.localtime(timestamp))
+
+
+class MarketRecorder:
+    """ 호가를 받을 때마다 고정 크기 레코드를 버퍼에 쌓아두고, 버퍼가 차거나 flush_interval초가 지나면 기록 스레드가 파일 끝에 한 번에 씀
+        -> 호가 스레드에서는 파일에 쓰지 않음, 파일은 날짜가 바뀌면 새로 만들고, 마켓 번호 -> 마켓 코드는 같은 이름의 .json 파일에 저장함 """
+
+    def __init__(self, directory, codes, buffer_records=4096, flush_interval=1.0):
+        self.directory = directory  # 기록 파일을 저장할 폴더
+        self.codes = list(codes)  # 마켓 번호 -> 마켓 코드
+        self.buffer_size = buffer_records * RECORD.size
+        self.flush_interval = flush_interval
+        self.session = time.strftime("%H%M%S")  # 같은 날 다시 시작하면 마켓 번호가 달라질 수 있으므로 파일을 나눔
+        self.lock = Lock()
+        self.buffer = bytearray(self.buffer_size)
+        self.position = 0  # 버퍼에서 다음에 쓸 위치
+        self.queue = Queue()  # 다 찬 버퍼 -> 기록 스레드
+        self.day = None  # 지금 열려있는 파일의 날짜
+        self.file = None
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+        self.thread = Thread(target=self.write_periodically, name="market_recorder", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)  # 종료할 때 버퍼에 남은 레코드를 잃어버리지 않도록 함
+
+    """ 호가 하나를 기록함 -> 버퍼에 쓰기만 하므로 호가 스레드에서 바로 호출해도 됨 """
+    def record(self, receive_time, exchange_time, market_id, ask_price, ask_size, bid_price, bid_size, snapshot=False):
+        with self.lock:
+            RECORD.pack_into(self.buffer, self.position, receive_time, int(exchange_time), market_id, FLAG_SNAPSHOT if snapshot else 0,
+                             ask_price, ask_size, bid_price, bid_size)
+            self.position = self.position + RECORD.size
+            if self.position >= self.buffer_size:
+                self.hand_off()
+
+    """ 쌓인 레코드를 기록 스레드에 넘기고 새 버퍼를 만듦 -> lock을 잡은 상태에서 호출해야 함 """
+    def hand_off(self):
+        if self.position == 0:
+            return
+        self.queue.put(memoryview(self.buffer)[0:self.position])
+        self.buffer = bytearray(self.buffer_size)
+        self.position = 0
+
+    def flush(self):
+        with self.lock:
+            self.hand_off()
+
+    """ 남은 레코드를 모두 파일에 쓰고 기록 스레드를 멈춤 -> 여러 번 불러도 됨 """
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.hand_off()
+            self.queue.put(None)  # 기록 스레드가 이 앞의 묶음까지 쓰고 멈춤
+        self.thread.join()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        atexit.unregister(self.close)
+
+    def write_periodically(self):
+        while True:
+            try:
+                chunk = self.queue.get(timeout=self.flush_interval)
+            except Empty:
+                self.flush()
+                continue
+            if chunk is None:
+                return
+            try:
+                self.write(chunk)
+            except OSError as e:
+                print("호가 기록 실패 : " + repr(e))
+
+    """ 레코드 묶음을 날짜별 파일에 씀 -> 묶음 안에서 날짜가 바뀌는 경우에만 레코드마다 날짜를 확인함 """
+    def write(self, chunk):
+        first_day = get_day(RECORD.unpack_from(chunk, 0)[0])
+        last_day = get_day(RECORD.unpack_from(chunk, len(chunk) - RECORD.size)[0])
+        if first_day == last_day:
+            self.get_file(first_day).write(chunk)
+        else:
+            for offset in range(0, len(chunk), RECORD.size):
+                self.get_file(get_day(RECORD.unpack_from(chunk, offset)[0])).write(chunk[offset:offset + RECORD.size])
+        self.file.flush()
+
+    def get_file(self, day):
+        if day != self.day:
+            if self.file is not None:
+                self.file.close()
+            path = os.path.join(self.directory, "orderbook-" + day + "-" + self.session)
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump({"codes": self.codes, "record_format": RECORD.format}, f)
+            self.file = open(path + ".bin", "ab")
+            self.day = day
+        return self.file
+
+
+class Recording:
+    """ 기록 파일을 메모리 맵으로 열어서 레코드를 복사 없이 번호로 읽음 """
+
+    def __init__(self, path):
+        with open(os.path.splitext(path)[0] + ".json", "r", encoding="utf-8") as f:
+            self.codes = json.load(f)["codes"]  # 마켓 번호 -> 마켓 코드
+        self.file = open(path, "rb")
+        size = os.path.getsize(path)
+        self.count = size // RECORD.size  # 기록 중인 파일이면 마지막 레코드가 덜 써져 있을 수 있으므로 버림
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+
+    def __len__(self):
+        return self.count
+
+    """ (받은 시각, 거래소 시각, 마켓 번호, 플래그, 매도 호가, 매도 잔량, 매수 호가, 매수 잔량) """
+    def get(self, index):
+        return RECORD.unpack_from(self.map, index * RECORD.size)
+
+    def __iter__(self):
+        for index in range(0, self.count):
+            yield RECORD.unpack_from(self.map, index * RECORD.size)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+""" 폴더 안의 기록 파일 경로를 시간 순서대로 반환함 """
+def list_recordings(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.startswith("orderbook-") and name.endswith(".bin"))
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import time
+import uuid as uuid_module
+from bisect import bisect_right
+
+FEE_RATE = {"KRW": 0.0005, "BTC": 0.0025, "USDT": 0.0025}  # 기준 화폐별 거래 수수료
+MARKET = "market"  # 거래소 밖의 호가(시장 조성 물량)를 낸 주문의 주인
+
+
+class ExchangeError(Exception):
+    """ 업비트 오류 응답 {"error": {"name": ..., "message": ...}} 으로 바꿀 수 있는 오류 """
+
+    def __init__(self, name, message="", status=400):
+        super().__init__(name)
+        self.name = name
+        self.message = message
+        self.status = status
+
+
+""" 주문 매개변수를 0보다 큰 숫자로 읽음 -> 없거나 숫자가 아니면 업비트처럼 validation_error """
+def get_positive_number(value, name):
+    if value is None:
+        raise ExchangeError("validation_error", name + " 값이 필요합니다.")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ExchangeError("validation_error", name + " 값이 숫자가 아닙니다.")
+    if not number > 0:
+        raise ExchangeError("validation_error", name + " 값은 0보다 커야 합니다.")
+    return number
+
+
+class Order:
+    """ 주문 하나 -> 업비트 주문 조회 응답과 같은 값을 가짐 """
+
+    __slots__ = ("uuid", "market", "side", "ord_type", "price", "volume", "remaining_volume", "executed_volume", "funds", "remaining_funds",
+                 "locked", "paid_fee", "state", "created_at", "sequence", "owner", "trades")
+
+    def __init__(self, market, side, ord_type, price, volume, owner, sequence, funds=0.0):
+        self.uuid = str(uuid_module.uuid4())
+        self.market = market
+        self.side = side  # "bid" : 매수, "ask" : 매도
+        self.ord_type = ord_type  # "limit" : 지정가, "price" : 시장가 매수 (금액 지정), "market" : 시장가 매도 (수량 지정)
+        self.price = price
+        self.volume = volume
+        self.remaining_volume = volume
+        self.executed_volume = 0.0
+        self.funds = funds  # 시장가 매수 금액
+        self.remaining_funds = funds
+        self.locked = 0.0  # 주문에 묶여있는 금액 또는 수량
+        self.paid_fee = 0.0
+        self.state = "wait"
+        self.created_at = time.time()
+        self.sequence = sequence  # 같은 가격에서 먼저 들어온 주문이 먼저 체결됨
+        self.owner = owner
+        self.trades = []
+
+    """ 호가 목록에서 정렬할 때 쓰는 값 -> 매수는 비싼 가격, 매도는 싼 가격이 앞으로 오고, 같은 가격이면 먼저 들어온 주문이 앞으로 옴 """
+    def get_key(self):
+        return (-self.price if self.side == "bid" else self.price, self.sequence)
+
+    def to_dict(self, with_trades=False):
+        quote = self.market.split("-")[0]
+        result = {"uuid": self.uuid, "side": self.side, "ord_type": self.ord_type, "price": str(self.price if self.ord_type != "price" else self.funds),
+                  "state": self.state, "market": self.market, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S+09:00", time.localtime(self.created_at)),
+                  "volume": str(self.volume) if self.ord_type != "price" else None,
+                  "remaining_volume": str(self.remaining_volume) if self.ord_type != "price" else None,
+                  "reserved_fee": str(self.locked * FEE_RATE.get(quote, 0.0025)) if self.side == "bid" else "0.0", "remaining_fee": "0.0",
+                  "paid_fee": str(self.paid_fee), "locked": str(self.locked), "executed_volume": str(self.executed_volume), "trades_count": len(self.trades)}
+        if with_trades:
+            result["trades"] = self.trades
+        return result
+
+
+class OrderBook:
+    """ 한 마켓의 매수, 매도 주문을 가격-시간 우선순위로 정렬해서 들고 있음 """
+
+    def __init__(self, market):
+        self.market = market
+        self.bids = []  # 비싼 가격, 먼저 들어온 순서
+        self.asks = []  # 싼 가격, 먼저 들어온 순서
+        self.bid_keys = []
+        self.ask_keys = []
+
+    def get_side(self, side):
+        return (self.bids, self.bid_keys) if side == "bid" else (self.asks, self.ask_keys)
+
+    def add(self, order):
+        orders, keys = self.get_side(order.side)
+        key = order.get_key()
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        orders.insert(index, order)
+
+    def remove(self, order):
+        orders, keys = self.get_side(order.side)
+        index = orders.index(order)
+        del orders[index]
+        del keys[index]
+
+    """ 가격별로 잔량을 합친 호가 depth단계 -> [{"ask_price", "ask_size", "bid_price", "bid_size"}, ...] """
+    def get_units(self, depth=15):
+        asks = self.aggregate(self.asks, depth)
+        bids = self.aggregate(self.bids, depth)
+        units = []
+        for level in range(0, min(len(asks), len(bids))):
+            units.append({"ask_price": asks[level][0], "ask_size": asks[level][1], "bid_price": bids[level][0], "bid_size": bids[level][1]})
+        return units
+
+    @staticmethod
+    def aggregate(orders, depth):
+        levels = []
+        for order in orders:
+            if len(levels) > 0 and levels[-1][0] == order.price:
+                levels[-1][1] = levels[-1][1] + order.remaining_volume
+            elif len(levels) < depth:
+                levels.append([order.price, order.remaining_volume])
+            else:
+                break
+        return levels
+
+
+class MatchingEngine:
+    """ 마켓별 호가에서 가격-시간 우선순위로 주문을 체결하고, 계정 하나의 잔고를 관리함
+        거래소 밖의 호가는 set_market_levels로 MARKET 주문으로 넣고, 잔량이 모자라면 주문은 나눠서 체결됨 """
+
+    def __init__(self, balances=None):
+        self.books = {}  # 마켓 코드 -> OrderBook
+        self.orders = {}  # uuid -> 계정의 Order
+        self.balances = {}  # 화폐 -> [잔고, 묶인 금액]
+        self.sequence = itertools.count()
+        self.trade_prices = {}  # 마켓 코드 -> [마지막 체결 가격, 누적 거래 대금, 누적 거래량]
+        self.listeners = []  # 호가가 바뀐 마켓 코드를 받는 함수 (웹 소켓 전송 등)
+        for currency, balance in (balances or {}).items():
+            self.balances[currency] = [float(balance), 0.0]
+
+    def get_book(self, market):
+        book = self.books.get(market)
+        if book is None:
+            book = OrderBook(market)
+            self.books[market] = book
+        return book
+
+    def notify(self, market):
+        for listener in self.listeners:
+            listener(market)
+
+    """ 거래소 밖의 호가를 새로 정함 -> 이전 MARKET 주문을 모두 지우고 새 주문으로 넣은 뒤, 계정의 지정가 주문과 겹치면 체결함
+        levels : [(매도 호가, 매도 잔량, 매수 호가, 매수 잔량), ...] """
+    def set_market_levels(self, market, levels):
+        book = self.get_book(market)
+        for orders in (book.bids, book.asks):
+            for order in [order for order in orders if order.owner == MARKET]:
+                book.remove(order)
+        for ask_price, ask_size, bid_price, bid_size in levels:
+            for side, price, size in (("ask", ask_price, ask_size), ("bid", bid_price, bid_size)):
+                order = Order(market, side, "limit", price, size, MARKET, next(self.sequence))
+                self.match(book, order)
+                if order.remaining_volume > 0:
+                    book.add(order)
+        self.notify(market)
+
+    def get_balance(self, currency):
+        return self.balances.setdefault(currency, [0.0, 0.0])
+
+    """ 계정의 주문을 넣음 -> 잔고를 묶고 바로 체결할 수 있는 만큼 체결한 뒤, 지정가 주문의 남은 수량은 호가에 올림 """
+    def place(self, market, side, ord_type, price=None, volume=None):
+        quote, base = market.split("-")
+        fee_rate = FEE_RATE.get(quote, 0.0025)
+        if side != "bid" and side != "ask":
+            raise ExchangeError("validation_error", "side 값은 bid, ask 중 하나여야 합니다.")
+        if side == "bid":
+            if ord_type == "limit":
+                order = Order(market, side, ord_type, get_positive_number(price, "price"), get_positive_number(volume, "volume"), "account", next(self.sequence))
+                amount = order.price * order.volume * (1 + fee_rate)
+            elif ord_type == "price":
+                order = Order(market, side, ord_type, 0.0, 0.0, "account", next(self.sequence), funds=get_positive_number(price, "price"))
+                amount = order.funds * (1 + fee_rate)
+            else:
+                raise ExchangeError("invalid_ord_type", "매수는 limit, price 주문만 가능합니다.")
+            balance = self.get_balance(quote)
+            if balance[0] < amount:
+                raise ExchangeError("insufficient_funds_bid", "주문가능한 금액(" + quote + ")이 부족합니다.")
+        else:
+            if ord_type == "limit":
+                order = Order(market, side, ord_type, get_positive_number(price, "price"), get_positive_number(volume, "volume"), "account", next(self.sequence))
+            elif ord_type == "market":
+                order = Order(market, side, ord_type, 0.0, get_positive_number(volume, "volume"), "account", next(self.sequence))
+            else:
+                raise ExchangeError("invalid_ord_type", "매도는 limit, market 주문만 가능합니다.")
+            amount = order.volume
+            balance = self.get_balance(base)
+            if balance[0] < amount:
+                raise ExchangeError("insufficient_funds_ask", "주문가능한 금액(" + base + ")이 부족합니다.")
+        balance[0] = balance[0] - amount
+        balance[1] = balance[1] + amount
+        order.locked = amount
+        self.orders[order.uuid] = order
+        book = self.get_book(market)
+        self.match(book, order)
+        if order.state == "wait":
+            if ord_type == "limit" and order.remaining_volume > 0:
+                book.add(order)
+            else:  # 시장가 주문의 체결되지 않은 나머지는 취소함
+                self.release(order)
+                order.state = "cancel" if order.executed_volume == 0 or order.remaining_volume > 0 else "done"
+        self.notify(market)
+        return order
+
+    """ taker 주문을 반대편 호가와 체결함 """
+    def match(self, book, taker):
+        makers = book.asks if taker.side == "bid" else book.bids
+        while len(makers) > 0 and taker.state == "wait":
+            maker = makers[0]
+            if taker.ord_type == "limit" and (taker.price < maker.price if taker.side == "bid" else taker.price > maker.price):
+                break
+            if taker.ord_type == "price":
+                volume = min(maker.remaining_volume, taker.remaining_funds / maker.price)
+            else:
+                volume = min(maker.remaining_volume, taker.remaining_volume)
+            if volume <= 1e-12:
+                break
+            self.fill(taker, maker.price, volume)
+            self.fill(maker, maker.price, volume)
+            if maker.remaining_volume <= 1e-12:
+                book.remove(maker)
+            if taker.ord_type == "price" and taker.remaining_funds <= taker.funds * 1e-9:
+                taker.state = "done"
+
+    """ 주문 하나의 체결을 반영함 -> 계정 주문이면 잔고를 옮기고 수수료를 뗌 """
+    def fill(self, order, price, volume):
+        funds = price * volume
+        order.executed_volume = order.executed_volume + volume
+        if order.ord_type == "price":
+            order.remaining_funds = order.remaining_funds - funds
+        else:
+            order.remaining_volume = order.remaining_volume - volume
+            if order.remaining_volume <= 1e-12:
+                order.remaining_volume = 0.0
+                order.state = "done"
+        trade_price = self.trade_prices.setdefault(order.market, [price, 0.0, 0.0])
+        if order.owner == MARKET:
+            trade_price[0] = price
+            trade_price[1] = trade_price[1] + funds
+            trade_price[2] = trade_price[2] + volume
+            return
+        quote, base = order.market.split("-")
+        fee = funds * FEE_RATE.get(quote, 0.0025)
+        order.paid_fee = order.paid_fee + fee
+        order.trades.append({"market": order.market, "uuid": str(uuid_module.uuid4()), "price": str(price), "volume": str(volume), "funds": str(funds),
+                             "side": order.side, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S+09:00")})
+        if order.side == "bid":
+            used = funds + fee
+            self.get_balance(quote)[1] = self.get_balance(quote)[1] - used
+            order.locked = order.locked - used
+            self.get_balance(base)[0] = self.get_balance(base)[0] + volume
+        else:
+            self.get_balance(base)[1] = self.get_balance(base)[1] - volume
+            order.locked = order.locked - volume
+            self.get_balance(quote)[0] = self.get_balance(quote)[0] + funds - fee
+        if order.state == "done":
+            self.release(order)
+
+    """ 주문에 묶여있던 나머지를 잔고로 돌려줌 """
+    def release(self, order):
+        if order.locked <= 0:
+            order.locked = 0.0
+            return
+        quote, base = order.market.split("-")
+        balance = self.get_balance(quote if order.side == "bid" else base)
+        balance[0] = balance[0] + order.locked
+        balance[1] = balance[1] - order.locked
+        order.locked = 0.0
+
+    def cancel(self, uuid):
+        order = self.orders.get(uuid)
+        if order is None:
+            raise ExchangeError("order_not_found", "주문을 찾지 못했습니다.", 404)
+        if order.state != "wait":
+            raise ExchangeError("order_not_found", "이미 체결되었거나 취소된 주문입니다.", 404)
+        self.get_book(order.market).remove(order)
+        self.release(order)
+        order.state = "cancel"
+        self.notify(order.market)
+        return order
+
+    def get_order(self, uuid):
+        order = self.orders.get(uuid)
+        if order is None:
+            raise ExchangeError("order_not_found", "주문을 찾지 못했습니다.", 404)
+        return order
+
+    def get_orders(self, market=None, state="wait"):
+        return [order for order in self.orders.values() if order.state == state and (market is None or order.market == market)]
+
+    """ 업비트 accounts 응답과 같은 형태의 잔고 목록 """
+    def get_accounts(self):
+        return [{"currency": currency, "balance": str(balance[0]), "locked": str(balance[1]), "avg_buy_price": "0", "avg_buy_price_modified": False, "unit_currency": "KRW"}
+                for currency, balance in self.balances.items() if balance[0] > 0 or balance[1] > 0]
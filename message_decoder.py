@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+from array import array
+
+try:
+    import orjson  # 설치되어 있으면 표준 json보다 몇 배 빠르게 파싱함
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    loads = orjson.loads
+else:
+    import json
+    loads = json.loads  # str, bytes 모두 받음
+
+
+""" REST 응답 본문(bytes)이나 웹 소켓 메시지를 한 번만 파싱함 -> 파싱한 결과를 오류 확인과 반환에 같이 사용해야 함 """
+def decode(content):
+    return loads(content)
+
+
+class OrderbookDecoder:
+    """ 웹 소켓 crixOrderbook(SIMPLE) 메시지에서 cd, st, tms, obu만 문자열 검색으로 바로 읽어서 미리 만들어둔 배열에 씀
+        -> 메시지마다 딕셔너리, 리스트를 만들지 않음, 형식이 예상과 다르면 loads로 전체를 파싱해서 같은 배열에 씀
+        ex) {"ty":"crixOrderbook","cd":"CRIX.UPBIT.KRW-BTC","tms":1590000000000,"obu":[{"ap":1.0,"as":2.0,"bp":0.9,"bs":3.0},...],"st":"REALTIME"} """
+
+    __slots__ = ("depth", "code", "stream_type", "timestamp", "levels", "ask_price", "ask_size", "bid_price", "bid_size")
+
+    def __init__(self, depth=15):
+        self.depth = depth  # 읽을 최대 호가 단계 수
+        self.code = ""  # 마지막으로 읽은 메시지의 마켓 코드 (CRIX.UPBIT. 뒷부분), ex) "KRW-BTC"
+        self.stream_type = ""  # "SNAPSHOT" 또는 "REALTIME"
+        self.timestamp = 0  # 거래소에서 호가를 만든 시각 (ms)
+        self.levels = 0  # 읽은 호가 단계 수
+        self.ask_price = array("d", bytes(8 * depth))
+        self.ask_size = array("d", bytes(8 * depth))
+        self.bid_price = array("d", bytes(8 * depth))
+        self.bid_size = array("d", bytes(8 * depth))
+
+    """ 메시지 하나를 읽음 -> 호가 메시지가 아니면 False """
+    def decode(self, data):
+        if not isinstance(data, str):
+            data = data.decode("utf-8")
+        try:
+            if self.decode_fast(data):
+                return True
+        except ValueError:
+            pass
+        return self.decode_full(data)
+
+    def decode_fast(self, data):
+        start = data.find("\"cd\":\"")
+        obu_start = data.find("\"obu\":[")
+        if start == -1 or obu_start == -1:
+            return False
+        start = start + 6
+        self.code = data[start + 11:data.index("\"", start)]  # "CRIX.UPBIT." 제외
+        start = data.find("\"st\":\"")
+        if start == -1:
+            self.stream_type = ""
+        else:
+            start = start + 6
+            self.stream_type = data[start:data.index("\"", start)]
+        start = data.find("\"tms\":")
+        self.timestamp = 0 if start == -1 else int(self.read_number(data, start + 6))
+
+        levels = 0
+        position = obu_start + 7
+        while levels < self.depth:
+            unit_start = data.find("{", position)
+            if unit_start == -1:
+                break
+            unit_end = data.index("}", unit_start)
+            if data.rfind("]", position, unit_start) != -1:  # obu 배열이 끝남
+                break
+            self.ask_price[levels] = self.read_field(data, "\"ap\":", unit_start, unit_end)
+            self.ask_size[levels] = self.read_field(data, "\"as\":", unit_start, unit_end)
+            self.bid_price[levels] = self.read_field(data, "\"bp\":", unit_start, unit_end)
+            self.bid_size[levels] = self.read_field(data, "\"bs\":", unit_start, unit_end)
+            levels = levels + 1
+            position = unit_end + 1
+        self.levels = levels
+        return levels > 0
+
+    """ start부터 다음 , 또는 } 전까지를 숫자로 읽음 """
+    @staticmethod
+    def read_number(data, start, end=-1):
+        if end == -1:
+            end = data.find("}", start)
+        comma = data.find(",", start, end)
+        return float(data[start:end if comma == -1 else comma])
+
+    def read_field(self, data, key, start, end):
+        position = data.find(key, start, end)
+        if position == -1:
+            raise ValueError(key)
+        return self.read_number(data, position + len(key), end)
+
+    def decode_full(self, data):
+        try:
+            orderbook = loads(data)
+            self.code = orderbook["cd"][11:]
+            self.stream_type = orderbook.get("st", "")
+            self.timestamp = orderbook.get("tms", 0)
+            units = orderbook["obu"]
+        except (ValueError, KeyError, TypeError):
+            return False
+        levels = min(len(units), self.depth)
+        for level in range(0, levels):
+            unit = units[level]
+            self.ask_price[level] = unit["ap"]
+            self.ask_size[level] = unit["as"]
+            self.bid_price[level] = unit["bp"]
+            self.bid_size[level] = unit["bs"]
+        self.levels = levels
+        return levels > 0
+
+    """ 웹 소켓 orderbook의 obu와 같은 형태로 반환함 -> 가끔 호출하는 곳(출력, 사이클 엔진 등)에서 사용 """
+    def get_units(self):
+        return [{"ap": self.ask_price[level], "as": self.ask_size[level], "bp": self.bid_price[level], "bs": self.bid_size[level]}
+                for level in range(0, self.levels)]
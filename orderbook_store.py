@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from array import array
+
+
+class OrderbookStore:
+    """ 구독할 때 마켓마다 정수 번호를 붙이고, 모든 마켓의 최우선 호가를 미리 만들어둔 double 배열에 덮어씀
+        -> 호가를 받을 때마다 딕셔너리를 새로 만들지 않고, 계산할 때 "KRW-" + 코인 이름 같은 문자열도 만들지 않음 """
+
+    __slots__ = ("codes", "ids", "coin_count", "market_id", "ask_price", "ask_size", "bid_price", "bid_size", "previous_ask_price", "previous_bid_price", "received", "updated_at")
+
+    def __init__(self, codes, coin_count=0):
+        self.codes = list(codes)  # 마켓 번호 -> 마켓 코드
+        self.ids = {code: market_id for market_id, code in enumerate(self.codes)}  # 마켓 코드 -> 마켓 번호
+        self.coin_count = coin_count  # for_coins로 만든 경우 거래할 코인 수
+        self.market_id = self.ids.get("KRW-BTC", -1)  # KRW-BTC의 마켓 번호
+        count = len(self.codes)
+        # 마켓 번호 -> 값, 크기가 바뀌지 않으므로 numpy에서 그대로 뷰로 사용할 수 있음
+        self.ask_price = array("d", bytes(8 * count))
+        self.ask_size = array("d", bytes(8 * count))
+        self.bid_price = array("d", bytes(8 * count))
+        self.bid_size = array("d", bytes(8 * count))
+        self.previous_ask_price = array("d", bytes(8 * count))  # 상승세 확인에 사용할 예전 호가
+        self.previous_bid_price = array("d", bytes(8 * count))
+        self.received = array("b", bytes(count))  # 호가를 한 번이라도 받았으면 1
+        self.updated_at = array("d", bytes(8 * count))  # 마지막으로 호가를 받은 시각 (time.time()), 0이면 다시 받을 때까지 오래된 호가로 봄
+
+    """ i번째 코인의 KRW 마켓은 i번, BTC 마켓은 코인 수 + i번, KRW-BTC는 코인 수 * 2번이 되도록 만듦 -> 사이클 계산에서 번호만으로 마켓을 찾을 수 있음 """
+    @classmethod
+    def for_coins(cls, coin_list, extra_codes=()):
+        codes = ["KRW-" + coin_name for coin_name in coin_list] + ["BTC-" + coin_name for coin_name in coin_list] + ["KRW-BTC"]
+        codes = codes + [code for code in extra_codes if code not in codes]
+        return cls(codes, coin_count=len(coin_list))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def get_id(self, code):
+        return self.ids[code]
+
+    """ 최우선 호가를 덮어씀 -> shift_previous가 True면 지금 호가를 예전 호가로 옮기고, False면 예전 호가가 없을 때만 새 호가로 채움 """
+    def update(self, market_id, ask_price, ask_size, bid_price, bid_size, shift_previous=True, updated_at=0.0):
+        if shift_previous and self.received[market_id]:
+            self.previous_ask_price[market_id] = self.ask_price[market_id]
+            self.previous_bid_price[market_id] = self.bid_price[market_id]
+        elif self.previous_bid_price[market_id] == 0.0:
+            self.previous_ask_price[market_id] = ask_price
+            self.previous_bid_price[market_id] = bid_price
+        self.ask_price[market_id] = ask_price
+        self.ask_size[market_id] = ask_size
+        self.bid_price[market_id] = bid_price
+        self.bid_size[market_id] = bid_size
+        self.received[market_id] = 1
+        self.updated_at[market_id] = updated_at
+
+    """ 상승세 확인에 사용할 예전 호가를 직접 정함 """
+    def set_previous(self, market_id, ask_price, bid_price):
+        self.previous_ask_price[market_id] = ask_price
+        self.previous_bid_price[market_id] = bid_price
+
+    def is_received(self, market_id):
+        return self.received[market_id] == 1
+
+    """ now 기준으로 max_age초 안에 호가를 받았는지 확인함 -> max_age가 0이면 expire 된 마켓만 False """
+    def is_fresh(self, market_id, now, max_age):
+        updated_at = self.updated_at[market_id]
+        return updated_at > 0.0 and (max_age <= 0 or now - updated_at <= max_age)
+
+    """ 마켓들의 호가를 오래된 호가로 만듦 -> 웹 소켓이 끊기면 다시 SNAPSHOT을 받을 때까지 거래하지 않도록 함 """
+    def expire(self, market_ids):
+        for market_id in market_ids:
+            self.updated_at[market_id] = 0.0
+
+    def expire_all(self):
+        self.expire(range(0, len(self.codes)))
+
+    """ 가격 종류("ap", "ask_price" 또는 "bp", "bid_price")로 최우선 호가를 구함 -> 거래 중처럼 가끔 호출하는 곳에서 사용 """
+    def get_price(self, market_id, price_type):
+        if price_type == "ap" or price_type == "ask_price":
+            return self.ask_price[market_id]
+        return self.bid_price[market_id]
+
+    def get_previous_price(self, market_id, price_type):
+        if price_type == "ap" or price_type == "ask_price":
+            return self.previous_ask_price[market_id]
+        return self.previous_bid_price[market_id]
+
+    """ 웹 소켓 orderbook 한 단계와 같은 형태의 딕셔너리로 반환함, ex) {"ap": 1.0, "as": 2.0, "bp": 0.9, "bs": 3.0} """
+    def get_unit(self, market_id):
+        return {"ap": self.ask_price[market_id], "as": self.ask_size[market_id], "bp": self.bid_price[market_id], "bs": self.bid_size[market_id]}
+
+    def get_previous_unit(self, market_id):
+        return {"ap": self.previous_ask_price[market_id], "bp": self.previous_bid_price[market_id]}
+
+    """ 호가를 받은 마켓을 {마켓 코드: [한 단계 딕셔너리]} 형태로 반환함 -> 스냅샷 저장, 출력용 """
+    def to_dict(self):
+        return {self.codes[market_id]: [self.get_unit(market_id)] for market_id in range(0, len(self.codes)) if self.received[market_id]}
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+from array import array
+
+
+class PriceHistory:
+    """ 마켓마다 최근 capacity개의 최우선 매도, 매수 호가와 받은 시각을 원형 버퍼에 저장함
+        -> 추가할 때 리스트를 밀지 않고, "n번 전"은 바로, "window초 전"은 마켓별 포인터를 앞으로만 옮겨서 구함 """
+
+    __slots__ = ("market_count", "capacity", "window", "ask_price", "bid_price", "times", "heads", "counts", "window_slots")
+
+    def __init__(self, market_count, capacity=256, window=0.0):
+        self.market_count = market_count
+        self.capacity = capacity  # 마켓별로 저장할 최대 호가 수
+        self.window = window  # get_window_index에서 사용할 시간 (초)
+        size = market_count * capacity
+        # [마켓 번호 * capacity + 칸 번호] -> 값
+        self.ask_price = array("d", bytes(8 * size))
+        self.bid_price = array("d", bytes(8 * size))
+        self.times = array("d", bytes(8 * size))
+        self.heads = array("l", [0] * market_count)  # 다음에 쓸 칸 번호
+        self.counts = array("l", [0] * market_count)  # 저장된 호가 수
+        self.window_slots = array("l", [0] * market_count)  # window초 전 호가가 있는 칸의 순서 (가장 오래된 호가부터 0번), 추가할 때마다 1씩 줄어듦
+
+    def append(self, market_id, ask_price, bid_price, timestamp):
+        index = market_id * self.capacity + self.heads[market_id]
+        self.ask_price[index] = ask_price
+        self.bid_price[index] = bid_price
+        self.times[index] = timestamp
+        self.heads[market_id] = (self.heads[market_id] + 1) % self.capacity
+        if self.counts[market_id] < self.capacity:
+            self.counts[market_id] = self.counts[market_id] + 1
+        elif self.window_slots[market_id] > 0:  # 가장 오래된 호가가 지워졌으므로 순서가 하나씩 당겨짐
+            self.window_slots[market_id] = self.window_slots[market_id] - 1
+
+    def get_count(self, market_id):
+        return self.counts[market_id]
+
+    """ n번 전에 추가한 호가가 있는 배열 위치 (0이면 가장 최근) -> 그만큼 저장되어 있지 않으면 가장 오래된 호가, 하나도 없으면 -1 """
+    def get_index(self, market_id, n=0):
+        count = self.counts[market_id]
+        if count == 0:
+            return -1
+        if n > count - 1:
+            n = count - 1
+        return market_id * self.capacity + (self.heads[market_id] - 1 - n) % self.capacity
+
+    """ 가장 오래된 호가부터 order번째 호가의 배열 위치 """
+    def get_index_from_oldest(self, market_id, order):
+        return self.get_index(market_id, self.counts[market_id] - 1 - order)
+
+    """ 시각 now 기준으로 window초 이상 지난 호가 중 가장 최근 호가의 배열 위치 -> 시간 순서대로 추가되므로 포인터를 앞으로만 옮기면 됨 (호가 하나당 평균 O(1))
+        window초 전 호가가 아직 없으면 가장 오래된 호가, 하나도 없으면 -1 """
+    def get_window_index(self, market_id, now):
+        count = self.counts[market_id]
+        if count == 0:
+            return -1
+        order = self.window_slots[market_id]
+        limit = now - self.window
+        while order + 1 < count and self.times[self.get_index_from_oldest(market_id, order + 1)] <= limit:
+            order = order + 1
+        self.window_slots[market_id] = order
+        return self.get_index_from_oldest(market_id, order)
+
+    """ 시각 now 기준으로 seconds초 이상 지난 호가 중 가장 최근 호가의 배열 위치 -> 아무 시간이나 물어볼 수 있도록 이진 탐색함 """
+    def get_index_before(self, market_id, seconds, now):
+        count = self.counts[market_id]
+        if count == 0:
+            return -1
+        limit = now - seconds
+        low = 0
+        high = count - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.times[self.get_index_from_oldest(market_id, middle)] <= limit:
+                low = middle
+            else:
+                high = middle - 1
+        return self.get_index_from_oldest(market_id, low)
+
+    """ 배열 위치의 호가를 가격 종류("ap", "ask_price" 또는 "bp", "bid_price")로 구함 """
+    def get_price(self, index, price_type):
+        if price_type == "ap" or price_type == "ask_price":
+            return self.ask_price[index]
+        return self.bid_price[index]
+
+    """ 최근 count개 (None이면 저장된 모든) 호가의 배열 위치 목록, 오래된 호가부터 -> 출력용 """
+    def get_indexes(self, market_id, count=None):
+        count = self.counts[market_id] if count is None else min(count, self.counts[market_id])
+        return [self.get_index(market_id, n) for n in range(count - 1, -1, -1)]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import time
+from threading import Lock
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = float(rate)  # 초당 요청 가능 횟수
+        self.capacity = float(rate)  # 한 번에 몰아서 보낼 수 있는 최대 요청 수
+        self.tokens = float(rate)  # 현재 남아있는 요청 수 (음수면 이미 예약된 요청이 있다는 뜻)
+        self.last = time.monotonic()  # 마지막으로 토큰을 채운 시각
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    """ 요청 하나를 예약하고, 요청을 보내기 전까지 기다려야 하는 시간(초)을 반환함 """
+    def reserve(self, now):
+        self.refill(now)
+        self.tokens = self.tokens - 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    """ 남은 요청이 있으면 하나 사용하고 0을, 없으면 사용하지 않고 다음 요청이 가능해질 때까지의 시간(초)을 반환함 """
+    def try_reserve(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens = self.tokens - 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    """ 업비트가 알려준 이번 1초 동안의 남은 요청 수로 토큰 수를 맞춤 """
+    def sync(self, now, remaining_sec):
+        self.refill(now)
+        if remaining_sec + 1 > self.capacity:  # 실제 허용량이 생각보다 크면 늘려줌
+            self.capacity = float(remaining_sec + 1)
+            self.rate = self.capacity
+        self.tokens = min(self.tokens, float(remaining_sec))
+
+
+class RateLimiter:
+    """ Remaining-Req 헤더를 읽어서 요청 그룹별로 남은 요청 수만큼만 보내도록 조절함 """
+
+    # 업비트 요청 그룹별 초당 요청 제한 (헤더를 받기 전까지 사용하는 기본값)
+    DEFAULT_RATE = {"order": 8, "default": 30, "market": 10, "candles": 10, "orderbook": 10, "ticker": 10, "trades": 10}
+
+    def __init__(self):
+        self.lock = Lock()
+        self.buckets = {}  # 그룹 이름 -> TokenBucket
+        self.path_groups = {}  # (path, method) -> 응답 헤더로 확인한 그룹 이름
+
+    """ 요청 경로로 요청 그룹을 구함 -> 응답 헤더로 확인된 그룹이 있으면 그걸 사용 """
+    def get_group(self, path, method="get"):
+        group = self.path_groups.get((path, method))
+        if group is not None:
+            return group
+        if path == "orders" and method == "post":
+            return "order"
+        if path.startswith("candles"):
+            return "candles"
+        if path.startswith("market"):
+            return "market"
+        if path in ("orderbook", "ticker"):
+            return path
+        if path.startswith("trades"):
+            return "trades"
+        return "default"
+
+    def get_bucket(self, group):
+        bucket = self.buckets.get(group)
+        if bucket is None:
+            bucket = TokenBucket(self.DEFAULT_RATE.get(group, 10))
+            self.buckets[group] = bucket
+        return bucket
+
+    """ 요청을 하나 예약하고 기다려야 하는 시간을 반환함 -> 비동기 코드에서는 asyncio.sleep으로 기다리면 됨 """
+    def reserve(self, group):
+        with self.lock:
+            return self.get_bucket(group).reserve(time.monotonic())
+
+    """ 남은 요청이 있을 때만 예약함 -> 우선순위가 높은 요청이 끼어들 수 있도록 기다리는 동안에는 예약하지 않음 """
+    def try_reserve(self, group):
+        with self.lock:
+            return self.get_bucket(group).try_reserve(time.monotonic())
+
+    """ 요청을 보내도 될 때까지 기다림 """
+    def acquire(self, group):
+        wait = self.reserve(group)
+        if wait > 0:
+            time.sleep(wait)
+
+    """ 응답 헤더의 Remaining-Req (ex: group=default; min=1799; sec=29) 를 읽어 남은 요청 수를 반영함 """
+    def update(self, headers, path=None, method="get"):
+        remaining = headers.get("Remaining-Req")
+        if remaining is None:
+            return
+        values = {}
+        for item in remaining.split(";"):
+            if "=" in item:
+                key, value = item.split("=", 1)
+                values[key.strip()] = value.strip()
+        group = values.get("group")
+        if group is None or "sec" not in values:
+            return
+        try:
+            remaining_sec = int(values["sec"])
+            if int(values.get("min", 1)) <= 0:  # 1분 제한까지 다 쓴 경우
+                remaining_sec = 0
+        except ValueError:
+            return
+        with self.lock:
+            if path is not None:
+                self.path_groups[(path, method)] = group
+            self.get_bucket(group).sync(time.monotonic(), remaining_sec)
+
+    """ too_many_requests를 받은 경우 -> 이미 예약된 요청이 없으면 다음 토큰이 찰 때까지만 기다리도록 함 """
+    def penalize(self, group):
+        with self.lock:
+            bucket = self.get_bucket(group)
+            bucket.refill(time.monotonic())
+            bucket.tokens = min(bucket.tokens, 0.0)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+""" 기록한 호가(market_recorder)를 웹 소켓 버전과 같은 수익 계산 코드에 다시 흘려보내서, 실제로 거래를 시작했을 호가를 모두 찾음
+    시뮬레이션 시계를 사용하므로 time.time(), time.sleep()이 실제 시간을 기다리지 않음
+    ex) python replay.py recordings/orderbook-20200101-090000.bin --speed 0 --set profit=1.004 --set orderbook_difference_rate=1.003 """
+
+import argparse
+import configparser
+import time
+import upbit_machine_with_websocket
+import vector_scanner
+from vector_scanner import VectorScanner
+from market_recorder import Recording, FLAG_SNAPSHOT
+from message_decoder import OrderbookDecoder
+
+
+class SimulatedClock:
+    """ time 모듈 대신 사용하는 시계 -> time()은 기록된 시각을 반환하고, sleep()은 기다리지 않고 시각만 앞으로 옮김 """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now = self.now + seconds
+
+    def set(self, now):
+        if now > self.now:  # 기록이 여러 스레드에서 섞여 들어와도 시각이 거꾸로 가지 않음
+            self.now = now
+
+    """ 나머지(strftime, localtime 등)는 실제 time 모듈을 사용함 """
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class ReplayMachine(upbit_machine_with_websocket.UpbitMachine):
+    """ 네트워크에 연결하지 않고 config.ini의 MACHINE 항목만 불러온 봇 -> 거래를 시작하는 대신 거래할 호가를 opportunities에 모음
+        거래를 시작하면 라이브처럼 trade_duration초 동안은 다른 거래를 하지 않고, settle_delay초 뒤의 호가로 실제 수익률을 다시 계산함 """
+
+    def __init__(self, trade_coin_list, config_path="config.ini", overrides=None, trade_duration=1.0, settle_delay=0.0):
+        config = configparser.ConfigParser()
+        config.read(config_path, encoding="utf-8-sig")
+        overrides = overrides or {}
+        for name, value in overrides.items():  # 바꿔볼 설정값 -> config.ini에 적은 값과 똑같이 load_machine_config가 읽고 확인함
+            config["MACHINE"][name] = str(value)
+        try:
+            self.load_machine_config(config)
+        except ValueError as e:
+            raise Exception("설정값을 읽을 수 없습니다. " + str(overrides) + " -> " + str(e))
+        unknown = [name for name in overrides if type(getattr(self, name, None)) not in (int, float, str)]  # load_machine_config가 읽지 않는 이름
+        if len(unknown) > 0:
+            raise Exception(", ".join(unknown) + "은(는) 웹 소켓 버전에서 사용하지 않는 설정값입니다.")
+        self.cycle_search = 0  # 기록에는 사이클 탐색용 마켓 목록이 없음
+        self.orderbook_depth = 1  # 기록에는 최우선 호가만 있음
+        self.record_orderbook = 0
+        self.latency_tracing = 0  # 시뮬레이션 시계로는 지연 시간을 잴 수 없음
+        self.init_feed_state()
+        self.feed_connected.set()
+        self.wallet = None
+        self.opportunities = []  # 거래를 시작했을 호가, [{"time", "coin", "cycle", "profit", "optimal_volume", "order_volume", "prices", "realized_profit"}, ...]
+        self.trade_duration = trade_duration  # 거래 한 번에 걸린다고 볼 시간 (초)
+        self.settle_delay = settle_delay  # 거래를 시작하고 몇 초 뒤의 호가로 실제 수익률을 계산할지 (0이면 예상 수익률과 같음)
+        self.trading_until = 0.0  # 이 시각까지는 거래 중
+        self.unsettled = []  # 실제 수익률을 아직 계산하지 않은 거래 기회
+        self.trade_coin_list = trade_coin_list
+        self.trade_coin_str = self.get_trade_coin_str()
+        if self.vectorized_scan == 1 and vector_scanner.is_available():
+            self.vector_scanner = VectorScanner(self.orderbook_store)
+
+    def start_trade(self, coin_num, max_profit_cycle_num, max_profit, optimal_volume, order_volume, prices=None):
+        now = upbit_machine_with_websocket.time.time()
+        opportunity = {"time": now, "coin": self.trade_coin_list[coin_num], "cycle": max_profit_cycle_num,
+                       "profit": max_profit, "optimal_volume": optimal_volume, "order_volume": order_volume, "prices": prices, "realized_profit": None}
+        self.opportunities.append(opportunity)
+        self.unsettled.append((coin_num, opportunity))
+        self.trading = True
+        self.trading_until = now + self.trade_duration
+        self.settle(now)
+
+    """ settle_delay초가 지난 거래 기회의 실제 수익률을 지금 호가로 계산하고, 거래 시간이 끝났으면 다시 거래할 수 있게 함 -> final이면 남은 기회를 모두 계산함 """
+    def settle(self, now, final=False):
+        while len(self.unsettled) > 0 and (final or self.unsettled[0][1]["time"] + self.settle_delay <= now):
+            coin_num, opportunity = self.unsettled.pop(0)
+            opportunity["realized_profit"] = self.calculate_profit_of_cycle(coin_num, opportunity["cycle"])
+        if self.trading and now >= self.trading_until:
+            self.trading = False
+
+
+""" for_coins로 만든 마켓 코드 목록에서 거래할 코인 목록을 구함 -> [KRW-코인..., BTC-코인..., KRW-BTC, ...] """
+def get_trade_coin_list(codes):
+    coin_count = codes.index("KRW-BTC") // 2
+    return [code[4:] for code in codes[0:coin_count]]
+
+
+""" 거래 기회 목록의 (예상 수익 합, 실제 수익 합 (비트 기준), 적중률) -> 적중률은 실제 수익률이 1 이상인 거래의 비율 """
+def summarize(opportunities):
+    expected = sum(opportunity["order_volume"] * (opportunity["profit"] - 1) for opportunity in opportunities)
+    realized = sum(opportunity["order_volume"] * (opportunity["realized_profit"] - 1) for opportunity in opportunities)
+    hits = sum(1 for opportunity in opportunities if opportunity["realized_profit"] >= 1)
+    return expected, realized, hits / len(opportunities) if len(opportunities) > 0 else 0.0
+
+
+""" 기록 파일들을 순서대로 다시 흘려보내고 거래를 시작했을 호가 목록을 반환함
+    speed : 0이면 최대한 빠르게, 1이면 실제 시간, 10이면 10배 빠르게 """
+def replay(paths, speed=0.0, config_path="config.ini", overrides=None, trade_duration=1.0, settle_delay=0.0):
+    recordings = [Recording(path) for path in paths]
+    if len(recordings) == 0:
+        return []
+    clock = SimulatedClock()
+    real_time = upbit_machine_with_websocket.time
+    upbit_machine_with_websocket.time = clock
+    try:
+        machine = ReplayMachine(get_trade_coin_list(recordings[0].codes), config_path, overrides, trade_duration, settle_delay)
+        store = machine.orderbook_store
+        decoder = OrderbookDecoder(1)
+        decoder.levels = 1
+        started_at = None  # (실제 시작 시각, 기록의 첫 시각)
+        for recording in recordings:
+            market_ids = [store.ids.get(code, -1) for code in recording.codes]  # 기록 파일의 마켓 번호 -> 이 봇의 마켓 번호
+            for receive_time, exchange_time, market_id, flags, ask_price, ask_size, bid_price, bid_size in recording:
+                if market_ids[market_id] == -1:
+                    continue
+                clock.set(receive_time)
+                if speed > 0:
+                    if started_at is None:
+                        started_at = (real_time.time(), receive_time)
+                    delay = (receive_time - started_at[1]) / speed - (real_time.time() - started_at[0])
+                    if delay > 0:
+                        real_time.sleep(delay)
+                decoder.code = store.codes[market_ids[market_id]]
+                decoder.stream_type = "SNAPSHOT" if flags & FLAG_SNAPSHOT else "REALTIME"
+                decoder.timestamp = exchange_time
+                decoder.ask_price[0] = ask_price
+                decoder.ask_size[0] = ask_size
+                decoder.bid_price[0] = bid_price
+                decoder.bid_size[0] = bid_size
+                machine.apply_orderbook(decoder)
+                machine.settle(clock.time())
+                all_coins, dirty_coins = machine.dirty_coins.wait(0)  # 라이브에서는 계산하는 동안 바뀐 코인이 합쳐지지만, 리플레이에서는 호가마다 계산함
+                if all_coins or len(dirty_coins) > 0:
+                    machine.evaluate_coins(all_coins, dirty_coins)
+            recording.close()
+        machine.settle(clock.time(), final=True)
+        return machine.opportunities
+    finally:
+        upbit_machine_with_websocket.time = real_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기록한 호가로 수익 계산 로직을 다시 실행함")
+    parser.add_argument("paths", nargs="+", help="market_recorder로 기록한 .bin 파일")
+    parser.add_argument("--speed", type=float, default=0.0, help="0이면 최대한 빠르게, 1이면 실제 시간")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--set", action="append", default=[], help="바꿔볼 설정값, ex) profit=1.004")
+    parser.add_argument("--trade-duration", type=float, default=1.0, help="거래 한 번에 걸린다고 볼 시간 (초)")
+    parser.add_argument("--settle-delay", type=float, default=0.0, help="몇 초 뒤의 호가로 실제 수익률을 계산할지")
+    args = parser.parse_args()
+    if any("=" not in item for item in args.set):
+        parser.error("--set은 이름=값 형식으로 적어주세요, ex) profit=1.004")
+    overrides = dict(item.split("=", 1) for item in args.set)
+    before = time.time()
+    try:
+        opportunities = replay(args.paths, args.speed, args.config, overrides, trade_duration=args.trade_duration, settle_delay=args.settle_delay)
+    except Exception as e:
+        parser.error(str(e))
+    elapsed = time.time() - before
+    for opportunity in opportunities:  # 실제 수익률은 리플레이가 끝나야 모두 계산되므로 끝난 뒤에 출력함
+        print(opportunity)
+    expected, realized, hit_rate = summarize(opportunities)
+    print("거래 기회 : " + str(len(opportunities)) + "번, 걸린 시간 : " + str("{:.3f}".format(elapsed)) + "초")
+    print("예상 수익 : " + "{:.8f}".format(expected) + " BTC, 실제 수익 : " + "{:.8f}".format(realized) + " BTC (" + "{:g}".format(args.settle_delay) + "초 뒤 호가 기준), 적중률 : " + "{:.1%}".format(hit_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from threading import Condition
+
+# 요청 우선순위 -> 숫자가 작을수록 먼저 처리함
+PRIORITY_ORDER = 0  # 주문, 주문 취소
+PRIORITY_ORDER_STATUS = 1  # 주문 조회, 거래 중 지갑 조회
+PRIORITY_MARKET_DATA = 2  # 호가, 시세
+PRIORITY_HOUSEKEEPING = 3  # 주기적인 지갑 조회, 캔들, 마켓 목록
+
+
+class RequestScheduler:
+    """ api_query 앞에서 요청 순서를 정함 -> 같은 요청 그룹에서는 우선순위가 높은 요청이 먼저 남은 요청 수를 사용하고, 거래 중에는 우선순위가 가장 낮은 요청을 보내지 않음 """
+
+    PREEMPTED_WAIT = 0.05  # 우선순위에 밀린 요청이 다시 확인하기까지 기다리는 시간 (초)
+
+    def __init__(self, rate_limiter, is_trading=None):
+        self.rate_limiter = rate_limiter
+        self.is_trading = is_trading if is_trading is not None else (lambda: False)  # 거래 사이클이 진행 중인지 알려주는 함수
+        self.condition = Condition()
+        self.waiting = {}  # 요청 그룹 -> 우선순위별로 기다리는 요청 수
+
+    """ 요청 경로와 방식으로 기본 우선순위를 구함 """
+    @staticmethod
+    def get_priority(path, method="get"):
+        if path in ("orders", "order"):
+            if method == "post" or method == "delete":
+                return PRIORITY_ORDER
+            return PRIORITY_ORDER_STATUS
+        if path == "accounts":  # 거래 중 잔고 확인에 쓰이므로 주기적인 조회는 호출하는 쪽에서 낮춰줌
+            return PRIORITY_ORDER_STATUS
+        if path in ("orderbook", "ticker") or path.startswith("trades"):
+            return PRIORITY_MARKET_DATA
+        return PRIORITY_HOUSEKEEPING
+
+    def enter(self, group, priority):
+        with self.condition:
+            if group not in self.waiting:
+                self.waiting[group] = [0, 0, 0, 0]
+            self.waiting[group][priority] = self.waiting[group][priority] + 1
+
+    def leave(self, group, priority):
+        with self.condition:
+            self.waiting[group][priority] = self.waiting[group][priority] - 1
+            self.condition.notify_all()
+
+    """ 지금 요청을 보내도 되면 0을, 아니면 다시 확인하기까지 기다릴 시간(초)을 반환함 -> enter 후에 호출해야 함 """
+    def try_acquire(self, group, priority):
+        with self.condition:
+            if priority >= PRIORITY_HOUSEKEEPING and self.is_trading():  # 거래 중에는 낮은 우선순위 요청을 미룸
+                return self.PREEMPTED_WAIT
+            waiting = self.waiting[group]
+            for higher_priority in range(0, priority):
+                if waiting[higher_priority] > 0:
+                    return self.PREEMPTED_WAIT
+            return self.rate_limiter.try_reserve(group)
+
+    """ 요청을 보내도 될 차례가 될 때까지 기다림 """
+    def acquire(self, group, priority):
+        self.enter(group, priority)
+        try:
+            with self.condition:
+                wait = self.try_acquire(group, priority)
+                while wait > 0:
+                    self.condition.wait(wait)
+                    wait = self.try_acquire(group, priority)
+        finally:
+            self.leave(group, priority)
+
+    async def acquire_async(self, group, priority):
+        self.enter(group, priority)
+        try:
+            wait = self.try_acquire(group, priority)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self.try_acquire(group, priority)
+        finally:
+            self.leave(group, priority)
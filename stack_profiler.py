@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import linecache
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from thread_stats import get_thread_cpu_time
+
+# 맨 위 프레임이 이 모듈에 있으면 네트워크(또는 파이프) 응답을 기다리는 중으로 봄 -> asyncio 이벤트 루프가 소켓을 기다리는 selectors 포함
+NETWORK_MODULES = ("socket", "ssl", "selectors", "http.client", "urllib3", "requests", "websockets", "aiohttp", "pymysql", "multiprocessing.connection")
+FLAG_FILE = "PROFILE"  # 프로파일링 폴더에 이 이름의 파일이 있는 동안 프로파일링을 켬
+LOCK_FUNCTIONS = ("wait", "wait_for", "_wait_for_tstate_lock", "join", "acquire", "get")  # threading, queue 모듈에서 다른 스레드를 기다리는 함수
+STATES = ("running", "network", "sleep", "lock")
+
+
+class StackProfiler:
+    """ interval초마다 sys._current_frames()로 모든 스레드의 호출 스택을 읽어서 세고, 끝나면 플레임 그래프용 collapsed stack 파일을 씀
+        ex) calculate_profit;upbit_machine_with_websocket:calculate_profit;upbit_machine_with_websocket:evaluate_coins;[running] 1234
+        -> flamegraph.pl, speedscope 등에 그대로 넣을 수 있음, 코드에 계측을 넣지 않으므로 켜지 않았을 때는 비용이 없음
+        맨 위 프레임으로 스레드가 네트워크, time.sleep, 다른 스레드(락)를 기다리는지 나누고,
+        실행 중이었던 시간에서 실제로 사용한 CPU 시간을 뺀 나머지를 GIL을 기다린 시간으로 추정함 """
+
+    def __init__(self, directory="profiles", interval=0.01):
+        self.directory = directory  # 결과 파일을 저장할 폴더
+        self.interval = interval  # 스택을 읽는 간격 (초)
+        self.lock = threading.Lock()
+        self.thread = None  # 스택을 읽는 스레드
+        self.stop_event = threading.Event()
+        self.labels = {}  # 코드 객체 -> "모듈:함수" (매번 문자열을 만들지 않음)
+        self.reset()
+
+    def reset(self):
+        self.stacks = Counter()  # collapsed stack 문자열 -> 샘플 수
+        self.names = {}  # 스레드 번호 -> 스레드 이름 (이름이 같은 스레드는 collapsed stack에서 합쳐짐)
+        self.states = {}  # 스레드 번호 -> Counter(상태 -> 샘플 수)
+        self.native_ids = {}  # 스레드 번호 -> 운영체제 스레드 번호
+        self.start_cpu_times = {}  # 스레드 번호 -> 처음 본 순간의 CPU 시간 (초)
+        self.samples = 0
+        self.started_at = 0.0
+        self.own_cpu_time = 0.0  # 스택을 읽는 데 사용한 CPU 시간 (초) -> 프로파일러 자신의 비용
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    """ 프로파일링을 시작함 -> duration초가 지나면 (0이면 stop을 부를 때까지) 멈추고 결과를 저장, 출력함 """
+    def start(self, duration=0.0):
+        with self.lock:
+            if self.is_running():
+                return False
+            self.reset()
+            self.stop_event.clear()
+            self.started_at = time.time()
+            self.thread = threading.Thread(target=self.run, args=(duration,), name="stack_profiler", daemon=True)
+            self.thread.start()
+            print("프로파일링을 시작합니다. (" + ("{:.0f}초".format(duration) if duration > 0 else "멈출 때까지") + ", " + "{:.0f}ms".format(self.interval * 1000) + "마다 스택 확인)")
+            return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    """ 켜져 있으면 멈추고, 꺼져 있으면 duration초 동안 켬 """
+    def toggle(self, duration=0.0):
+        if self.is_running():
+            self.stop()
+        else:
+            self.start(duration)
+
+    def run(self, duration):
+        own_id = threading.get_ident()
+        cpu_started_at = time.thread_time()
+        while not self.stop_event.wait(self.interval):
+            self.sample(own_id)
+            if duration > 0 and time.time() - self.started_at >= duration:
+                break
+        self.own_cpu_time = time.thread_time() - cpu_started_at
+        path = self.save()
+        print(self.get_report())
+        print("플레임 그래프 파일 : " + path)
+
+    def sample(self, own_id):
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_id:
+                continue
+            thread = threads.get(ident)
+            name = thread.name if thread is not None else str(ident)
+            if ident not in self.states:
+                self.names[ident] = name
+                self.states[ident] = Counter()
+                native_id = getattr(thread, "native_id", None)
+                if native_id is not None:
+                    self.native_ids[ident] = native_id
+                    self.start_cpu_times[ident] = get_thread_cpu_time(native_id)
+            state = self.get_state(frame)
+            self.states[ident][state] += 1
+            labels = []
+            while frame is not None:
+                labels.append(self.get_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(name)
+            labels.reverse()
+            labels.append("[" + state + "]")
+            self.stacks[";".join(labels)] += 1
+        self.samples = self.samples + 1
+
+    def get_label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = module + ":" + getattr(code, "co_qualname", code.co_name)
+            self.labels[code] = label
+        return label
+
+    """ 맨 위 프레임으로 스레드 상태를 정함 -> "network", "sleep", "lock", "running" """
+    @staticmethod
+    def get_state(frame):
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(NETWORK_MODULES):
+            return "network"
+        if module in ("threading", "queue") and frame.f_code.co_name in LOCK_FUNCTIONS:
+            return "lock"
+        if "sleep(" in linecache.getline(frame.f_code.co_filename, frame.f_lineno) and not module.startswith("asyncio"):
+            return "sleep"
+        return "running"
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "profile-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at)) + ".folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(stack + " " + str(count) + "\n")
+        return path
+
+    """ 스레드 번호 -> {"name", "samples", "cpu", "running", "network", "sleep", "lock", "gil"} -> 이름, 샘플 수 외에는 프로파일링한 시간 대비 비율 """
+    def get_thread_summary(self):
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        summary = {}
+        for ident, states in self.states.items():
+            samples = sum(states.values())
+            values = {"name": self.names[ident], "samples": samples}
+            for state in STATES:
+                values[state] = states[state] / self.samples if self.samples > 0 else 0.0
+            cpu = None
+            start_cpu_time = self.start_cpu_times.get(ident)
+            if start_cpu_time is not None:
+                cpu_time = get_thread_cpu_time(self.native_ids[ident])
+                if cpu_time is not None:
+                    cpu = (cpu_time - start_cpu_time) / elapsed
+            values["cpu"] = cpu
+            values["gil"] = max(values["running"] - cpu, 0.0) if cpu is not None else None  # 실행 중이었는데 CPU를 쓰지 못한 시간
+            summary[ident] = values
+        return summary
+
+    def get_report(self):
+        lines = ["스레드별 시간 비율 (" + "{:.1f}".format(time.time() - self.started_at) + "초, 샘플 " + str(self.samples) + "번)",
+                 "스레드\t\t\tCPU\t실행\t네트워크\tsleep\t락\tGIL 대기"]
+        for values in sorted(self.get_thread_summary().values(), key=lambda values: -values["running"]):
+            cells = [values["name"].ljust(24)[0:24]]
+            cells.append("{:.0%}".format(values["cpu"]) if values["cpu"] is not None else "-")
+            cells = cells + ["{:.0%}".format(values[state]) for state in STATES]
+            cells.append("{:.0%}".format(values["gil"]) if values["gil"] is not None else "-")
+            lines.append("\t".join(cells))
+        lines.append("프로파일러 CPU : " + "{:.0%}".format(self.own_cpu_time / max(time.time() - self.started_at, 1e-9)) + " (CPU가 -인 스레드는 이 운영체제에서 다른 스레드의 CPU 시간을 읽을 수 없는 경우)")
+        return "\n".join(lines)
+
+
+""" SIGUSR1을 받으면 프로파일링을 켜고 끔 -> 메인 스레드에서 불러야 함, SIGUSR1이 없는 운영체제(윈도우)에서는 False """
+def install_signal_toggle(profiler, duration=0.0):
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+    signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=profiler.toggle, args=(duration,), daemon=True).start())
+    return True
+
+
+""" directory/PROFILE 파일이 생기면 프로파일링을 켜고, 지우면 끔 -> 시그널이 없는 운영체제(윈도우)에서도 사용할 수 있음, interval초마다 확인함
+    duration초가 지나서 멈춘 뒤에는 파일을 지웠다가 다시 만들어야 다시 켜짐 """
+def watch_flag_file(profiler, directory, duration=0.0, interval=1.0):
+    path = os.path.join(directory, FLAG_FILE)
+    os.makedirs(directory, exist_ok=True)
+
+    def watch():
+        existed = False
+        while True:
+            exists = os.path.exists(path)
+            if exists and not existed:
+                profiler.start(duration)
+            elif existed and not exists and profiler.is_running():
+                profiler.stop()
+            existed = exists
+            time.sleep(interval)
+
+    threading.Thread(target=watch, name="profile_flag", daemon=True).start()
+    return path
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+
+
+""" 재시작할 때 바로 거래를 시작할 수 있도록 상태를 파일에 저장함 -> 임시 파일에 쓴 뒤 바꿔치기해서 저장 도중에 꺼져도 파일이 깨지지 않음 """
+def save_snapshot(path, state):
+    state = dict(state)
+    state["saved_at"] = time.time()
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        print("스냅샷 저장 실패 : " + repr(e))
+
+
+""" 저장된 상태를 불러옴 -> 파일이 없거나, 깨졌거나, ttl(초)보다 오래되었으면 None을 반환 """
+def load_snapshot(path, ttl):
+    if ttl <= 0 or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print("스냅샷 불러오기 실패 : " + repr(e))
+        return None
+    age = time.time() - state.get("saved_at", 0)
+    if age > ttl:
+        print("스냅샷이 " + str(round(age)) + "초 전에 저장되어 사용하지 않습니다.")
+        return None
+    return state
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+import websockets
+from message_decoder import OrderbookDecoder
+
+WEBSOCKET_URI = "wss://crix-ws.upbit.com/websocket"
+PINNED_CODES = ("KRW-BTC",)  # 모든 사이클에 쓰이므로 항상 혼자 한 연결을 사용하는 마켓
+DISCONNECTED = "DISCONNECTED"  # 작업 프로세스의 연결이 끊겼을 때 보내는 메시지 종류
+
+
+""" 웹 소켓 구독 요청 문자열, ex) [{"ticket":"auto_trading"},{"format":"SIMPLE"},{"type":"crixOrderbook","codes":["CRIX.UPBIT.KRW-BTC.1", ...]}] """
+def get_request(codes, depth=1):
+    code_str = ",".join("\"CRIX.UPBIT." + code + "." + str(depth) + "\"" for code in codes)
+    return "[{\"ticket\":\"auto_trading\"},{\"format\":\"SIMPLE\"},{\"type\":\"crixOrderbook\",\"codes\":[" + code_str + "]}]"
+
+
+class SubscriptionManager:
+    """ 구독할 마켓을 여러 웹 소켓 연결(샤드)로 나누고, 필요하면 샤드를 여러 작업 프로세스에 나눠줌
+        -> 마켓 수가 늘어도 연결 하나, 디코딩 루프 하나가 모든 호가를 처리하지 않도록 함
+        연결이 2개 이상이면 KRW-BTC는 항상 첫 번째 샤드에 혼자 들어가고, 메인 프로세스에서 받음 """
+
+    def __init__(self, codes, connections=1, processes=0):
+        self.connections = max(connections, 1)  # 웹 소켓 연결 수
+        self.processes = max(processes, 0)  # 샤드를 나눠 받을 작업 프로세스 수 (0이면 모두 메인 프로세스에서 받음)
+        self.shards = self.split(list(codes), self.connections)  # 연결 번호 -> 구독할 마켓 코드 목록
+
+    """ KRW-BTC를 맨 앞에 두고, 연결이 2개 이상이면 KRW-BTC만 첫 번째 연결에 넣은 뒤 나머지를 남은 연결에 번갈아 나눔 -> 거래량 순서대로 들어온 마켓이 고르게 섞임 """
+    @staticmethod
+    def split(codes, connections):
+        pinned = [code for code in PINNED_CODES if code in codes]
+        others = [code for code in codes if code not in pinned]
+        if connections == 1 or len(others) == 0:
+            return [pinned + others]
+        count = min(connections - 1, len(others))
+        return [pinned] + [others[shard::count] for shard in range(0, count)]
+
+    """ 메인 프로세스에서 받을 샤드 목록 -> 작업 프로세스를 쓰면 KRW-BTC가 들어있는 첫 번째 샤드만 """
+    def get_local_shards(self):
+        if self.processes == 0 or len(self.shards) == 1:
+            return self.shards
+        return self.shards[0:1]
+
+    """ 작업 프로세스 번호 -> 받을 샤드 목록 """
+    def get_process_shards(self):
+        if self.processes == 0 or len(self.shards) == 1:
+            return []
+        remote = self.shards[1:]
+        count = min(self.processes, len(remote))
+        return [remote[process::count] for process in range(0, count)]
+
+
+""" 작업 프로세스에서 샤드마다 웹 소켓을 연결해 디코딩까지 하고, 읽은 호가를 배열 그대로 connection으로 메인 프로세스에 보냄
+    메시지 : (마켓 코드, "SNAPSHOT" / "REALTIME", tms, 단계 수, 매도 호가, 매도 잔량, 매수 호가, 매수 잔량, 받은 시각) 또는 ("", DISCONNECTED, 마켓 코드 목록) """
+def run_worker(shards, depth, connection, ping_interval=20, reconnect_delay=0.5, max_reconnect_delay=30.0, uri=WEBSOCKET_URI):
+    async def receive(codes):
+        delay = reconnect_delay
+        while True:
+            connected_at = time.time()
+            try:
+                async with websockets.connect(uri, ping_interval=ping_interval, ping_timeout=ping_interval) as websocket:
+                    await websocket.send(get_request(codes, depth))
+                    decoder = OrderbookDecoder(depth)
+                    while True:
+                        recv_data = await websocket.recv()
+                        received_at = time.time()
+                        if not decoder.decode(recv_data):
+                            continue
+                        levels = decoder.levels
+                        connection.send((decoder.code, decoder.stream_type, decoder.timestamp, levels,
+                                         decoder.ask_price[0:levels], decoder.ask_size[0:levels], decoder.bid_price[0:levels], decoder.bid_size[0:levels], received_at))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("작업 프로세스의 웹 소켓 연결이 끊겼습니다. " + repr(e))
+            connection.send(("", DISCONNECTED, codes))
+            if time.time() - connected_at > max_reconnect_delay:  # 한동안 연결되어 있었으면 바로 다시 연결함
+                delay = reconnect_delay
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_reconnect_delay)
+
+    async def main():
+        await asyncio.gather(*[receive(codes) for codes in shards])
+
+    asyncio.run(main())
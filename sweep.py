@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+""" 기록한 호가로 MACHINE 설정값 조합을 한꺼번에 리플레이해서 수익 순으로 정리함
+    조합마다 작업 프로세스 하나가 replay를 실행하고, 기록 파일은 작업 프로세스마다 메모리 맵으로 열기 때문에 같은 페이지 캐시를 공유함 (복사하지 않음)
+    ex) python sweep.py recordings/*.bin --grid profit=1.002,1.003,1.004 --grid trade_if_rising=0,1 --settle-delay 0.5 """
+
+import argparse
+import contextlib
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import replay
+
+# 바꿔볼 수 있는 설정값 -> orderbook_check_interval은 REST 버전의 상승세 확인에만 쓰이고 리플레이 결과에 영향이 없으므로 뺌 (상승세 확인 구간은 trend_window로 바꿔봄)
+SWEEP_PARAMETERS = ("profit", "orderbook_difference_rate", "trade_if_rising", "minimum_by_bitcoin", "maximum_by_bitcoin", "trend_window", "stale_market_seconds")
+
+
+""" {"profit": ["1.002", "1.003"], "trade_if_rising": ["0", "1"]} -> 모든 조합 [{"profit": "1.002", "trade_if_rising": "0"}, ...] """
+def get_combinations(grid):
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+
+""" 작업 프로세스에서 조합 하나를 리플레이하고 (조합, 예상 수익 합, 실제 수익 합 (비트 기준), 거래 수, 적중률)을 반환함 -> 필터 로그는 버림 """
+def evaluate(paths, config_path, overrides, trade_duration, settle_delay):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        opportunities = replay.replay(paths, 0.0, config_path, overrides, trade_duration=trade_duration, settle_delay=settle_delay)
+    expected, realized, hit_rate = replay.summarize(opportunities)
+    return overrides, expected, realized, len(opportunities), hit_rate
+
+
+""" 모든 조합을 작업 프로세스에 나눠서 리플레이하고 실제 수익이 높은 순으로 반환함 """
+def sweep(paths, grid, config_path="config.ini", processes=None, trade_duration=1.0, settle_delay=0.0):
+    for name in grid.keys():
+        if name not in SWEEP_PARAMETERS:
+            raise Exception(name + "은(는) 바꿔볼 수 없는 설정값입니다. " + str(SWEEP_PARAMETERS))
+    combinations = get_combinations(grid)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(evaluate, paths, config_path, overrides, trade_duration, settle_delay) for overrides in combinations]
+        results = [future.result() for future in futures]
+    return sorted(results, key=lambda result: result[2], reverse=True)
+
+
+def print_table(results):
+    print("순위\t실제 수익 (BTC)\t예상 수익 (BTC)\t거래 수\t적중률\t설정값")
+    for rank, (overrides, expected, realized, count, hit_rate) in enumerate(results, start=1):
+        print(str(rank) + "\t" + "{:.8f}".format(realized) + "\t" + "{:.8f}".format(expected) + "\t" + str(count) + "\t" + "{:.1%}".format(hit_rate) + "\t"
+              + ", ".join(name + "=" + value for name, value in overrides.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기록한 호가로 설정값 조합을 한꺼번에 리플레이함")
+    parser.add_argument("paths", nargs="+", help="market_recorder로 기록한 .bin 파일")
+    parser.add_argument("--grid", action="append", default=[], help="설정값=값1,값2,... ex) profit=1.002,1.003")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--processes", type=int, default=None, help="작업 프로세스 수 (기본값 : CPU 수)")
+    parser.add_argument("--trade-duration", type=float, default=1.0, help="거래 한 번에 걸린다고 볼 시간 (초)")
+    parser.add_argument("--settle-delay", type=float, default=0.5, help="몇 초 뒤의 호가로 실제 수익률을 계산할지")
+    args = parser.parse_args()
+    grid = {}
+    for item in args.grid:
+        name, values = item.split("=", 1)
+        grid[name] = values.split(",")
+    before = time.time()
+    results = sweep(args.paths, grid, args.config, args.processes, args.trade_duration, args.settle_delay)
+    print_table(results)
+    print(str(len(results)) + "개 조합, 걸린 시간 : " + str("{:.3f}".format(time.time() - before)) + "초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")  # /proc의 utime, stime 단위
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+
+try:
+    import ctypes
+    from ctypes import wintypes
+    KERNEL32 = ctypes.WinDLL("kernel32")
+    KERNEL32.OpenThread.restype = wintypes.HANDLE
+    KERNEL32.OpenThread.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    KERNEL32.GetThreadTimes.argtypes = (wintypes.HANDLE,) + (ctypes.POINTER(wintypes.FILETIME),) * 4
+    KERNEL32.CloseHandle.argtypes = (wintypes.HANDLE,)
+except (ImportError, AttributeError, OSError):
+    KERNEL32 = None  # 윈도우가 아님
+THREAD_QUERY_LIMITED_INFORMATION = 0x0800
+
+
+""" 스레드 하나가 지금까지 사용한 CPU 시간 (초), 읽을 수 없으면 None
+    지금 스레드면 time.thread_time() (모든 운영체제), 리눅스는 /proc/self/task/<tid>/stat, 윈도우는 GetThreadTimes로 읽음 -> 그 외 운영체제에서 다른 스레드는 None """
+def get_thread_cpu_time(native_id):
+    if native_id == threading.get_native_id():
+        return time.thread_time()
+    if KERNEL32 is not None:
+        return get_windows_thread_cpu_time(native_id)
+    try:
+        with open("/proc/self/task/" + str(native_id) + "/stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    fields = stat[stat.rindex(")") + 2:].split()  # 스레드 이름에 공백이 있을 수 있으므로 ) 뒤부터 나눔
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime, stime
+
+
+""" 윈도우에서 스레드 하나가 지금까지 사용한 CPU 시간 (초) -> FILETIME은 100ns 단위 """
+def get_windows_thread_cpu_time(native_id):
+    handle = KERNEL32.OpenThread(THREAD_QUERY_LIMITED_INFORMATION, False, native_id)
+    if not handle:
+        return None
+    try:
+        times = [wintypes.FILETIME() for _ in range(0, 4)]  # 생성, 종료, 커널, 사용자 시간
+        if not KERNEL32.GetThreadTimes(handle, *[ctypes.byref(value) for value in times]):
+            return None
+        return sum((value.dwHighDateTime << 32 | value.dwLowDateTime) for value in times[2:]) / 10000000
+    finally:
+        KERNEL32.CloseHandle(handle)
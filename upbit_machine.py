@@ -2,14 +2,27 @@
 
 import configparser
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import pymysql
-from threading import Thread
+from threading import Thread, Barrier, BrokenBarrierError, local
+from concurrent.futures import ThreadPoolExecutor
 import jwt
 import platform
 import os
 import traceback
 from urllib.parse import urlencode
+from rate_limiter import RateLimiter
+from request_scheduler import RequestScheduler, PRIORITY_HOUSEKEEPING
+from state_snapshot import load_snapshot, save_snapshot
+import vector_scanner
+from vector_scanner import VectorScanner
+from orderbook_store import OrderbookStore
+import depth_sizer
+from price_history import PriceHistory
+from market_recorder import MarketRecorder
+from stack_profiler import StackProfiler, install_signal_toggle, watch_flag_file
+import message_decoder
 
 
 # 주석 추가
@@ -23,7 +36,30 @@ class UpbitMachine:
     check_orderbook_before_start = 0  # 거래 사이클 시작 직전에 호가가 바뀌었는지 확인하고 거래할거면 True, 아니면 False
     ret = False  # True이면 모든 스레드 강제 종료
     markets_str = ""  # 거래할 모든 코인들의 시장-코인{, 시장-코인} 형태의 문자열, ex) "KRW-XRP, KRW-QTUM, KRW-BCH, ..."
-    calc_profit_interval = 0.01  # calc_profit의 호가를 불러오는 과정에서 어느 정도의 딜레이를 줄지 -> too_many_requests 방지
+    http_pool_size = 4  # REST 요청에 사용할 커넥션 풀의 크기 (지갑, 호가 계산, 거래 스레드가 동시에 요청할 수 있는 수)
+    http_adapter = None  # 모든 REST 요청이 공유하는 커넥션 풀
+    session_local = None  # 스레드별 requests 세션
+    rate_limiter = None  # Remaining-Req 헤더 기반으로 요청 그룹별 요청 속도를 조절함
+    request_scheduler = None  # 주문 > 주문 조회 > 호가 > 지갑/캔들 순으로 요청 순서를 정함
+    SNAPSHOT_FILE = 'upbit_machine_snapshot.json'  # 재시작할 때 사용할 상태를 저장하는 파일
+    snapshot_ttl = 600  # 저장된 상태를 몇 초 동안 믿고 사용할지 (0이면 사용하지 않음)
+    snapshot_interval = 10  # 상태를 몇 초마다 저장할지
+    warm_started = False  # 저장된 상태로 시작했으면 True
+    next_coins = None  # 백그라운드에서 새로 계산한 거래량 순위 -> 다음 재시작부터 사용
+    vectorized_scan = 1  # 1이면 numpy가 설치된 경우 모든 코인의 수익률을 배열 연산으로 한 번에 계산함
+    vector_scanner = None  # 모든 코인의 최우선 호가를 배열로 들고 있는 스캐너
+    ORDER_VOLUME_RATE = 0.8  # 최적 주문 개수 중 실제로 주문할 비율
+    depth_sizing = 1  # 1이면 호가 여러 단계의 평균 체결가로 수익률과 주문 개수를 계산함
+    trend_window = 0.0  # 상승세 확인에서 몇 초 전의 호가와 비교할지 (0이면 orderbook_check_interval번 전에 불러온 호가와 비교)
+    price_history_size = 256  # 마켓별로 저장할 최근 호가 수
+    record_orderbook = 0  # 1이면 불러온 모든 호가를 record_directory에 기록함
+    record_directory = 'recordings'  # 호가 기록 파일을 저장할 폴더
+    recorder = None  # 호가를 버퍼에 모아서 파일에 한 번에 쓰는 기록기
+    profiling = 0  # 1이면 시작하자마자 profiling_duration초 동안 스레드별 호출 스택을 기록함 (profiling_directory/PROFILE 파일이나 SIGUSR1로도 켜고 끌 수 있음)
+    profiling_duration = 60.0  # 한 번 켜면 몇 초 동안 기록할지 (0이면 다시 끌 때까지)
+    profiling_interval = 0.01  # 호출 스택을 읽는 간격 (초)
+    profiling_directory = 'profiles'  # 플레임 그래프 파일을 저장할 폴더
+    profiler = None  # 스레드별 호출 스택을 읽는 프로파일러
 
     ALL_COIN = [
         "ADT", "BCH", "BSV", "RFR", "TRX", "GRS", "MFT", "ADA",
@@ -36,13 +72,14 @@ class UpbitMachine:
         "CPT", "ARDR", "ELF", "CVC", "MOC", "ANKR", "TSHP"
     ]
 
-    # 각 시장에서 최근 몇 개의 i번째 X 코인의 매도, 매수 호가 및 개수가 담겨있음
-    # coin_price[순서][시장 이름][n번째 호가][코인 번호][매도 또는 매수 호가 또는 크기]
-    # 순서 = 0 일수록 예전의 호가, len(coin_price)-1에 가까울수록 현재의 호가
-    coin_price = []
+    # 모든 마켓의 현재 최우선 호가 -> i번째 코인의 KRW 마켓은 i번, BTC 마켓은 코인 수 + i번, KRW-BTC는 orderbook_store.market_id번
+    orderbook_store = None
 
-    # market_price[0] : KRW 시장에서 BTC 코인의 첫 번째 매도, 매수 호가 및 개수가 담겨있음
-    market_price = [{'ask_price': 0, 'bid_price': 0, "ask_size": 0, "bid_size": 0}]
+    # 마켓 번호 -> REST orderbook에서 받은 모든 호가 단계 (orderbook_units)
+    orderbook_units = None
+
+    # 마켓별로 최근에 불러온 최우선 매도, 매수 호가와 시각을 저장하는 원형 버퍼
+    price_history = None
 
     market = [['error', 'error', 'error', 'error'],
               ['BTC', 'KRW', 'KRW', 'BTC'],
@@ -81,55 +118,107 @@ class UpbitMachine:
         self.orderbook_difference_rate = float(config['MACHINE']['orderbook_difference_rate'])
         self.orderbook_check_interval = int(config['MACHINE']['orderbook_check_interval'])
         self.check_orderbook_before_start = int(config['MACHINE']['check_orderbook_before_start'])
-        self.calc_profit_interval = float(config['MACHINE']['calc_profit_interval'])
-
-        """ 초기 지갑 불러오기 """
-        self.initial_wallet = self.get_my_wallet()
-        self.initial_krw_balance = 0
-        self.initial_btc_balance = 0
-        for j in range(0, len(self.initial_wallet)):
-            if self.initial_wallet[j]['currency'] == 'KRW':
-                self.initial_krw_balance = float(self.initial_wallet[j]['balance'])
-            if self.initial_wallet[j]['currency'] == 'BTC':
-                self.initial_btc_balance = float(self.initial_wallet[j]['balance'])
-        self.wallet = self.get_my_wallet()
+        self.http_pool_size = int(config['MACHINE'].get('http_pool_size', str(self.http_pool_size)))
+        self.BASE_API_URL = config['MACHINE'].get('api_url', self.BASE_API_URL)  # exchange_simulator로 테스트할 때 바꿈
+        self.vectorized_scan = int(config['MACHINE'].get('vectorized_scan', str(self.vectorized_scan)))
+        self.depth_sizing = int(config['MACHINE'].get('depth_sizing', str(self.depth_sizing)))
+        self.trend_window = float(config['MACHINE'].get('trend_window', str(self.trend_window)))
+        self.price_history_size = int(config['MACHINE'].get('price_history_size', str(self.price_history_size)))
+        self.record_orderbook = int(config['MACHINE'].get('record_orderbook', str(self.record_orderbook)))
+        self.record_directory = config['MACHINE'].get('record_directory', self.record_directory)
+        self.profiling = int(config['MACHINE'].get('profiling', str(self.profiling)))
+        self.profiling_duration = float(config['MACHINE'].get('profiling_duration', str(self.profiling_duration)))
+        self.profiling_interval = float(config['MACHINE'].get('profiling_interval', str(self.profiling_interval)))
+        self.profiling_directory = config['MACHINE'].get('profiling_directory', self.profiling_directory)
+
+        """ REST 요청에 사용할 커넥션 풀을 만들고 미리 연결해둠 """
+        self.rate_limiter = RateLimiter()
+        self.request_scheduler = RequestScheduler(self.rate_limiter, lambda: self.trading)
+        self.http_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.http_pool_size)
+        self.session_local = local()
+        self.snapshot_ttl = int(config['MACHINE'].get('snapshot_ttl', str(self.snapshot_ttl)))
+        self.snapshot_interval = int(config['MACHINE'].get('snapshot_interval', str(self.snapshot_interval)))
+
+        snapshot = load_snapshot(self.SNAPSHOT_FILE, self.snapshot_ttl)
+        if snapshot is not None:
+            """ 저장된 상태로 바로 시작하고, 지갑과 MySQL 연결, 거래량 순위는 백그라운드에서 다시 확인함 """
+            print('저장된 상태로 시작합니다. (' + str(round(time.time() - snapshot['saved_at'])) + '초 전 저장)')
+            Thread(target=self.warm_up_connection_pool).start()
+            self.initial_krw_balance = snapshot['initial_krw_balance']
+            self.initial_btc_balance = snapshot['initial_btc_balance']
+            self.wallet = snapshot['wallet']
+            self.ALL_COIN[:] = snapshot['coins']
+            self.warm_started = True
+            Thread(target=self.validate_snapshot).start()
+        else:
+            self.warm_up_connection_pool()
+
+            """ 초기 지갑 불러오기 """
+            self.initial_wallet = self.get_my_wallet()
+            self.initial_krw_balance = 0
+            self.initial_btc_balance = 0
+            for j in range(0, len(self.initial_wallet)):
+                if self.initial_wallet[j]['currency'] == 'KRW':
+                    self.initial_krw_balance = float(self.initial_wallet[j]['balance'])
+                if self.initial_wallet[j]['currency'] == 'BTC':
+                    self.initial_btc_balance = float(self.initial_wallet[j]['balance'])
+            self.wallet = self.get_my_wallet()
+
+            """ MySQL DB 연결 """
+            self.connect_mysql()
+
+        """ 주기적으로 지갑 불러오는 스레드 시작 """
+        wallet_thread = Thread(target=self.get_my_wallet_periodically, name='wallet')
+        wallet_thread.start()
 
-        """ MySQL DB 연결 """
+    def connect_mysql(self):
         self.conn = pymysql.connect(host=self.ip, port=self.port, user='root', password='root', db='coin_transaction', charset='utf8')
         self.curs = self.conn.cursor()
 
-        """ 주기적으로 지갑 불러오는 스레드 시작 """
-        wallet_thread = Thread(target=self.get_my_wallet_periodically)
-        wallet_thread.start()
+    """ 저장된 상태로 시작한 경우 지갑, MySQL 연결, 거래량 순위를 백그라운드에서 다시 확인함 """
+    def validate_snapshot(self):
+        self.wallet = self.get_my_wallet(priority=PRIORITY_HOUSEKEEPING)
+        try:
+            self.connect_mysql()
+        except Exception as ex:  # 거래 기록을 저장할 때 다시 연결을 시도함
+            print(repr(ex))
+        coins = self.rank_coins()
+        if coins != self.ALL_COIN:  # 이미 호가를 불러오는 중인 순서는 바꾸지 않고 다음 재시작부터 반영함
+            print('저장된 거래량 순위가 최신 순위와 다릅니다. 다음 재시작부터 최신 순위를 사용합니다.')
+            self.next_coins = coins
+
+    """ 재시작할 때 사용할 상태를 주기적으로 저장함 """
+    def save_snapshot_periodically(self):
+        while True:
+            if self.ret is True:
+                return
+            time.sleep(self.snapshot_interval)
+            save_snapshot(self.SNAPSHOT_FILE, {
+                'initial_krw_balance': self.initial_krw_balance,
+                'initial_btc_balance': self.initial_btc_balance,
+                'wallet': self.wallet,
+                'coins': self.next_coins if self.next_coins is not None else list(self.ALL_COIN)
+            })
 
     def set_trade_coins(self):
-        sorted_coin = [{} for _ in range(0, len(self.ALL_COIN))]
-        self.coin_price = []
-
-        """ 거래 가능한 코인들의 캔들 정보를 불러옴 """
-        for i in range(0, len(sorted_coin)):
-            candle = self.get_candle("KRW", self.ALL_COIN[i], 60)
-            sorted_coin[i]["coin"] = self.ALL_COIN[i]
-            sorted_coin[i]["acc_price"] = candle["candle_acc_trade_price"]
-            time.sleep(0.05)
-
-        """ 내림차순 정렬 """
-        for i in range(0, len(sorted_coin)):
-            for j in range(i + 1, len(sorted_coin)):
-                if sorted_coin[i]["acc_price"] < sorted_coin[j]["acc_price"]:
-                    temp_coin = sorted_coin[i]["coin"]
-                    temp_acc_price = sorted_coin[i]["acc_price"]
-                    sorted_coin[i]["coin"] = sorted_coin[j]["coin"]
-                    sorted_coin[i]["acc_price"] = sorted_coin[j]["acc_price"]
-                    sorted_coin[j]["coin"] = temp_coin
-                    sorted_coin[j]["acc_price"] = temp_acc_price
-
-        """ 거래량이 많은 코인 순으로 how_many_coins개의 코인을 거래할 코인에 넣음"""
-        for i in range(0, len(self.ALL_COIN)):
-            self.ALL_COIN[i] = sorted_coin[i]["coin"]
+        """ 거래량이 많은 코인 순으로 정렬 -> 저장된 상태로 시작했으면 저장된 순서를 사용 """
+        if self.warm_started is False:
+            self.ALL_COIN[:] = self.rank_coins()
 
         """ 거래할 모든 코인들의 시장-코인{, 시장-코인} 형태의 문자열을 구함 """
         self.markets_str = self.get_markets_str()
+        self.orderbook_store = OrderbookStore.for_coins(self.ALL_COIN)  # 마켓 번호를 정하고 호가를 저장할 배열을 미리 만들어둠
+        self.orderbook_units = [[] for _ in range(0, len(self.orderbook_store))]
+        self.price_history = PriceHistory(len(self.orderbook_store), capacity=max(self.orderbook_check_interval, self.price_history_size), window=self.trend_window)
+        if self.record_orderbook == 1:
+            self.recorder = MarketRecorder(self.record_directory, self.orderbook_store.codes)
+
+        """ 모든 코인의 수익률을 한 번에 계산할 스캐너를 만듦 """
+        if self.vectorized_scan == 1:
+            if vector_scanner.is_available():
+                self.vector_scanner = VectorScanner(self.orderbook_store)
+            else:
+                print('numpy가 설치되어 있지 않아 코인별로 수익률을 계산합니다.')
 
         """ 각 코인별로 호가를 불러옴 """
         self.get_coin_orderbook()
@@ -142,6 +231,20 @@ class UpbitMachine:
                 print(", ", end="")
         print("")
 
+    """ 거래 가능한 코인들의 캔들 정보를 동시에 불러와서 거래량이 많은 순으로 정렬한 코인 목록을 반환함 """
+    def rank_coins(self):
+        before = time.time()
+        acc_prices = self.get_acc_trade_prices(self.ALL_COIN)
+        coins = [coin for coin, _ in sorted(zip(self.ALL_COIN, acc_prices), key=lambda item: item[1], reverse=True)]
+        print('거래량 순위 계산에 걸린 시간 : ' + str("{:.3f}".format(time.time() - before)) + '초')
+        return coins
+
+    """ 여러 코인의 캔들을 동시에 불러와서 각 코인의 거래대금을 반환함 -> 요청 속도는 rate_limiter가 조절함 """
+    def get_acc_trade_prices(self, coin_list, unit=60):
+        with ThreadPoolExecutor(max_workers=self.http_pool_size) as executor:
+            candles = list(executor.map(lambda coin: self.get_candle("KRW", coin, unit), coin_list))
+        return [float(candle["candle_acc_trade_price"]) if candle != -1 else 0.0 for candle in candles]  # 캔들을 못 불러온 코인은 맨 뒤로 보냄
+
     def get_markets_str(self):
         markets_str = ""
         for i in range(0, len(self.ALL_COIN)):
@@ -190,27 +293,69 @@ class UpbitMachine:
         nonce = raw_time[2:10] + raw_time[11:13]
         return nonce
 
-    def api_query(self, authorization=False, path=None, method='get', query_params=None):
-        with requests.Session() as s:
+    """ 스레드마다 하나의 세션을 두고, 모든 세션이 같은 커넥션 풀을 공유함 -> 매 요청마다 TCP/TLS 연결을 새로 맺지 않음 """
+    def get_session(self):
+        session = getattr(self.session_local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self.http_adapter)
+            session.mount('http://', self.http_adapter)
+            self.session_local.session = session
+        return session
+
+    """ 커넥션 풀의 연결을 미리 맺어둠 -> 첫 거래에서 연결 지연이 생기지 않도록 함 """
+    def warm_up_connection_pool(self):
+        barrier = Barrier(self.http_pool_size)
+
+        def connect():
+            try:
+                barrier.wait(timeout=5)
+            except BrokenBarrierError:
+                pass
+            try:
+                self.rate_limiter.acquire(self.rate_limiter.get_group('market/all'))
+                self.get_session().get(self.BASE_API_URL + 'market/all', headers={'User-Agent': platform.platform()}, timeout=5)
+            except requests.RequestException as e:
+                print(repr(e))
+
+        threads = [Thread(target=connect) for _ in range(self.http_pool_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def get_authorization_header(self, query_params=None):
+        payload = {
+            'access_key': self.access_key,
+            'nonce': str(self.get_nonce())
+        }
+        if query_params is not None:
+            payload['query'] = query_params
+        token = jwt.encode(payload, self.secret_key, algorithm='HS256')
+        return 'Bearer {0:s}'.format(token.decode('utf-8'))
+
+    def api_query(self, authorization=False, path=None, method='get', query_params=None, priority=None):
+        s = self.get_session()
+        url = '{0:s}{1:s}'.format(self.BASE_API_URL, path)
+        if authorization and query_params is not None:
+            url = '{0:s}?{1:s}'.format(url, query_params)
+        group = self.rate_limiter.get_group(path, method)
+        if priority is None:
+            priority = self.request_scheduler.get_priority(path, method)
+        while True:  # 재시도가 필요한 오류는 continue로 다시 요청함
             try:
+                self.request_scheduler.acquire(group, priority)  # 우선순위가 높은 요청이 먼저 남은 요청 수를 사용함
                 headers = {'User-Agent': platform.platform()}
-                url = '{0:s}{1:s}'.format(self.BASE_API_URL, path)
                 if authorization:
-                    payload = {
-                        'access_key': self.access_key,
-                        'nonce': str(self.get_nonce())
-                    }
-                    if query_params is not None:
-                        payload['query'] = query_params
-                        url = '{0:s}?{1:s}'.format(url, query_params)
-                    token = jwt.encode(payload, self.secret_key, algorithm='HS256')
-                    headers['Authorization'] = 'Bearer {0:s}'.format(token.decode('utf-8'))
-                    req = requests.Request(method, url, headers=headers)
+                    headers['Authorization'] = self.get_authorization_header(query_params)  # 재시도할 때마다 nonce를 새로 만듦
+                    response = s.request(method, url, headers=headers)
                 else:
-                    req = requests.Request(method, url, headers=headers, params=query_params)
-                prepped = s.prepare_request(req)
-                response = s.send(prepped)
-                temp = response.json()
+                    response = s.request(method, url, headers=headers, params=query_params)
+                self.rate_limiter.update(response.headers, path, method)
+                if response.status_code == 429:  # too_many_requests -> 고정된 시간 대신 다음 요청이 가능해질 때까지만 기다림
+                    self.rate_limiter.penalize(group)
+                    continue
+                temp = message_decoder.decode(response.content)  # 한 번만 파싱해서 오류 확인과 반환에 같이 사용함
                 if "error" in temp:
                     if temp["error"]["name"] == "insufficient_funds_bid":
                         return None
@@ -219,49 +364,47 @@ class UpbitMachine:
                     elif temp["error"]["name"] == "nonce_used":
                         time.sleep(1)
                         print(response.content.decode('utf-8'))
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
+                        continue
                     elif temp["error"]["name"] == "too_many_requests":
-                        time.sleep(1)
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
+                        self.rate_limiter.penalize(group)
+                        continue
                     elif temp["error"]["name"] == "server_error":
                         time.sleep(1)
                         print(response.content.decode('utf-8'))
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
+                        continue
                     elif temp["error"]["name"] == "internal_server_error":  # 그냥 어쩌다 한 번씩 나오는 오류
                         time.sleep(1)
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
+                        continue
                     elif temp["error"]["name"] == "order_not_found":  # 주문을 너무 빨리 가져오는 경우
                         time.sleep(0.1)
                         if method == 'delete':  # 취소 주문 과정에서 주문을 찾을 수 없다고 나오는 경우 -> 이미 체결된 상황
                             return None
                         print(response.content.decode('utf-8'))
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
+                        continue
                     elif temp["error"]["name"] == "invalid_funds_ask":  # 비정상적인 매개변수로 주문을 넣은 경우
                         print(response.content.decode('utf-8'))
                         return None
                     elif temp["error"]["name"] == "market_offline":  # 시스템 점검 중인 경우
                         print("시스템 점검 중이므로 30초 후 거래를 다시 시도합니다.")
                         time.sleep(30)
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
+                        continue
                     else:
                         print(temp)
                 if path == "orders":
                     if response.status_code == 504:  # 504 Gateway Time-out
-                        s.close()
                         time.sleep(1)
-                        print(response.content.decode('504 Gateway Time-out'))
-                        self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                if response.status_code is not 200 and response.status_code is not 201:
+                        print('504 Gateway Time-out')
+                        continue
+                if response.status_code != 200 and response.status_code != 201:
                     print(query_params)
                     print(response.content.decode('utf-8'))
-                return response.json() if response.status_code is 200 or response.status_code is 201 else None
+                return temp if response.status_code == 200 or response.status_code == 201 else None
             except requests.ConnectionError:
                 print("ConnectionError")
                 return None
             except Exception as e:
                 print(repr(e))
-            finally:
-                s.close()
+                return None
 
     def get_orderbook(self, markets):
         if markets is None:
@@ -311,13 +454,13 @@ class UpbitMachine:
             return -1
         return -1
 
-    def get_my_wallet(self):
-        res = self.api_query(authorization=True, path='accounts', method='get')
+    def get_my_wallet(self, priority=None):
+        res = self.api_query(authorization=True, path='accounts', method='get', priority=priority)
         while res is None:
             if self.ret is True:
                 return
             time.sleep(0.1)
-            res = self.api_query(authorization=True, path='accounts', method='get')
+            res = self.api_query(authorization=True, path='accounts', method='get', priority=priority)
         return res
 
     def get_volume(self, coin_num):
@@ -407,31 +550,45 @@ class UpbitMachine:
 
     """ 각 시장에서의 코인의 매수, 매도 호가를 불러와서 저장함 """
     def get_coin_orderbook(self):
-        temp = {'KRW': [[{'ask_price': 0, 'bid_price': 0, "ask_size": 0, "bid_size": 0} for _ in range(70)], [{'ask_price': 0, 'bid_price': 0, "ask_size": 0, "bid_size": 0} for _ in range(70)]],
-                'BTC': [[{'ask_price': 0, 'bid_price': 0, "ask_size": 0, "bid_size": 0} for _ in range(70)], [{'ask_price': 0, 'bid_price': 0, "ask_size": 0, "bid_size": 0} for _ in range(70)]]}
         orderbook = self.get_orderbook(self.markets_str)
         if orderbook == -1:
             return -1
-        result_index = -1
-        for i in range(0, len(self.ALL_COIN)):
-            result_index = result_index + 1
-            temp['KRW'][0][i] = orderbook[result_index]["orderbook_units"][0]
-            temp['KRW'][1][i] = orderbook[result_index]["orderbook_units"][1]
-            result_index = result_index + 1
-            temp['BTC'][0][i] = orderbook[result_index]["orderbook_units"][0]
-            temp['BTC'][1][i] = orderbook[result_index]["orderbook_units"][1]
-
-        """ 각 코인의 호가 변동 내역을 저장함 """
-        if len(self.coin_price) >= self.orderbook_check_interval:
-            del self.coin_price[0]
-        self.coin_price.append(temp)
+        store = self.orderbook_store
+        now = time.time()
+        for market_orderbook in orderbook:
+            market_id = store.ids.get(market_orderbook["market"])
+            if market_id is None:
+                continue
+            self.orderbook_units[market_id] = market_orderbook["orderbook_units"]
+            unit = market_orderbook["orderbook_units"][0]
+            store.update(market_id, unit['ask_price'], unit['ask_size'], unit['bid_price'], unit['bid_size'], shift_previous=False, updated_at=now)
+            self.update_price_history(market_id, now)
+            if self.recorder is not None:
+                self.recorder.record(now, market_orderbook.get('timestamp', 0), market_id, unit['ask_price'], unit['ask_size'], unit['bid_price'], unit['bid_size'])
+
+    """ 호가 변동 내역을 저장하고, 상승세 확인에 사용할 예전 호가를 trend_window초 전 (0이면 orderbook_check_interval번 전) 호가로 맞춤 """
+    def update_price_history(self, market_id, now):
+        store = self.orderbook_store
+        history = self.price_history
+        history.append(market_id, store.ask_price[market_id], store.bid_price[market_id], now)
+        if self.trend_window > 0:
+            index = history.get_window_index(market_id, now)
+        else:
+            index = history.get_index(market_id, self.orderbook_check_interval - 1)
+        store.set_previous(market_id, history.ask_price[index], history.bid_price[index])
 
     """ 각 시장 간의 매수, 매도 호가를 불러와서 저장함 """
     def get_market_orderbook(self):
         orderbook = self.get_orderbook("KRW-BTC")
         if orderbook == -1:
             return -1
-        self.market_price[0] = orderbook[0]["orderbook_units"][0]
+        self.orderbook_units[self.orderbook_store.market_id] = orderbook[0]["orderbook_units"]
+        unit = orderbook[0]["orderbook_units"][0]
+        now = time.time()
+        self.orderbook_store.update(self.orderbook_store.market_id, unit['ask_price'], unit['ask_size'], unit['bid_price'], unit['bid_size'], shift_previous=False, updated_at=now)
+        self.update_price_history(self.orderbook_store.market_id, now)
+        if self.recorder is not None:
+            self.recorder.record(now, orderbook[0].get('timestamp', 0), self.orderbook_store.market_id, unit['ask_price'], unit['ask_size'], unit['bid_price'], unit['bid_size'])
 
     """ 주기적으로 지갑을 불러옴 -> 정확한 가격 계산을 위함 """
     def get_my_wallet_periodically(self):
@@ -439,7 +596,7 @@ class UpbitMachine:
             if self.ret is True:
                 return
             if self.trading is False:
-                self.wallet = self.get_my_wallet()
+                self.wallet = self.get_my_wallet(priority=PRIORITY_HOUSEKEEPING)  # 거래 중인 요청보다 늦게 처리됨
                 time.sleep(20)
             else:
                 time.sleep(5)
@@ -469,23 +626,31 @@ class UpbitMachine:
                 normal = True
                 t = 0
 
-    """ a 시장에서 x 코인을 사고, b 시장에서 x 코인을 팔고, BTC나 ETH를 사거나 파는 경우의 수익률을 구함 """
+    """ a 시장에서 x 코인을 사고, b 시장에서 x 코인을 팔고, BTC나 ETH를 사거나 파는 경우의 수익률을 구함 -> a, b 시장은 num번 사이클의 첫 번째, 두 번째 거래 시장 """
 
-    @staticmethod
-    def calc_profit_of_cycle(a_market_x_orderbook=None, b_market_x_orderbook=None, market_by_market_orderbook=None, num=None):
-        if a_market_x_orderbook is None or b_market_x_orderbook is None or market_by_market_orderbook is None or num is None:
+    def calc_profit_of_cycle(self, coin_num=None, num=None):
+        if coin_num is None or num is None:
             raise Exception("You need to set params")
+        store = self.orderbook_store
+        a_market_id = self.get_market_id(coin_num, self.market[num][0])
+        b_market_id = self.get_market_id(coin_num, self.market[num][1])
         try:
             if num == 1:
-                profit = 1 / a_market_x_orderbook["ask_price"] * b_market_x_orderbook["bid_price"] / market_by_market_orderbook["ask_price"]
+                profit = 1 / store.ask_price[a_market_id] * store.bid_price[b_market_id] / store.ask_price[store.market_id]
             else:
-                profit = 1 / a_market_x_orderbook["ask_price"] * b_market_x_orderbook["bid_price"] * market_by_market_orderbook["bid_price"]
+                profit = 1 / store.ask_price[a_market_id] * store.bid_price[b_market_id] * store.bid_price[store.market_id]
         except ZeroDivisionError:
             t = time.localtime()
-            print('\n현재시각 : {}년 {}월 {}일 {}시 {}분 {}초,'.format(t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec), a_market_x_orderbook, "@@@", b_market_x_orderbook, "@@@", market_by_market_orderbook)
+            print('\n현재시각 : {}년 {}월 {}일 {}시 {}분 {}초,'.format(t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec), store.get_unit(a_market_id), "@@@", store.get_unit(b_market_id), "@@@", store.get_unit(store.market_id))
             return -1
         return profit * 0.996502749375
 
+    """ i번째 코인의 trade_market 시장 마켓 번호, ex) (3, 'BTC') -> BTC-(3번째 코인)의 마켓 번호 """
+    def get_market_id(self, coin_num, trade_market):
+        if trade_market == 'KRW':
+            return coin_num
+        return self.orderbook_store.coin_count + coin_num
+
     @staticmethod
     def calc_profit_resell(bid_price, ask_price, num):
         if num == 2:
@@ -496,27 +661,31 @@ class UpbitMachine:
     """ 단위를 i번째 코인의 단위로 변환함 """
 
     def get_x_coin_volume(self, i=-1, num=None, order_volume=None):
+        store = self.orderbook_store
         if num == 1:
-            return order_volume / self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["ask_price"]
+            return order_volume / store.ask_price[store.coin_count + i]
         elif num == 2:
-            return order_volume / self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["bid_price"]
+            return order_volume / store.bid_price[store.coin_count + i]
 
     """ 최적 주문 개수를 구함 """
 
     def get_optimal_volume(self, i=-1, num=None):
         if num is None:
             raise Exception("you need to set param")
+        store = self.orderbook_store
+        krw_id = i
+        btc_id = store.coin_count + i
         if num == 1:
-            return min(float(self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["ask_price"] * self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["ask_size"]),
-                       (self.coin_price[len(self.coin_price) - 1]['KRW'][0][i]["bid_price"] * self.coin_price[len(self.coin_price) - 1]['KRW'][0][i]["bid_size"] / self.market_price[0]["ask_price"]))
+            return min(store.ask_price[btc_id] * store.ask_size[btc_id],
+                       store.bid_price[krw_id] * store.bid_size[krw_id] / store.ask_price[store.market_id])
         elif num == 2:
-            return min(self.coin_price[len(self.coin_price) - 1]['KRW'][0][i]["ask_size"] * self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["bid_price"],
-                       (self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["bid_size"]) * self.coin_price[len(self.coin_price) - 1]['BTC'][0][i]["bid_price"])
+            return min(store.ask_size[krw_id] * store.bid_price[btc_id],
+                       store.bid_size[btc_id] * store.bid_price[btc_id])
 
     """ 최적 주문 개수를 실제 주문할 개수로 변환함 """
 
-    def get_order_volume(self, optimal_volume=0.01):
-        val = optimal_volume * 0.8
+    def get_order_volume(self, optimal_volume=0.01, rate=None):
+        val = optimal_volume * (self.ORDER_VOLUME_RATE if rate is None else rate)
         if val < self.minimum_by_bitcoin:
             return -1
         if val >= self.maximum_by_bitcoin:
@@ -561,10 +730,15 @@ class UpbitMachine:
             if self.get_market_orderbook() == -1:  # 각 시장 간의 호가를 불러옴 (krw 시장에서의 btc의 가격)
                 break
 
+            if self.vector_scanner is not None:
+                self.scan_all_coins()
+                continue
+
+            store = self.orderbook_store
             for i in range(0, len(self.ALL_COIN)):
                 """ KRW <-> BTC """
-                # profit_btc_krw = self.calc_profit_of_cycle(self.coin_price[len(self.coin_price) - 1]['BTC'][0][i], self.coin_price[len(self.coin_price) - 1]['KRW'][0][i], self.market_price[0], 1)
-                profit_krw_btc = self.calc_profit_of_cycle(self.coin_price[len(self.coin_price) - 1]['KRW'][0][i], self.coin_price[len(self.coin_price) - 1]['BTC'][0][i], self.market_price[0], 2)
+                # profit_btc_krw = self.calc_profit_of_cycle(i, 1)
+                profit_krw_btc = self.calc_profit_of_cycle(i, 2)
 
                 """ 몇 번째 사이클이 최대의 수익률을 낼 수 있는지 확인 """
                 """
@@ -583,116 +757,168 @@ class UpbitMachine:
                 if self.profit <= max_profit:
 
                     """ 두 번째 거래에서 거래할 코인의 가격이 상승세가 아니면 거래하지 않음 """
+                    first_id = self.get_market_id(i, self.market[max_profit_cycle_num][0])
+                    second_id = self.get_market_id(i, self.market[max_profit_cycle_num][1])
                     if self.trade_if_rising == 1:
-                        if self.coin_price[len(self.coin_price) - 1][self.market[max_profit_cycle_num][1]][0][i][self.price_type[max_profit_cycle_num][1]] <= self.coin_price[0][self.market[max_profit_cycle_num][1]][0][i][self.price_type[max_profit_cycle_num][1]]:
-                            # print(self.market[max_profit_cycle_num][0] + '시장에서 ' + self.ALL_COIN[i] + '코인의 가격이 상승세가 아니므로 거래를 하지 않습니다. 얼마 전 가격 : ' + str(self.coin_price[0][self.market[max_profit_cycle_num][0]][0][i][self.price_type[max_profit_cycle_num][0]]) + ', 현재 가격 : ' + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i][self.price_type[max_profit_cycle_num][0]]))
+                        if store.get_price(second_id, self.price_type[max_profit_cycle_num][1]) <= store.get_previous_price(second_id, self.price_type[max_profit_cycle_num][1]):
+                            # print(self.market[max_profit_cycle_num][1] + '시장에서 ' + self.ALL_COIN[i] + '코인의 가격이 상승세가 아니므로 거래를 하지 않습니다. 얼마 전 가격 : ' + str(store.previous_bid_price[second_id]) + ', 현재 가격 : ' + str(store.bid_price[second_id]))
                             continue
-                        if self.coin_price[0][self.market[max_profit_cycle_num][0]][0][i][self.price_type[max_profit_cycle_num][0]] < self.coin_price[len(self.coin_price) - 1][self.market[max_profit_cycle_num][0]][0][i][self.price_type[max_profit_cycle_num][0]]:
+                        if store.get_previous_price(first_id, self.price_type[max_profit_cycle_num][0]) < store.get_price(first_id, self.price_type[max_profit_cycle_num][0]):
                             continue
 
                     """ 매수 매도 호가의 차이가 많이 나면 거래를 안 함 """
                     if self.trade_if_low_orderbook_difference == 1:
-                        orderbook_difference = self.coin_price[len(self.coin_price) - 1][self.market[max_profit_cycle_num][0]][0][i]["ask_price"] / self.coin_price[len(self.coin_price) - 1][self.market[max_profit_cycle_num][0]][0][i]["bid_price"]
+                        orderbook_difference = store.ask_price[first_id] / store.bid_price[first_id]
                         if orderbook_difference > self.orderbook_difference_rate:
-                            # print(self.market[max_profit_cycle_num][0] + '시장에서 ' + self.ALL_COIN[i] + '코인의 매수 매도 호가의 차이가 많이 나므로 거래를 하지 않습니다. 매도 호가 : ' + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i]["ask_price"]) + ', 매수 호가 : ' + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i]["bid_price"]))
+                            # print(self.market[max_profit_cycle_num][0] + '시장에서 ' + self.ALL_COIN[i] + '코인의 매수 매도 호가의 차이가 많이 나므로 거래를 하지 않습니다. 매도 호가 : ' + str(store.ask_price[first_id]) + ', 매수 호가 : ' + str(store.bid_price[first_id]))
                             continue
 
                     optimal_volume = self.get_optimal_volume(i=i, num=max_profit_cycle_num)
-                    order_volume = self.get_order_volume(optimal_volume=optimal_volume)  # 비트 기준
-                    if order_volume != -1:
-                        self.print_list.clear()
-                        self.trading = True
-                        t = time.localtime()
-                        self.print_list.append('----------------------------------------------------------------------------------------------------------------------------------------\n')
-                        self.print_list.append('현재시각 : {}년 {}월 {}일 {}시 {}분 {}초  '.format(t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec) + self.ALL_COIN[i] + " 코인의 최적 거래 사이클 번호 : " + str(max_profit_cycle_num) + "번, 예상 수익률 : " + str(round(max_profit, 4)) + ", 최적 거래 개수 : " + str(round(optimal_volume, 10)) + "\n")
-
-                        x_coin_volume = self.get_x_coin_volume(num=max_profit_cycle_num, i=i, order_volume=order_volume)
-
-                        result = -1
-                        try:
-                            result = self.trade_cycle(cycle_num=max_profit_cycle_num, volume=x_coin_volume, coin_num=i)
-                        except Exception as ex:
-                            print('오류가 발생하여 거래가 중지되었습니다.')
-                            print(repr(ex))
-                            print(''.join(self.print_list))
-                            traceback.print_exc()
-                        time.sleep(0.5)
-
-                        for j in range(0, len(self.coin_price)):
-                            print(self.coin_price[j][self.market[max_profit_cycle_num][1]][0][i][self.price_type[max_profit_cycle_num][1]])
-
-                        """ 초기 지갑 내역 불러오기 """
-                        krw_balance = 0
-                        btc_balance = 0
-                        for j in range(0, len(self.wallet)):
-                            if self.wallet[j]['currency'] == 'KRW':
-                                krw_balance = float(self.wallet[j]['balance'])
-                            if self.wallet[j]['currency'] == 'BTC':
-                                btc_balance = float(self.wallet[j]['balance'])
-
-                        """ 거래 후 지갑내역 불러오기 """
-                        self.wallet = self.get_my_wallet()
-                        krw_balance2 = 0
-                        btc_balance2 = 0
-                        for j in range(0, len(self.wallet)):
-                            if self.wallet[j]['currency'] == 'KRW':
-                                krw_balance2 = float(self.wallet[j]['balance'])
-                            if self.wallet[j]['currency'] == 'BTC':
-                                btc_balance2 = float(self.wallet[j]['balance'])
-                        t = time.localtime()
-                        self.print_list.append('초기 잔액               -> KRW : {}, BTC : {}'.format(krw_balance, btc_balance) + "\n")
-                        self.print_list.append('최종 잔액               -> KRW : {}, BTC : {}'.format(krw_balance2, btc_balance2) + "\n")
-                        self.print_list.append('거래를 통해 얻은 수익   -> KRW : {}원, BTC : {}원'.format(round(krw_balance2 - krw_balance), round(float(self.market_price[0]["bid_price"]) * (btc_balance2 - btc_balance))) + "\n")
-                        self.print_list.append('현재까지의 총 이익      -> KRW : {}원, BTC : {}원, 현재시각 : {}년 {}월 {}일 {}시 {}분 {}초'.format(round(krw_balance2 - self.initial_krw_balance), round(float(self.market_price[0]["bid_price"]) * (btc_balance2 - self.initial_btc_balance)), t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec) + "\n")
-                        self.print_list.append('----------------------------------------------------------------------------------------------------------------------------------------\n')
-
-                        """ 거래가 이루어졌으면 MySQL DB에 거래 기록을 저장함 """
-                        if result == 0 and (krw_balance2 - krw_balance != 0 or btc_balance2 - btc_balance != 0):  # 거래가 이루어 졌으면
-                            if self.minimum_error_price < krw_balance2 - krw_balance < self.maximum_error_price and \
-                                    self.minimum_error_price < float(self.market_price[0]["bid_price"]) * (btc_balance2 - btc_balance) < self.maximum_error_price:  # 거래할 때 오류가 나지 않았으면
-                                try:
-                                    self.curs.execute("insert into trade_log(time, coin, cycle_number, profit_krw, profit_btc, profit_eth) values(\""
-                                                      + self.get_time_str() + "\", \""
-                                                      + self.ALL_COIN[i] + "\", "
-                                                      + str(max_profit_cycle_num) + ", "
-                                                      + "{:.4f}".format(krw_balance2 - krw_balance) + ", "
-                                                      + "{:.4f}".format(float(self.market_price[0]["bid_price"]) * (btc_balance2 - btc_balance)) + ", "
-                                                      + "0)")
-                                except Exception as ex:
-                                    repr(ex)
-                                    self.conn = pymysql.connect(host=self.ip, port=self.port, user='root', password='root', db='coin_transaction', charset='utf8')
-                                    self.curs = self.conn.cursor()
-                                    self.curs.execute("insert into trade_log(time, coin, cycle_number, profit_krw, profit_btc, profit_eth) values(\""
-                                                      + self.get_time_str() + "\", \""
-                                                      + self.ALL_COIN[i] + "\", "
-                                                      + str(max_profit_cycle_num) + ", "
-                                                      + "{:.4f}".format(krw_balance2 - krw_balance) + ", "
-                                                      + "{:.4f}".format(float(self.market_price[0]["bid_price"]) * (btc_balance2 - btc_balance)) + ", "
-                                                      + "0)")
-                                self.conn.commit()
-                            print(''.join(self.print_list))
-                        else:
-                            self.print_list.clear()
-                        self.trading = False
-
-    """ 거래를 시작함 """
-
-    def trade_cycle(self, cycle_num=0, volume=0, coin_num=None):
+                    self.try_trade(i, max_profit_cycle_num, max_profit, optimal_volume)
+
+    """ 벡터 스캐너로 모든 코인의 수익률을 한 번에 계산하고, 수익률이 높은 코인부터 거래함 """
+    def scan_all_coins(self):
+        store = self.orderbook_store
+        candidates = self.vector_scanner.scan(store.ask_price[store.market_id], store.bid_price[store.market_id], self.profit,
+                                              cycles=(2,),
+                                              trade_if_rising=self.trade_if_rising,
+                                              trade_if_low_orderbook_difference=self.trade_if_low_orderbook_difference,
+                                              orderbook_difference_rate=self.orderbook_difference_rate,
+                                              check_first_leg_ask=True,
+                                              volume_rate=self.ORDER_VOLUME_RATE,
+                                              minimum_by_bitcoin=self.minimum_by_bitcoin if self.depth_sizing != 1 else 0.0,  # 호가 여러 단계를 보면 주문 개수가 늘어날 수 있음
+                                              maximum_by_bitcoin=self.maximum_by_bitcoin)
+        for i, max_profit_cycle_num, max_profit, optimal_volume, order_volume in candidates:
+            self.try_trade(i, max_profit_cycle_num, max_profit, optimal_volume)
+
+    """ 최우선 호가로 수익이 나는 코인의 주문 개수를 정하고 거래를 시작함 -> depth_sizing이 1이면 호가 여러 단계의 평균 체결가로 다시 확인함 """
+    def try_trade(self, i, max_profit_cycle_num, max_profit, optimal_volume):
+        prices = None
+        rate = None
+        if self.depth_sizing == 1:
+            sized = self.size_with_depth(i, max_profit_cycle_num)
+            if sized is None:
+                return
+            max_profit, optimal_volume, prices = sized
+            rate = 1.0  # 평균 체결가로 이미 수익을 확인했으므로 줄이지 않음
+        order_volume = self.get_order_volume(optimal_volume=optimal_volume, rate=rate)  # 비트 기준
+        if order_volume != -1:
+            self.start_trade(i, max_profit_cycle_num, max_profit, optimal_volume, order_volume, prices)
+
+    """ 세 거래의 평균 체결가 기준 수익률이 profit 이상인 가장 큰 개수를 찾아서 (수익률, 최적 거래 개수 (비트 기준), 각 거래의 주문 가격)을 반환함 -> 없으면 None """
+    def size_with_depth(self, i, num):
+        store = self.orderbook_store
+        first_id = self.get_market_id(i, self.market[num][0])
+        second_id = self.get_market_id(i, self.market[num][1])
+        result = depth_sizer.find_max_volume(num, self.orderbook_units[first_id], self.orderbook_units[second_id], self.orderbook_units[store.market_id], self.profit)
+        if result is None:
+            return None
+        quantity, profit, cost, prices = result
+        btc_id = store.coin_count + i
+        btc_price = store.ask_price[btc_id] if num == 1 else store.bid_price[btc_id]  # get_x_coin_volume에서 다시 코인 개수로 바꿀 때 쓰는 가격
+        return profit, quantity * btc_price, prices
+
+    """ i번째 코인으로 거래 사이클을 진행하고, 거래가 이루어졌으면 MySQL DB에 기록함 """
+    def start_trade(self, i, max_profit_cycle_num, max_profit, optimal_volume, order_volume, prices=None):
+        self.print_list.clear()
+        self.trading = True
+        t = time.localtime()
+        self.print_list.append('----------------------------------------------------------------------------------------------------------------------------------------\n')
+        self.print_list.append('현재시각 : {}년 {}월 {}일 {}시 {}분 {}초  '.format(t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec) + self.ALL_COIN[i] + " 코인의 최적 거래 사이클 번호 : " + str(max_profit_cycle_num) + "번, 예상 수익률 : " + str(round(max_profit, 4)) + ", 최적 거래 개수 : " + str(round(optimal_volume, 10)) + "\n")
+
+        x_coin_volume = self.get_x_coin_volume(num=max_profit_cycle_num, i=i, order_volume=order_volume)
+
+        result = -1
+        try:
+            result = self.trade_cycle(cycle_num=max_profit_cycle_num, volume=x_coin_volume, coin_num=i, prices=prices)
+        except Exception as ex:
+            print('오류가 발생하여 거래가 중지되었습니다.')
+            print(repr(ex))
+            print(''.join(self.print_list))
+            traceback.print_exc()
+        time.sleep(0.5)
+
+        second_id = self.get_market_id(i, self.market[max_profit_cycle_num][1])
+        for index in self.price_history.get_indexes(second_id, self.orderbook_check_interval):
+            print(self.price_history.get_price(index, self.price_type[max_profit_cycle_num][1]))
+
+        """ 초기 지갑 내역 불러오기 """
+        krw_balance = 0
+        btc_balance = 0
+        for j in range(0, len(self.wallet)):
+            if self.wallet[j]['currency'] == 'KRW':
+                krw_balance = float(self.wallet[j]['balance'])
+            if self.wallet[j]['currency'] == 'BTC':
+                btc_balance = float(self.wallet[j]['balance'])
+
+        """ 거래 후 지갑내역 불러오기 """
+        market_bid_price = self.orderbook_store.bid_price[self.orderbook_store.market_id]
+        self.wallet = self.get_my_wallet()
+        krw_balance2 = 0
+        btc_balance2 = 0
+        for j in range(0, len(self.wallet)):
+            if self.wallet[j]['currency'] == 'KRW':
+                krw_balance2 = float(self.wallet[j]['balance'])
+            if self.wallet[j]['currency'] == 'BTC':
+                btc_balance2 = float(self.wallet[j]['balance'])
+        t = time.localtime()
+        self.print_list.append('초기 잔액               -> KRW : {}, BTC : {}'.format(krw_balance, btc_balance) + "\n")
+        self.print_list.append('최종 잔액               -> KRW : {}, BTC : {}'.format(krw_balance2, btc_balance2) + "\n")
+        self.print_list.append('거래를 통해 얻은 수익   -> KRW : {}원, BTC : {}원'.format(round(krw_balance2 - krw_balance), round(market_bid_price * (btc_balance2 - btc_balance))) + "\n")
+        self.print_list.append('현재까지의 총 이익      -> KRW : {}원, BTC : {}원, 현재시각 : {}년 {}월 {}일 {}시 {}분 {}초'.format(round(krw_balance2 - self.initial_krw_balance), round(market_bid_price * (btc_balance2 - self.initial_btc_balance)), t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec) + "\n")
+        self.print_list.append('----------------------------------------------------------------------------------------------------------------------------------------\n')
+
+        """ 거래가 이루어졌으면 MySQL DB에 거래 기록을 저장함 """
+        if result == 0 and (krw_balance2 - krw_balance != 0 or btc_balance2 - btc_balance != 0):  # 거래가 이루어 졌으면
+            if self.minimum_error_price < krw_balance2 - krw_balance < self.maximum_error_price and \
+                    self.minimum_error_price < market_bid_price * (btc_balance2 - btc_balance) < self.maximum_error_price:  # 거래할 때 오류가 나지 않았으면
+                try:
+                    self.curs.execute("insert into trade_log(time, coin, cycle_number, profit_krw, profit_btc, profit_eth) values(\""
+                                      + self.get_time_str() + "\", \""
+                                      + self.ALL_COIN[i] + "\", "
+                                      + str(max_profit_cycle_num) + ", "
+                                      + "{:.4f}".format(krw_balance2 - krw_balance) + ", "
+                                      + "{:.4f}".format(market_bid_price * (btc_balance2 - btc_balance)) + ", "
+                                      + "0)")
+                except Exception as ex:
+                    repr(ex)
+                    self.connect_mysql()
+                    self.curs.execute("insert into trade_log(time, coin, cycle_number, profit_krw, profit_btc, profit_eth) values(\""
+                                      + self.get_time_str() + "\", \""
+                                      + self.ALL_COIN[i] + "\", "
+                                      + str(max_profit_cycle_num) + ", "
+                                      + "{:.4f}".format(krw_balance2 - krw_balance) + ", "
+                                      + "{:.4f}".format(market_bid_price * (btc_balance2 - btc_balance)) + ", "
+                                      + "0)")
+                self.conn.commit()
+            print(''.join(self.print_list))
+        else:
+            self.print_list.clear()
+        self.trading = False
+
+    """ 거래를 시작함 -> prices가 있으면 각 거래를 그 가격에 주문해서 여러 호가 단계에 걸쳐 체결되도록 함 """
+
+    def trade_cycle(self, cycle_num=0, volume=0, coin_num=None, prices=None):
+        store = self.orderbook_store
+        first_id = self.get_market_id(coin_num, self.market[cycle_num][0])  # 첫 번째 거래 마켓 번호
+        second_id = self.get_market_id(coin_num, self.market[cycle_num][1])  # 두 번째 거래 마켓 번호
         # 거래 시작전 호가 확인
         if self.check_orderbook_before_start == 1:
             while self.get_coin_orderbook() == -1:
                 pass
-            if self.coin_price[len(self.coin_price) - 2][self.market[cycle_num][1]][0][coin_num][self.price_type[cycle_num][0]] > self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][1]][0][coin_num][self.price_type[cycle_num][0]]:
+            history = self.price_history
+            if history.get_count(second_id) >= 2 and history.get_price(history.get_index(second_id, 1), self.price_type[cycle_num][0]) > history.get_price(history.get_index(second_id, 0), self.price_type[cycle_num][0]):
                 self.print_list.append('호가 변동으로 인해 거래를 종료합니다.\n')
                 return -1
 
         """@@@@@@@@@@@@@@@@@@ 첫 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
-        order_id = self.place_order(trade_market=self.market[cycle_num][0], coin=self.ALL_COIN[coin_num], side=self.order_type[cycle_num][0], volume=volume, price=self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][0]][0][coin_num][self.price_type[cycle_num][0]])
-        original_price = self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][0]][0][coin_num][self.price_type[cycle_num][0]]
+        first_price = prices[0] if prices is not None else store.get_price(first_id, self.price_type[cycle_num][0])
+        order_id = self.place_order(trade_market=self.market[cycle_num][0], coin=self.ALL_COIN[coin_num], side=self.order_type[cycle_num][0], volume=volume, price=first_price)
+        original_price = first_price
         if order_id is None:
             self.print_list.append("오류가 발생하여 거래를 종료합니다.\n")
             return -1
-        self.print_list.append(self.market[cycle_num][0] + " 시장에서 " + self.ALL_COIN[coin_num] + " 코인을 " + str(self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][0]][0][coin_num][self.price_type[cycle_num][0]]) + " " + self.market[cycle_num][0] + "에 " + str(volume) + "개 매수주문 함\n")
+        self.print_list.append(self.market[cycle_num][0] + " 시장에서 " + self.ALL_COIN[coin_num] + " 코인을 " + str(first_price) + " " + self.market[cycle_num][0] + "에 " + str(volume) + "개 매수주문 함\n")
         # 주문내역을 불러옴
         order = self.cancel_order(uuid=order_id)
         executed_volume = float(order["executed_volume"])  # 체결된 수량
@@ -704,22 +930,22 @@ class UpbitMachine:
 
         """@@@@@@@@@@@@@@@@@@ 두 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
         volume = self.get_volume(coin_num)
-        price = self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][1]][0][coin_num][self.price_type[cycle_num][1]]
+        price = prices[1] if prices is not None else store.get_price(second_id, self.price_type[cycle_num][1])
         order_id = self.place_order(trade_market=self.market[cycle_num][1], coin=self.ALL_COIN[coin_num], side=self.order_type[cycle_num][1], volume=volume, price=price)
         if order_id is None:
             self.print_list.append("오류가 발생하여 거래를 종료합니다.\n")
             return -1
-        self.print_list.append(self.market[cycle_num][1] + " 시장에서 " + self.ALL_COIN[coin_num] + "코인을 " + str(self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][1]][1][coin_num][self.price_type[cycle_num][1]]) + " " + self.market[cycle_num][1] + "에 " + str(executed_volume) + "개 매도주문 함\n")
+        self.print_list.append(self.market[cycle_num][1] + " 시장에서 " + self.ALL_COIN[coin_num] + "코인을 " + str(price) + " " + self.market[cycle_num][1] + "에 " + str(executed_volume) + "개 매도주문 함\n")
         # 주문내역을 불러옴
         order = self.cancel_order(order_id)
         executed_volume = float(order["executed_volume"])
         state = order["state"]  # 주문 상태
-        price = self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][0]][0][coin_num]["bid_price"]  # 되파는 가격
+        price = store.get_price(first_id, "bid_price")  # 되파는 가격
         while state != "done":  # 주문이 완료되지 않았으면
             order = self.cancel_order(uuid=order_id)  # 해당 주문 취소
             self.get_coin_orderbook()
             self.get_market_orderbook()
-            profit_cycle = self.calc_profit_of_cycle(self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][0]][0][coin_num], self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][1]][0][coin_num], self.market_price[int(cycle_num / 3)], cycle_num)
+            profit_cycle = self.calc_profit_of_cycle(coin_num, cycle_num)
             profit_resell = self.calc_profit_resell(original_price, price, cycle_num)
             if profit_cycle < profit_resell:  # 되파는 것이 사이클을 진행하는 것보다 이득이 날 경우
                 my_volume = order["remaining_volume"]
@@ -740,7 +966,7 @@ class UpbitMachine:
                         else:  # 사이클을 진행하지 않고 되팔기만 한 경우
                             self.print_list.append('모든 주문이 체결되었습니다.\n')
                             return 0
-                    price = (3 * price + self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][0]][0][coin_num]["bid_price"]) / 4
+                    price = (3 * price + store.get_price(first_id, "bid_price")) / 4
                     if self.market[cycle_num][0] == "KRW":
                         price = self.get_correct_krw_price(price)
                 else:
@@ -748,8 +974,8 @@ class UpbitMachine:
             else:  # 사이클을 계속 진행하는 경우
                 my_volume = order["remaining_volume"]
                 if str(my_volume) != "0.0":
-                    self.print_list.append("주문이 완료되지 않았으므로 현재 호가인 " + str(self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][1]][0][coin_num][self.price_type[cycle_num][1]]) + " " + self.market[cycle_num][1] + "에 " + str(my_volume) + "개를 다시 주문을 합니다. (체결된 수량 : " + str(executed_volume) + ")\n")
-                    order_id = self.place_order(trade_market=self.market[cycle_num][1], coin=self.ALL_COIN[coin_num], side=self.order_type[cycle_num][1], volume=my_volume, price=self.coin_price[len(self.coin_price) - 1][self.market[cycle_num][1]][0][coin_num][self.price_type[cycle_num][1]])
+                    self.print_list.append("주문이 완료되지 않았으므로 현재 호가인 " + str(store.get_price(second_id, self.price_type[cycle_num][1])) + " " + self.market[cycle_num][1] + "에 " + str(my_volume) + "개를 다시 주문을 합니다. (체결된 수량 : " + str(executed_volume) + ")\n")
+                    order_id = self.place_order(trade_market=self.market[cycle_num][1], coin=self.ALL_COIN[coin_num], side=self.order_type[cycle_num][1], volume=my_volume, price=store.get_price(second_id, self.price_type[cycle_num][1]))
                     if order_id is None:  # 극소량 주문해서 오류난 경우 -> 다 체결되었다 생각하고 넘어감
                         break
                     else:
@@ -781,8 +1007,8 @@ class UpbitMachine:
             volume = abs(volume2 - volume1)
 
             """@@@@@@@@@@@@@@@@@@ 세 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
+            price = prices[2] if prices is not None else store.get_price(store.market_id, self.price_type[cycle_num][2])
             while True:
-                price = self.market_price[int(cycle_num / 3)][self.price_type[cycle_num][2]]
                 order_id = self.place_order(trade_market=self.market[cycle_num][2], coin=self.market[cycle_num][3], side=self.order_type[cycle_num][2], volume=volume, price=price)
                 if order_id is None:
                     self.print_list.append("오류가 발생하여 거래를 종료합니다.\n")
@@ -798,6 +1024,7 @@ class UpbitMachine:
                 if order['remaining_volume'] == "0.0":
                     return 0
                 self.get_market_orderbook()
+                price = store.get_price(store.market_id, self.price_type[cycle_num][2])
                 volume = order['remaining_volume']
 
     def print_wallet(self):
@@ -813,8 +1040,15 @@ class UpbitMachine:
         print('KRW : {}, BTC : {}, 현재시각 : {}년 {}월 {}일 {}시 {}분 {}초'.format(krw_balance, btc_balance, t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec))
 
     def start_thread(self):
-        calc_thread = Thread(target=self.calc_profit)
+        self.profiler = StackProfiler(self.profiling_directory, self.profiling_interval)
+        install_signal_toggle(self.profiler, self.profiling_duration)  # kill -USR1 <pid>로 켜고 끔
+        watch_flag_file(self.profiler, self.profiling_directory, self.profiling_duration)  # profiling_directory/PROFILE 파일을 만들면 켜고 지우면 끔
+        if self.profiling == 1:
+            self.profiler.start(self.profiling_duration)
+        calc_thread = Thread(target=self.calc_profit, name='calc_profit')
         calc_thread.start()
+        if self.snapshot_ttl > 0:
+            Thread(target=self.save_snapshot_periodically, name='snapshot').start()  # 재시작할 때 사용할 상태를 저장하는 스레드 시작
         t = time.localtime()
         after = time.time()
         print('로딩까지 걸린 시간 : ' + str("{:.3f}".format(after - self.before)) + '초')
@@ -833,5 +1067,5 @@ if __name__ == '__main__':
     machine = UpbitMachine()
     machine.set_trade_coins()
     machine.start_thread()
-    check_thread = Thread(target=machine.count_time)
+    check_thread = Thread(target=machine.count_time, name='count_time')
     check_thread.start()
@@ -4,26 +4,102 @@ import configparser
 import requests
 import time
 import jwt
-import json
 import platform
 import traceback
 import websockets
 import asyncio
+import heapq
 
+try:
+    import aiohttp  # 비동기 REST 요청에만 필요함
+except ImportError:
+    aiohttp = None
+
+from collections import deque
 from datetime import datetime
-from threading import Thread
+from requests.adapters import HTTPAdapter
+from threading import Thread, Barrier, BrokenBarrierError, Event, local
+from multiprocessing import Process, Pipe
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
+from rate_limiter import RateLimiter
+from request_scheduler import RequestScheduler, PRIORITY_HOUSEKEEPING
+from state_snapshot import load_snapshot, save_snapshot
+from market_catalog import MarketCatalog
+from cycle_engine import CycleEngine
+import vector_scanner
+from vector_scanner import VectorScanner
+from dirty_set import DirtySet
+from orderbook_store import OrderbookStore
+from l2_book import L2Book
+from price_history import PriceHistory
+from market_recorder import MarketRecorder
+import message_decoder
+from message_decoder import OrderbookDecoder
+import subscription_manager
+from subscription_manager import SubscriptionManager, WEBSOCKET_URI, DISCONNECTED
+import depth_sizer
+from latency_tracer import LatencyTracer, start_metrics_server
+from stack_profiler import StackProfiler, install_signal_toggle, watch_flag_file
 
 
 class UpbitMachine:
     BASE_API_URL = "https://api.upbit.com/v1/"
     trading = False  # 현재 거래중인지 나타냄 -> 동시에 여러 거래가 이루어지는 것을 방지
     wallet = None  # 지갑 저장할 변수
-    all_coin_list = None  # 모든 코인 리스트
+    market_catalog = None  # market/all의 모든 마켓을 기준 화폐와 코인 이름으로 색인해둔 목록
     trade_coin_list = []  # KRW 시장과 BTC 시장에서 거래 가능한 코인들만 모아둔 리스트
     trade_coin_str = None  # trade_coin_list 내의 모든 코인들의 심볼 합친 것, ex) "KRW-ETH.1","BTC-ETH.1","BTC-LTC.1", ...    -> .1은 orderbook 1개만 불러오겠다는 뜻
-    orderbook_dictionary = {}  # orderbook을 사용하기 쉽게 만든 딕셔너리
-    previous_orderbook_dictionary = {}  # orderbook_dictionary 이전의 시세
+    orderbook_store = None  # 구독하는 모든 마켓의 최우선 호가와 이전 호가를 마켓 번호로 저장함
+    http_pool_size = 4  # REST 요청에 사용할 커넥션 풀의 크기 (지갑, 수익 계산, 거래 스레드가 동시에 요청할 수 있는 수)
+    http_adapter = None  # 모든 REST 요청이 공유하는 커넥션 풀
+    session_local = None  # 스레드별 requests 세션
+    rate_limiter = None  # Remaining-Req 헤더 기반으로 요청 그룹별 요청 속도를 조절함
+    request_scheduler = None  # 주문 > 주문 조회 > 호가 > 지갑/캔들 순으로 요청 순서를 정함
+    async_session = None  # 웹 소켓과 같은 이벤트 루프에서 사용하는 aiohttp 세션
+    event_loop = None  # 웹 소켓이 돌아가는 이벤트 루프 -> 비동기 REST 요청도 이 루프에서 처리함
+    SNAPSHOT_FILE = "upbit_machine_with_websocket_snapshot.json"  # 재시작할 때 사용할 상태를 저장하는 파일
+    snapshot_ttl = 600  # 저장된 상태를 몇 초 동안 믿고 사용할지 (0이면 사용하지 않음)
+    snapshot_interval = 10  # 상태를 몇 초마다 저장할지
+    SNAPSHOT_PREVIOUS_MAX_AGE = 5.0  # 저장된 호가를 직전 호가로 사용할 최대 나이 (초), trend_window가 더 길면 trend_window
+    next_trade_coin_list = None  # 백그라운드에서 새로 계산한 거래할 코인 목록 -> 다음 재시작부터 사용
+    subscription_codes = []  # KRW-BTC 외에 웹 소켓으로 구독하는 모든 마켓 코드
+    EVALUATION_TIMEOUT = 1.0  # 호가가 바뀌지 않아도 수익 계산 스레드가 깨어나는 간격 (초)
+    CANCEL_RETRY_LIMIT = 10  # 주문 취소가 끝나지 않았을 때 다시 취소할 최대 횟수 -> 넘으면 오류로 거래를 멈춤
+    CANCEL_RETRY_DELAY = 0.1  # 주문을 다시 취소하기 전에 처음 기다리는 시간 (초), 다시 취소할 때마다 두 배
+    CANCEL_MAX_RETRY_DELAY = 2.0  # 주문을 다시 취소하기 전에 기다리는 최대 시간 (초)
+    how_many_coins = 50  # 거래량이 많은 코인부터 몇 개의 코인을 거래할지
+    cycle_search = 0  # 1이면 KRW, BTC, USDT 시장을 모두 포함한 사이클을 찾음 (감지 전용, 찾은 사이클은 출력만 하고 거래하지 않음)
+    cycle_search_length = 3  # 찾을 사이클의 최대 단계 수 (3 또는 4)
+    cycle_engine = None  # 화폐 그래프로 모든 사이클의 수익률을 계산하는 엔진
+    vectorized_scan = 1  # 1이면 numpy가 설치된 경우 모든 코인의 수익률을 배열 연산으로 한 번에 계산함
+    vector_scanner = None  # 모든 코인의 최우선 호가를 배열로 들고 있는 스캐너
+    ORDER_VOLUME_RATE = 0.7  # 최적 주문 개수 중 실제로 주문할 비율
+    orderbook_depth = 1  # 웹 소켓으로 구독할 호가 단계 수 (1 ~ 15), 2 이상이면 호가 여러 단계의 평균 체결가로 주문 개수를 정함
+    l2_books = None  # 마켓 번호 -> 호가 여러 단계를 저장하는 L2Book (orderbook_depth가 2 이상일 때만 사용)
+    trend_window = 0.0  # 상승세 확인에서 몇 초 전의 호가와 비교할지 (0이면 바로 직전에 받은 호가와 비교)
+    price_history_size = 256  # 마켓별로 저장할 최근 호가 수
+    price_history = None  # 마켓별로 최근에 받은 최우선 매도, 매수 호가와 시각을 저장하는 원형 버퍼
+    stale_market_seconds = 0.0  # 이 시간(초) 동안 호가를 받지 못한 마켓은 오래된 호가로 보고 거래하지 않음 (0이면 확인하지 않음, 연결이 끊긴 마켓은 expire_codes에서 따로 막음)
+    WEBSOCKET_PING_INTERVAL = 20  # 웹 소켓 연결이 살아있는지 확인하는 간격 (초), 응답이 없으면 끊고 다시 연결함
+    WEBSOCKET_RECONNECT_DELAY = 0.5  # 웹 소켓이 끊기고 처음 다시 연결하기 전 기다리는 시간 (초), 실패할 때마다 두 배로 늘림
+    WEBSOCKET_MAX_RECONNECT_DELAY = 30.0  # 다시 연결하기 전 기다리는 최대 시간 (초)
+    websocket_connections = 1  # 구독할 마켓을 나눌 웹 소켓 연결 수 (2 이상이면 KRW-BTC는 혼자 한 연결을 사용함)
+    websocket_processes = 0  # KRW-BTC 외의 연결을 나눠 받을 작업 프로세스 수 (0이면 모두 이 프로세스에서 받음)
+    subscription_manager = None  # 구독할 마켓을 웹 소켓 연결과 작업 프로세스에 나눠줌
+    websocket_url = WEBSOCKET_URI  # 호가를 받을 웹 소켓 주소 (exchange_simulator로 테스트할 때 바꿈)
+    record_orderbook = 0  # 1이면 받은 모든 호가를 record_directory에 기록함
+    record_directory = "recordings"  # 호가 기록 파일을 저장할 폴더
+    recorder = None  # 호가를 버퍼에 모아서 파일에 한 번에 쓰는 기록기
+    latency_tracing = 1  # 1이면 호가를 받은 순간부터 거래 사이클이 끝날 때까지 단계별 지연 시간을 기록함
+    latency_report_interval = 60  # 단계별 지연 시간을 몇 초마다 출력할지 (0이면 출력하지 않음)
+    metrics_port = 0  # 단계별 지연 시간을 보여줄 로컬 HTTP 포트 (0이면 띄우지 않음), http://127.0.0.1:포트/metrics
+    tracer = None  # 단계별 지연 시간 히스토그램
+    profiling = 0  # 1이면 시작하자마자 profiling_duration초 동안 스레드별 호출 스택을 기록함 (profiling_directory/PROFILE 파일이나 SIGUSR1로도 켜고 끌 수 있음)
+    profiling_duration = 60.0  # 한 번 켜면 몇 초 동안 기록할지 (0이면 다시 끌 때까지)
+    profiling_interval = 0.01  # 호출 스택을 읽는 간격 (초)
+    profiling_directory = "profiles"  # 플레임 그래프 파일을 저장할 폴더
+    profiler = None  # 스레드별 호출 스택을 읽는 프로파일러
 
     market = [["error", "error", "error"],
               ["BTC", "KRW", "KRW"],  # 1번 사이클 각 단계별 거래하는 시장 이름
@@ -39,19 +115,39 @@ class UpbitMachine:
     # ap = ask_price, bp = bid_price
 
     def __init__(self):
+        self.before = time.time()
         """ config.ini 파일에서 정보 불러오는 부분 """
         config = configparser.ConfigParser()
         config.read("config.ini", encoding="utf-8-sig")
         self.access_key = config["UPBIT"]["access_key"]
         self.secret_key = config["UPBIT"]["secret_key"]
-        self.profit = float(config["MACHINE"]["profit"])
-        self.how_many_coins = int(config["MACHINE"]["how_many_coins"])
-        self.maximum_by_bitcoin = float(config["MACHINE"]["maximum_by_bitcoin"])
-        self.minimum_by_bitcoin = float(config["MACHINE"]["minimum_by_bitcoin"])
-        self.trade_if_rising = int(config["MACHINE"]["trade_if_rising"])
-        self.trade_if_low_orderbook_difference = int(config["MACHINE"]["trade_if_low_orderbook_difference"])
-        self.orderbook_difference_rate = float(config["MACHINE"]["orderbook_difference_rate"])
-        self.orderbook_check_interval = int(config["MACHINE"]["orderbook_check_interval"])
+        self.load_machine_config(config)
+        self.init_feed_state()
+
+        """ REST 요청에 사용할 커넥션 풀을 만들고 미리 연결해둠 """
+        self.rate_limiter = RateLimiter()
+        self.request_scheduler = RequestScheduler(self.rate_limiter, lambda: self.trading)
+        self.http_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.http_pool_size)
+        self.session_local = local()
+
+        snapshot = load_snapshot(self.SNAPSHOT_FILE, self.snapshot_ttl)
+        if snapshot is not None:
+            """ 저장된 상태로 바로 시작하고, 최신 상태인지는 백그라운드에서 확인함 """
+            print("저장된 상태로 시작합니다. (" + str(round(time.time() - snapshot["saved_at"])) + "초 전 저장)")
+            Thread(target=self.warm_up_connection_pool).start()
+            self.initial_wallet = snapshot["initial_wallet"]
+            self.wallet = snapshot["wallet"]
+            self.market_catalog = MarketCatalog(snapshot["all_coin_list"])
+            self.trade_coin_list = snapshot["trade_coin_list"]
+            self.trade_coin_str = self.get_trade_coin_str()
+            if time.time() - snapshot["saved_at"] > max(self.trend_window, self.SNAPSHOT_PREVIOUS_MAX_AGE):  # 오래된 호가와 비교하면 상승세 확인이 의미 없음
+                snapshot["orderbook"] = {}
+            for code, units in snapshot["orderbook"].items():  # 웹 소켓으로 호가를 받기 전까지 사용할 직전 호가
+                if code in self.orderbook_store.ids:
+                    self.orderbook_store.set_previous(self.orderbook_store.get_id(code), units[0]["ap"], units[0]["bp"])
+            Thread(target=self.validate_snapshot).start()
+            return
+        self.warm_up_connection_pool()
 
         """ 초기 지갑 불러오기 """
         self.initial_wallet = self.get_my_wallet()
@@ -60,84 +156,220 @@ class UpbitMachine:
         """ 거래할 코인 불러오는 로직 """
         self.refresh_trade_coin()
 
+    """ config.ini의 MACHINE 항목을 불러옴 -> 리플레이에서도 같은 값을 사용함 """
+    def load_machine_config(self, config):
+        self.profit = float(config["MACHINE"]["profit"])
+        self.how_many_coins = int(config["MACHINE"].get("how_many_coins", str(self.how_many_coins)))
+        self.maximum_by_bitcoin = float(config["MACHINE"]["maximum_by_bitcoin"])
+        self.minimum_by_bitcoin = float(config["MACHINE"]["minimum_by_bitcoin"])
+        self.trade_if_rising = int(config["MACHINE"]["trade_if_rising"])
+        self.trade_if_low_orderbook_difference = int(config["MACHINE"]["trade_if_low_orderbook_difference"])
+        self.orderbook_difference_rate = float(config["MACHINE"]["orderbook_difference_rate"])
+        self.orderbook_check_interval = int(config["MACHINE"]["orderbook_check_interval"])
+        self.http_pool_size = int(config["MACHINE"].get("http_pool_size", str(self.http_pool_size)))
+        self.BASE_API_URL = config["MACHINE"].get("api_url", self.BASE_API_URL)  # exchange_simulator로 테스트할 때 바꿈
+        self.websocket_url = config["MACHINE"].get("websocket_url", self.websocket_url)
+        self.snapshot_ttl = int(config["MACHINE"].get("snapshot_ttl", str(self.snapshot_ttl)))
+        self.snapshot_interval = int(config["MACHINE"].get("snapshot_interval", str(self.snapshot_interval)))
+        self.cycle_search = int(config["MACHINE"].get("cycle_search", str(self.cycle_search)))
+        self.cycle_search_length = int(config["MACHINE"].get("cycle_search_length", str(self.cycle_search_length)))
+        self.vectorized_scan = int(config["MACHINE"].get("vectorized_scan", str(self.vectorized_scan)))
+        self.orderbook_depth = min(max(int(config["MACHINE"].get("orderbook_depth", str(self.orderbook_depth))), 1), 15)
+        self.trend_window = float(config["MACHINE"].get("trend_window", str(self.trend_window)))
+        self.price_history_size = int(config["MACHINE"].get("price_history_size", str(self.price_history_size)))
+        self.stale_market_seconds = float(config["MACHINE"].get("stale_market_seconds", str(self.stale_market_seconds)))
+        self.websocket_connections = int(config["MACHINE"].get("websocket_connections", str(self.websocket_connections)))
+        self.websocket_processes = int(config["MACHINE"].get("websocket_processes", str(self.websocket_processes)))
+        self.record_orderbook = int(config["MACHINE"].get("record_orderbook", str(self.record_orderbook)))
+        self.record_directory = config["MACHINE"].get("record_directory", self.record_directory)
+        self.latency_tracing = int(config["MACHINE"].get("latency_tracing", str(self.latency_tracing)))
+        self.latency_report_interval = int(config["MACHINE"].get("latency_report_interval", str(self.latency_report_interval)))
+        self.metrics_port = int(config["MACHINE"].get("metrics_port", str(self.metrics_port)))
+        self.profiling = int(config["MACHINE"].get("profiling", str(self.profiling)))
+        self.profiling_duration = float(config["MACHINE"].get("profiling_duration", str(self.profiling_duration)))
+        self.profiling_interval = float(config["MACHINE"].get("profiling_interval", str(self.profiling_interval)))
+        self.profiling_directory = config["MACHINE"].get("profiling_directory", self.profiling_directory)
+
+    """ 호가를 받는 스레드와 수익 계산 스레드가 함께 쓰는 상태를 만듦 """
+    def init_feed_state(self):
+        self.new_cycle_opportunities = deque()  # 웹 소켓 스레드에서 찾은, 새로 수익을 낼 수 있게 된 사이클 번호
+        self.orderbook_ready = Event()  # 구독한 모든 코인의 호가를 웹 소켓으로 한 번 이상 받았으면 set
+        self.received_codes = set()  # 웹 소켓으로 호가를 받은 적이 있는 코드
+        self.feed_connected = Event()  # 웹 소켓이 연결되어 호가를 받고 있으면 set, 끊기면 clear
+        self.dirty_coins = DirtySet()  # 호가가 바뀌어서 수익률을 다시 계산해야 하는 코인
+        self.event_loop_started = Event()  # 웹 소켓 이벤트 루프가 돌기 시작했으면 set -> 작업 프로세스가 보낸 호가도 이 루프에서 씀
+
+    """ 저장된 상태로 시작한 경우 지갑과 거래할 코인 목록을 다시 불러와서 확인함 """
+    def validate_snapshot(self):
+        self.wallet = self.get_my_wallet(priority=PRIORITY_HOUSEKEEPING)
+        self.refresh_market_catalog()
+        trade_coin_list = self.get_trade_coin_list()
+        if trade_coin_list != self.trade_coin_list:  # 이미 구독 중인 목록은 바꾸지 않고 다음 재시작부터 반영함
+            print("저장된 거래할 코인 목록이 최신 목록과 다릅니다. 다음 재시작부터 최신 목록을 사용합니다.")
+            self.next_trade_coin_list = trade_coin_list
+
+    """ 재시작할 때 사용할 상태를 주기적으로 저장함 """
+    def save_snapshot_periodically(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            save_snapshot(self.SNAPSHOT_FILE, {
+                "initial_wallet": self.initial_wallet,
+                "wallet": self.wallet,
+                "all_coin_list": self.market_catalog.to_list(),
+                "trade_coin_list": self.next_trade_coin_list if self.next_trade_coin_list is not None else self.trade_coin_list,
+                "orderbook": self.orderbook_store.to_dict()
+            })
+
     def refresh_trade_coin(self):
-        self.all_coin_list = self.get_all_coin_list()  # 거래 가능한 모든 코인 정보 불러오기
+        self.refresh_market_catalog()  # 거래 가능한 모든 코인 정보 불러오기
         self.trade_coin_list = self.get_trade_coin_list()  # KRW 시장 및 BTC 시장에서 거래 가능한 코인들만 필터링하는 작업
         self.trade_coin_str = self.get_trade_coin_str()  # 거래 가능한 모든 코인을 문자열로 연결
 
+    """ market/all을 다시 불러와서 새로 상장되거나 없어진 마켓만 목록에 반영함 """
+    def refresh_market_catalog(self):
+        all_coin_list = self.get_all_coin_list()
+        if self.market_catalog is None:
+            self.market_catalog = MarketCatalog(all_coin_list)
+            return [], []
+        added, removed = self.market_catalog.update(all_coin_list)
+        if len(added) > 0 or len(removed) > 0:
+            print("마켓 목록 변경 -> 추가 : " + str(added) + ", 삭제 : " + str(removed))
+        return added, removed
+
     def get_all_coin_list(self):
-        res = self.api_query(authorization=True, path="market/all", method="get")
-        while res is None:
-            time.sleep(0.1)
-            res = self.api_query(authorization=True, path="market/all", method="get")
-        return res
+        return self.run_sync(self.get_all_coin_list_async())
 
     def get_trade_coin_list(self):
-        coin_list_with_symbol = []
-        for i in range(0, len(self.all_coin_list)):
-            market_name = self.all_coin_list[i]["market"][0:3]
-            coin_name = self.all_coin_list[i]["market"][4:]
-            for j in range(0, len(self.all_coin_list)):
-                if market_name != self.all_coin_list[j]["market"][0:3] and coin_name == self.all_coin_list[j]["market"][4:]:  # 시장 이름은 다른데 코인 이름은 같은 게 존재하면
-                    coin_list_with_symbol.append(self.all_coin_list[i]["market"])
-                    break
+        coin_list = self.market_catalog.get_cross_listed_bases(("KRW", "BTC"))  # KRW 시장과 BTC 시장에서 모두 거래 가능한 코인
 
-        coin_list = []
-        for coin_with_symbol in coin_list_with_symbol:
-            if coin_with_symbol[4:] not in coin_list:
-                coin_list.append(coin_with_symbol[4:])
-
-        candle_list = []  # candle_list[i] = coin_list[i]의 캔들 정보
-
-        """ 거래 가능한 코인들의 캔들 정보를 불러옴 """
-        for coin_name in coin_list:
-            candle = self.get_candle("KRW", coin_name, 60)
-            candle_list.append(float(candle["candle_acc_trade_price"]))
-            time.sleep(0.05)
-
-        """ 내림차순 정렬 """
-        for i in range(0, len(coin_list)):
-            for j in range(i + 1, len(coin_list)):
-                if candle_list[i] < candle_list[j]:
-                    temp_coin = coin_list[i]
-                    temp_acc_price = candle_list[i]
-                    coin_list[i] = coin_list[j]
-                    candle_list[i] = candle_list[j]
-                    coin_list[j] = temp_coin
-                    candle_list[j] = temp_acc_price
+        """ 거래 가능한 코인들의 캔들 정보를 동시에 불러옴 """
+        before = time.time()
+        candle_list = self.get_acc_trade_prices(coin_list)  # candle_list[i] = coin_list[i]의 거래대금
 
         """ 거래량이 많은 코인부터 how_many_coins개의 코인을 반환"""
-        print("거래할 코인 목록 : " + str(coin_list[0:self.how_many_coins]))
-        return coin_list[0:self.how_many_coins]
+        top_coins = [coin for coin, _ in heapq.nlargest(self.how_many_coins, zip(coin_list, candle_list), key=lambda item: item[1])]
+        print("거래량 순위 계산에 걸린 시간 : " + str("{:.3f}".format(time.time() - before)) + "초")
+        print("거래할 코인 목록 : " + str(top_coins))
+        return top_coins
+
+    """ 여러 코인의 캔들을 동시에 불러와서 각 코인의 거래대금을 반환함 -> 요청 속도는 rate_limiter가 조절함 """
+    def get_acc_trade_prices(self, coin_list, unit=60):
+        with ThreadPoolExecutor(max_workers=self.http_pool_size) as executor:
+            candles = list(executor.map(lambda coin: self.get_candle("KRW", coin, unit), coin_list))
+        return [float(candle["candle_acc_trade_price"]) if candle != -1 else 0.0 for candle in candles]  # 캔들을 못 불러온 코인은 맨 뒤로 보냄
 
     def get_trade_coin_str(self):
+        self.subscription_codes = ["KRW-" + coin_name for coin_name in self.trade_coin_list] + ["BTC-" + coin_name for coin_name in self.trade_coin_list]
+        if self.cycle_search == 1:
+            self.subscription_codes = self.subscription_codes + self.get_cycle_search_codes()
+        self.orderbook_store = OrderbookStore.for_coins(self.trade_coin_list, self.subscription_codes)  # 구독할 때 마켓 번호를 정함
+        if self.orderbook_depth > 1:
+            self.l2_books = [L2Book(self.orderbook_depth) for _ in range(0, len(self.orderbook_store))]
+        self.price_history = PriceHistory(len(self.orderbook_store), capacity=self.price_history_size, window=self.trend_window)
+        if self.record_orderbook == 1:
+            self.recorder = MarketRecorder(self.record_directory, self.orderbook_store.codes)
+        if self.latency_tracing == 1:
+            self.tracer = LatencyTracer(len(self.orderbook_store))
+        self.subscription_manager = SubscriptionManager(["KRW-BTC"] + self.subscription_codes, connections=self.websocket_connections, processes=self.websocket_processes)
         coin_str = ""
-        for coin_name in self.trade_coin_list:
-            coin_str = coin_str + "," + "\"" + "CRIX.UPBIT.KRW-" + coin_name + ".1\""
-        for coin_name in self.trade_coin_list:
-            coin_str = coin_str + "," + "\"" + "CRIX.UPBIT.BTC-" + coin_name + ".1\""
+        for code in self.subscription_codes:
+            coin_str = coin_str + "," + "\"" + "CRIX.UPBIT." + code + "." + str(self.orderbook_depth) + "\""
         return coin_str[1:]
 
-    """ 웹 소켓 사용해서 실시간 orderbook 정보를 불러옴 """
-    async def get_orderbook_with_websocket(self):
-        uri = "wss://crix-ws.upbit.com/websocket"
-
-        async with websockets.connect(uri, ping_interval=None) as websocket:
+    """ 사이클 탐색에 추가로 필요한 마켓 -> 거래할 코인의 KRW, BTC 외 시장(USDT 등)과 기준 화폐끼리의 시장(USDT-BTC, KRW-USDT 등) """
+    def get_cycle_search_codes(self):
+        codes = []
+        quotes = set()
+        for coin_name in self.trade_coin_list:
+            for quote in sorted(self.market_catalog.get_quotes(coin_name)):
+                quotes.add(quote)
+                if quote != "KRW" and quote != "BTC":
+                    codes.append(quote + "-" + coin_name)
+        for quote in sorted(quotes):
+            for base in sorted(quotes):
+                code = quote + "-" + base
+                if code != "KRW-BTC" and self.market_catalog.contains(code):
+                    codes.append(code)
+        return codes
+
+    """ 구독하는 모든 마켓으로 사이클 탐색 엔진을 만듦 """
+    def build_cycle_engine(self):
+        self.cycle_engine = CycleEngine(["KRW-BTC"] + self.subscription_codes, max_length=self.cycle_search_length, profit=self.profit)
+        print("사이클 탐색 : 화폐 " + str(len(self.cycle_engine.currencies)) + "개, 사이클 " + str(len(self.cycle_engine.cycles)) + "개")
+
+    """ i번째 코인의 trade_market 시장 마켓 번호, ex) (3, "BTC") -> BTC-(3번째 코인)의 마켓 번호 """
+    def get_market_id(self, coin_num, trade_market):
+        if trade_market == "KRW":
+            return coin_num
+        return self.orderbook_store.coin_count + coin_num
+
+    """ 웹 소켓 스레드에서 새로 찾은 수익 사이클을 출력함 -> 감지 전용이므로 거래는 하지 않음 """
+    def report_cycle_opportunities(self):
+        while len(self.new_cycle_opportunities) > 0:
+            cycle_num = self.new_cycle_opportunities.popleft()
+            if cycle_num in self.cycle_engine.profitable:
+                print(str(datetime.now()) + ", 수익을 낼 수 있는 사이클 : " + self.cycle_engine.get_cycle_str(cycle_num) + ", 예상 수익률 : " + str(round(self.cycle_engine.get_cycle_profit(cycle_num), 4)))
+
+    """ 샤드 하나(codes)를 웹 소켓 연결 하나로 구독하고, 받은 호가를 바로 저장소에 씀 """
+    async def get_orderbook_with_websocket(self, codes):
+        async with websockets.connect(self.websocket_url, ping_interval=self.WEBSOCKET_PING_INTERVAL, ping_timeout=self.WEBSOCKET_PING_INTERVAL) as websocket:
             # 구독 요청
-            data = "[{\"ticket\":\"auto_trading\"},{\"format\":\"SIMPLE\"},{\"type\":\"crixOrderbook\",\"codes\":[\"CRIX.UPBIT.KRW-BTC.1\"," + self.trade_coin_str + "]}]"
-
-            await websocket.send(data)
+            await websocket.send(subscription_manager.get_request(codes, self.orderbook_depth))
+            if "KRW-BTC" in codes:
+                self.feed_connected.set()
 
+            decoder = OrderbookDecoder(self.orderbook_depth)  # 메시지를 딕셔너리로 만들지 않고 호가 배열로 바로 읽음
             while True:
                 recv_data = await websocket.recv()
-                orderbook = json.loads(recv_data)
-                self.orderbook_dictionary[orderbook["cd"][11:]] = orderbook["obu"]
-                if orderbook["st"] == "SNAPSHOT":
-                    self.previous_orderbook_dictionary[orderbook["cd"][11:]] = orderbook["obu"]
-                    self.orderbook_dictionary[orderbook["cd"][11:]] = orderbook["obu"]
-                else:
-                    self.previous_orderbook_dictionary[orderbook["cd"][11:]] = self.orderbook_dictionary[orderbook["cd"][11:]]
-                    self.orderbook_dictionary[orderbook["cd"][11:]] = orderbook["obu"]
+                received_at = time.time()
+                if decoder.decode(recv_data):
+                    self.apply_orderbook(decoder, received_at)
+
+    """ 디코더가 읽은 호가를 저장소, L2 호가, 호가 변동 내역, 사이클 엔진에 쓰고 바뀐 코인을 수익 계산 스레드에 넘김 -> received_at은 메시지를 받은 시각 (0이면 지금) """
+    def apply_orderbook(self, decoder, received_at=0.0):
+        store = self.orderbook_store
+        code = decoder.code
+        market_id = store.ids.get(code)
+        if market_id is None:
+            return
+        ask_price = decoder.ask_price[0]
+        bid_price = decoder.bid_price[0]
+        now = time.time()
+        store.update(market_id, ask_price, decoder.ask_size[0], bid_price, decoder.bid_size[0], shift_previous=decoder.stream_type != "SNAPSHOT", updated_at=now)  # SNAPSHOT이면 저장된 상태에서 불러온 직전 호가를 그대로 사용
+        if self.recorder is not None:
+            self.recorder.record(received_at if received_at > 0 else now, decoder.timestamp, market_id, ask_price, decoder.ask_size[0], bid_price, decoder.bid_size[0], snapshot=decoder.stream_type == "SNAPSHOT")
+        if self.tracer is not None:
+            self.tracer.frame(market_id, decoder.timestamp, received_at if received_at > 0 else now, now)
+        if self.l2_books is not None:
+            self.l2_books[market_id].apply_levels(decoder.ask_price, decoder.ask_size, decoder.bid_price, decoder.bid_size, decoder.levels, decoder.timestamp)
+        history = self.price_history
+        history.append(market_id, ask_price, bid_price, now)
+        if self.trend_window > 0:  # 직전 호가 대신 trend_window초 전 호가와 비교함
+            index = history.get_window_index(market_id, now)
+            store.set_previous(market_id, history.ask_price[index], history.bid_price[index])
+        if self.cycle_engine is not None:  # 이 마켓이 포함된 사이클만 다시 계산함
+            new_cycles = self.cycle_engine.update_market(code, ask_price, bid_price)
+            if len(new_cycles) > 0:
+                self.new_cycle_opportunities.extend(new_cycles)
+                self.dirty_coins.wake()
+
+        """ 바뀐 코인만 수익 계산 스레드에 넘김 -> KRW-BTC가 바뀌면 모든 코인의 수익률이 바뀜 """
+        if market_id == store.market_id:
+            self.dirty_coins.mark_all()
+        elif market_id < store.coin_count * 2:
+            self.dirty_coins.mark(market_id % store.coin_count)
+        if not self.orderbook_ready.is_set():
+            self.received_codes.add(code)
+            if len(self.received_codes) >= len(self.subscription_codes) + 1:  # 구독한 모든 마켓 + KRW-BTC
+                self.orderbook_ready.set()
+
+    """ 연결이 끊긴 샤드의 마켓을 오래된 호가로 만듦 -> KRW-BTC가 끊기면 다시 연결할 때까지 수익 계산을 멈춤 """
+    def expire_codes(self, codes):
+        store = self.orderbook_store
+        store.expire([store.ids[code] for code in codes if code in store.ids])
+        if "KRW-BTC" in codes:
+            self.feed_connected.clear()
+        self.dirty_coins.wake()
 
     @staticmethod
     def get_time_str():
@@ -180,84 +412,137 @@ class UpbitMachine:
         nonce = raw_time[2:10] + raw_time[11:13]
         return nonce
 
-    def api_query(self, authorization=False, path=None, method="get", query_params=None):
-        with requests.Session() as s:
+    """ 스레드마다 하나의 세션을 두고, 모든 세션이 같은 커넥션 풀을 공유함 -> 매 요청마다 TCP/TLS 연결을 새로 맺지 않음 """
+    def get_session(self):
+        session = getattr(self.session_local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self.http_adapter)
+            session.mount("http://", self.http_adapter)
+            self.session_local.session = session
+        return session
+
+    """ 커넥션 풀의 연결을 미리 맺어둠 -> 첫 거래에서 연결 지연이 생기지 않도록 함 """
+    def warm_up_connection_pool(self):
+        barrier = Barrier(self.http_pool_size)
+
+        def connect():
             try:
-                headers = {"User-Agent": platform.platform()}
-                url = "{0:s}{1:s}".format(self.BASE_API_URL, path)
-                if authorization:
-                    payload = {
-                        "access_key": self.access_key,
-                        "nonce": str(self.get_nonce())
-                    }
-                    if query_params is not None:
-                        payload["query"] = query_params
-                        url = "{0:s}?{1:s}".format(url, query_params)
-                    token = jwt.encode(payload, self.secret_key, algorithm="HS256")
-                    headers["Authorization"] = "Bearer {0:s}".format(token.decode("utf-8"))
-                    req = requests.Request(method, url, headers=headers)
-                else:
-                    req = requests.Request(method, url, headers=headers, params=query_params)
-                prepped = s.prepare_request(req)
-                response = s.send(prepped)
-                temp = response.json()
-                if "error" in temp:
-                    if temp["error"]["name"] == "insufficient_funds_bid":
-                        return None
-                    elif temp["error"]["name"] == "under_min_total_ask":
-                        return None
-                    elif temp["error"]["name"] == "nonce_used":
-                        time.sleep(1)
-                        print(response.content.decode("utf-8"))
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                    elif temp["error"]["name"] == "too_many_requests":
-                        time.sleep(1)
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                    elif temp["error"]["name"] == "server_error":
-                        time.sleep(1)
-                        print(response.content.decode("utf-8"))
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                    elif temp["error"]["name"] == "internal_server_error":  # 그냥 어쩌다 한 번씩 나오는 오류
-                        time.sleep(1)
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                    elif temp["error"]["name"] == "order_not_found":  # 주문을 너무 빨리 가져오는 경우
-                        time.sleep(0.1)
-                        if method == "delete":  # 취소 주문 과정에서 주문을 찾을 수 없다고 나오는 경우 -> 이미 체결된 상황
-                            return None
-                        print(response.content.decode("utf-8"))
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                    elif temp["error"]["name"] == "invalid_funds_ask":  # 비정상적인 매개변수로 주문을 넣은 경우
-                        print(response.content.decode("utf-8"))
-                        return None
-                    elif temp["error"]["name"] == "market_offline":  # 시스템 점검 중인 경우
-                        print("시스템 점검 중이므로 30초 후 거래를 다시 시도합니다.")
-                        time.sleep(30)
-                        return self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                    else:
-                        print(temp)
-                if path == "orders":
-                    if response.status_code == 504:  # 504 Gateway Time-out
-                        s.close()
-                        time.sleep(1)
-                        print(response.content.decode("504 Gateway Time-out"))
-                        self.api_query(authorization=authorization, path=path, method=method, query_params=query_params)
-                if response.status_code != 200 and response.status_code != 201:
-                    print(query_params)
-                    print(response.content.decode("utf-8"))
-                return response.json() if response.status_code == 200 or response.status_code == 201 else None
+                barrier.wait(timeout=5)
+            except BrokenBarrierError:
+                pass
+            try:
+                self.rate_limiter.acquire(self.rate_limiter.get_group("market/all"))
+                self.get_session().get(self.BASE_API_URL + "market/all", headers={"User-Agent": platform.platform()}, timeout=5)
+            except requests.RequestException as e:
+                print(repr(e))
+
+        threads = [Thread(target=connect) for _ in range(self.http_pool_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    """ API 응답의 오류를 확인함 -> None : 정상 응답, -1 : None을 반환해야 하는 오류, 그 외 : 해당 시간(초)만큼 기다린 후 재요청 """
+    @staticmethod
+    def check_api_error(temp, method, content):
+        if "error" not in temp:
+            return None
+        if temp["error"]["name"] == "insufficient_funds_bid":
+            return -1
+        elif temp["error"]["name"] == "under_min_total_ask":
+            return -1
+        elif temp["error"]["name"] == "nonce_used":
+            print(content.decode("utf-8"))
+            return 1
+        elif temp["error"]["name"] == "too_many_requests":  # 요청 전에 rate_limiter가 기다려주므로 바로 재요청
+            return 0
+        elif temp["error"]["name"] == "server_error":
+            print(content.decode("utf-8"))
+            return 1
+        elif temp["error"]["name"] == "internal_server_error":  # 그냥 어쩌다 한 번씩 나오는 오류
+            return 1
+        elif temp["error"]["name"] == "order_not_found":  # 주문을 너무 빨리 가져오는 경우
+            if method == "delete":  # 취소 주문 과정에서 주문을 찾을 수 없다고 나오는 경우 -> 이미 체결된 상황
+                return -1
+            print(content.decode("utf-8"))
+            return 0.1
+        elif temp["error"]["name"] == "invalid_funds_ask":  # 비정상적인 매개변수로 주문을 넣은 경우
+            print(content.decode("utf-8"))
+            return -1
+        elif temp["error"]["name"] == "market_offline":  # 시스템 점검 중인 경우
+            print("시스템 점검 중이므로 30초 후 거래를 다시 시도합니다.")
+            return 30
+        else:
+            print(temp)
+        return None
+
+    def get_authorization_header(self, query_params=None):
+        payload = {
+            "access_key": self.access_key,
+            "nonce": str(self.get_nonce())  # 재시도할 때마다 nonce를 새로 만듦
+        }
+        if query_params is not None:
+            payload["query"] = query_params
+        token = jwt.encode(payload, self.secret_key, algorithm="HS256")
+        return "Bearer {0:s}".format(token.decode("utf-8"))
+
+    """ 요청 주소, 헤더, 쿼리 매개변수를 만듦 -> 인증 헤더의 nonce가 매번 달라야 하므로 재시도할 때마다 새로 만듦 """
+    def get_request(self, authorization, path, query_params):
+        url = "{0:s}{1:s}".format(self.BASE_API_URL, path)
+        headers = {"User-Agent": platform.platform()}
+        if not authorization:
+            return url, headers, query_params
+        if query_params is not None:
+            url = "{0:s}?{1:s}".format(url, query_params)
+        headers["Authorization"] = self.get_authorization_header(query_params)
+        return url, headers, None
+
+    """ 응답을 확인해서 (다시 요청하기 전에 기다릴 시간 (초), 반환값)을 반환함 -> 기다릴 시간이 None이면 반환값을 그대로 반환하고, 아니면 기다린 후 다시 요청함 """
+    def handle_response(self, status, headers, content, path, method, group, query_params):
+        self.rate_limiter.update(headers, path, method)
+        if status == 429:  # too_many_requests -> 고정된 시간 대신 다음 요청이 가능해질 때까지만 기다림
+            self.rate_limiter.penalize(group)
+            return 0, None
+        temp = message_decoder.decode(content)  # 한 번만 파싱해서 오류 확인과 반환에 같이 사용함
+        delay = self.check_api_error(temp, method, content)
+        if delay == -1:
+            return None, None
+        if delay is not None:
+            return delay, None
+        if path == "orders" and status == 504:  # 504 Gateway Time-out
+            print("504 Gateway Time-out")
+            return 1, None
+        if status != 200 and status != 201:
+            print(query_params)
+            print(content.decode("utf-8"))
+            return None, None
+        return None, temp
+
+    """ requests로 보내는 REST 요청 -> 웹 소켓 이벤트 루프 밖에서 api_query_async가 사용함 """
+    def api_query(self, authorization=False, path=None, method="get", query_params=None, priority=None):
+        s = self.get_session()
+        group = self.rate_limiter.get_group(path, method)
+        if priority is None:
+            priority = self.request_scheduler.get_priority(path, method)
+        while True:  # 재시도가 필요한 오류는 기다린 후 다시 요청함
+            try:
+                self.request_scheduler.acquire(group, priority)  # 우선순위가 높은 요청이 먼저 남은 요청 수를 사용함
+                url, headers, params = self.get_request(authorization, path, query_params)
+                response = s.request(method, url, headers=headers, params=params)
+                delay, res = self.handle_response(response.status_code, response.headers, response.content, path, method, group, query_params)
+                if delay is None:
+                    return res
+                time.sleep(delay)
             except requests.ConnectionError:
                 print("ConnectionError")
                 return None
             except Exception as e:
                 print(repr(e))
-            finally:
-                s.close()
+                return None
 
-    def get_my_wallet(self):
-        res = self.api_query(authorization=True, path="accounts", method="get")
-        while res is None:
-            res = self.api_query(authorization=True, path="accounts", method="get")
-        return res
+    def get_my_wallet(self, priority=None):
+        return self.run_sync(self.get_my_wallet_async(priority))
 
     @staticmethod
     def get_my_balance(wallet, coin_name):
@@ -267,11 +552,126 @@ class UpbitMachine:
         return 0
 
     def get_order(self, uuid, count=10):
+        return self.run_sync(self.get_order_async(uuid, count))
+
+    def get_order_list(self, market=None):
+        return self.run_sync(self.get_order_list_async(market))
+
+    @staticmethod
+    def get_order_query_params(trade_market, coin_name, side, volume, price, ord_type):
+        market = trade_market + "-" + coin_name
+        if volume is None:
+            return urlencode({"market": market,
+                              "side": side,
+                              "price": price,
+                              "ord_type": ord_type})
+        elif price is None:
+            return urlencode({"market": market,
+                              "side": side,
+                              "volume": volume,
+                              "ord_type": ord_type})
+        else:
+            return urlencode({"market": market,
+                              "side": side,
+                              "volume": volume,
+                              "price": price,
+                              "ord_type": ord_type})
+
+    def place_order(self, trade_market=None, coin_name=None, side="ask", volume=None, price=None, ord_type="limit"):
+        return self.run_sync(self.place_order_async(trade_market, coin_name, side, volume, price, ord_type))
+
+    def get_candle(self, trade_market=None, coin=None, unit=-1):
+        return self.run_sync(self.get_candle_async(trade_market, coin, unit))
+
+    """ uuid에 해당하는 주문을 취소하고 그 주문에 대한 내역을 반환 """
+    def cancel_order(self, uuid, count=2):
+        return self.run_sync(self.cancel_order_async(uuid, count))
+
+    """ 진행 중인 모든 주문을 취소 """
+    def cancel_all_order(self, market=None):
+        self.run_sync(self.cancel_all_order_async(market))
+
+    """ 웹 소켓과 같은 이벤트 루프에서 사용할 aiohttp 세션을 만듦 -> 반드시 이벤트 루프 안에서 호출해야 함 """
+    async def open_async_session(self):
+        if aiohttp is None:
+            raise Exception("비동기 REST 요청을 사용하려면 aiohttp를 설치해주세요")
+        if self.async_session is None or self.async_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.http_pool_size, keepalive_timeout=60)
+            self.async_session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": platform.platform()})
+        return self.async_session
+
+    async def close_async_session(self):
+        if self.async_session is not None and not self.async_session.closed:
+            await self.async_session.close()
+        self.async_session = None
+
+    """ 이벤트 루프 밖의 스레드에서 비동기 REST 요청을 사용할 수 있으면 True -> aiohttp가 설치되어 있고 웹 소켓 이벤트 루프가 돌고 있어야 함 """
+    def can_use_event_loop(self):
+        if aiohttp is None or self.event_loop is None or not self.event_loop.is_running():
+            return False
+        try:
+            asyncio.get_running_loop()  # 이벤트 루프 스레드에서 결과를 기다리면 루프가 멈춤
+            return False
+        except RuntimeError:
+            return True
+
+    """ 다른 스레드에서 이벤트 루프에 코루틴을 맡기고 결과를 기다림 """
+    def run_on_event_loop(self, coroutine, timeout=None):
+        if self.event_loop is None:
+            raise Exception("웹 소켓 이벤트 루프가 아직 시작되지 않았습니다")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.event_loop).result(timeout)
+
+    """ 동기 함수에서 REST 요청 코루틴을 실행하고 결과를 기다림 -> 웹 소켓 이벤트 루프를 쓸 수 있으면 그 루프에 맡기고,
+        아니면 (루프 시작 전, aiohttp 없음) 이 스레드에서 실행함 -> 이 경우 api_query_async가 requests로 요청함 """
+    def run_sync(self, coroutine):
+        if self.can_use_event_loop():
+            return self.run_on_event_loop(coroutine)
+        return asyncio.run(coroutine)
+
+    """ REST 요청 -> 웹 소켓 이벤트 루프에서는 aiohttp로 보내고, 그 밖의 이벤트 루프 (run_sync, 거래 스레드)에서는 requests로 보냄 """
+    async def api_query_async(self, authorization=False, path=None, method="get", query_params=None, priority=None):
+        if asyncio.get_running_loop() is not self.event_loop:  # 이 스레드만 기다리므로 동기 요청을 보내도 됨
+            return self.api_query(authorization, path, method, query_params, priority)
+        session = await self.open_async_session()
+        group = self.rate_limiter.get_group(path, method)
+        if priority is None:
+            priority = self.request_scheduler.get_priority(path, method)
+        while True:  # 재시도가 필요한 오류는 기다린 후 다시 요청함
+            try:
+                await self.request_scheduler.acquire_async(group, priority)
+                url, headers, params = self.get_request(authorization, path, query_params)
+                async with session.request(method.upper(), url, headers=headers, params=params) as response:
+                    status = response.status
+                    content = await response.read()
+                    response_headers = response.headers
+                delay, res = self.handle_response(status, response_headers, content, path, method, group, query_params)
+                if delay is None:
+                    return res
+                await asyncio.sleep(delay)
+            except aiohttp.ClientConnectionError:
+                print("ConnectionError")
+                return None
+            except Exception as e:
+                print(repr(e))
+                return None
+
+    async def get_all_coin_list_async(self):
+        res = await self.api_query_async(authorization=True, path="market/all", method="get")
+        while res is None:
+            await asyncio.sleep(0.1)
+            res = await self.api_query_async(authorization=True, path="market/all", method="get")
+        return res
+
+    async def get_my_wallet_async(self, priority=None):
+        res = await self.api_query_async(authorization=True, path="accounts", method="get", priority=priority)
+        while res is None:
+            res = await self.api_query_async(authorization=True, path="accounts", method="get", priority=priority)
+        return res
+
+    """ 주문이 끝날 때까지 (done, cancel) 최대 count번 다시 불러옴 -> 주문을 불러오지 못하면 1 """
+    async def get_order_async(self, uuid, count=10):
         query_params = urlencode({"uuid": uuid})
-        res = self.api_query(authorization=True, path="order", method="get", query_params=query_params)
-        if res == -1:
-            print("get_order에서 그냥 -1이 반환됨, uuid = " + uuid)
-            return -1
+        res = await self.api_query_async(authorization=True, path="order", method="get", query_params=query_params)
         i = 0
         while True:
             if i >= count:
@@ -282,97 +682,94 @@ class UpbitMachine:
             if res["state"] == "done" or res["state"] == "cancel":
                 return res
             else:
-                res = self.api_query(authorization=True, path="order", method="get", query_params=query_params)
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
+                res = await self.api_query_async(authorization=True, path="order", method="get", query_params=query_params)
                 i = i + 1
 
-    def get_order_list(self, market=None):
+    async def get_order_list_async(self, market=None):
         if market is None:
             query_params = urlencode({"state": "wait"})
         else:
             query_params = urlencode({"state": "wait",
                                       "market": market})
-        res = self.api_query(authorization=True, path="orders", method="get", query_params=query_params)
-        return res
-
-    def place_order(self, trade_market=None, coin_name=None, side="ask", volume=None, price=None, ord_type="limit"):
-        market = trade_market + "-" + coin_name
-        query_params = None
-        if volume is None:
-            query_params = urlencode({"market": market,
-                                      "side": side,
-                                      "price": price,
-                                      "ord_type": ord_type})
-        elif price is None:
-            query_params = urlencode({"market": market,
-                                      "side": side,
-                                      "volume": volume,
-                                      "ord_type": ord_type})
-        else:
-            query_params = urlencode({"market": market,
-                                      "side": side,
-                                      "volume": volume,
-                                      "price": price,
-                                      "ord_type": ord_type})
+        return await self.api_query_async(authorization=True, path="orders", method="get", query_params=query_params)
 
-        res = self.api_query(authorization=True, path="orders", method="post", query_params=query_params)
+    async def place_order_async(self, trade_market=None, coin_name=None, side="ask", volume=None, price=None, ord_type="limit"):
+        query_params = self.get_order_query_params(trade_market, coin_name, side, volume, price, ord_type)
+        res = await self.send_order_async(query_params)
 
         if res is None:  # insufficient_funds_bid 오류
             print(query_params)
-            self.cancel_all_order()
-            res = self.api_query(authorization=True, path="orders", method="post", query_params=query_params)
+            await self.cancel_all_order_async()
+            res = await self.send_order_async(query_params)
             if res is None:  # 주문 모두 취소했는데도 오류가 생기면 진짜 돈이 부족하다고 판단하고 오류 처리
                 return None
         return res["uuid"]
 
-    def get_candle(self, trade_market=None, coin=None, unit=-1):
+    """ 주문을 보내고, 보낸 시각과 거래소가 응답한 시각을 기록함 """
+    async def send_order_async(self, query_params):
+        sent_at = time.time()
+        if self.tracer is not None:
+            self.tracer.order_sent_at(sent_at)
+        res = await self.api_query_async(authorization=True, path="orders", method="post", query_params=query_params)
+        if self.tracer is not None and res is not None:
+            self.tracer.order_acknowledged(sent_at)
+        return res
+
+    async def get_candle_async(self, trade_market=None, coin=None, unit=-1):
         if trade_market is None or coin is None or unit < 0:
             raise Exception("Need to set params")
         if unit != 1 and unit != 3 and unit != 5 and unit != 10 and unit != 15 and unit != 30 and unit != 60 and unit != 240:
             raise Exception("올바른 분 단위를 입력해주세요")
-        currency_type = trade_market + "-" + coin
-        query_params = urlencode({"market": currency_type})
+        query_params = urlencode({"market": trade_market + "-" + coin})
+        res = await self.api_query_async(authorization=False, path="candles/minutes/" + str(unit), method="get", query_params=query_params)
         try:
-            res = self.api_query(authorization=False, path='candles/minutes/' + str(unit), method='get', query_params=query_params)
             if "candle_acc_trade_price" in res[0]:
                 return res[0]
-        except requests.exceptions.ConnectionError:
-            return -1
-        except TypeError:
+        except (TypeError, IndexError, KeyError):
             return -1
         return -1
 
-    """ uuid에 해당하는 주문을 취소하고 그 주문에 대한 내역을 반환 """
-    def cancel_order(self, uuid, count=2):
+    """ uuid에 해당하는 주문을 취소하고 그 주문에 대한 내역을 반환
+        주문을 불러오지 못했거나 아직 끝나지 않았으면 기다리는 시간을 두 배씩 늘려가며 다시 취소하고, CANCEL_RETRY_LIMIT번 안에 끝나지 않으면 오류 """
+    async def cancel_order_async(self, uuid, count=2):
         query_params = urlencode({"uuid": uuid})
-        self.api_query(authorization=True, path="order", method="delete", query_params=query_params)
-        order = self.get_order(uuid=uuid, count=count)
-        while order["state"] != "cancel" and order["state"] != "done":
-            self.api_query(authorization=True, path="order", method="delete", query_params=query_params)
-            order = self.get_order(uuid=uuid, count=count)
+        delay = self.CANCEL_RETRY_DELAY
+        for _ in range(0, self.CANCEL_RETRY_LIMIT):
+            await self.api_query_async(authorization=True, path="order", method="delete", query_params=query_params)
+            order = await self.get_order_async(uuid=uuid, count=count)
+            if order != 1 and (order["state"] == "cancel" or order["state"] == "done"):
+                return order
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.CANCEL_MAX_RETRY_DELAY)
             count = count + 1
-        return order
-
-    """ 진행 중인 모든 주문을 취소 """
-    def cancel_all_order(self, market=None):
-        order_list = self.get_order_list(market)
-        for i in range(0, len(order_list)):
-            self.cancel_order(uuid=order_list[i]["uuid"])
+        raise Exception("주문을 취소하지 못했습니다. uuid = " + uuid)
+
+    """ 진행 중인 모든 주문을 동시에 취소 -> 취소하지 못한 주문은 출력만 함 """
+    async def cancel_all_order_async(self, market=None):
+        order_list = await self.get_order_list_async(market)
+        if order_list is None:  # 주문 목록을 불러오지 못함
+            return
+        results = await asyncio.gather(*[self.cancel_order_async(uuid=order["uuid"]) for order in order_list], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(repr(result))
 
     """ 주기적으로 지갑을 불러옴 -> 정확한 가격 계산을 위함 """
     def get_my_wallet_periodically(self):
         while True:
             if self.trading is False:
-                self.wallet = self.get_my_wallet()
+                self.wallet = self.get_my_wallet(priority=PRIORITY_HOUSEKEEPING)  # 거래 중인 요청보다 늦게 처리됨
                 time.sleep(20)
             else:
                 time.sleep(5)
 
-    def calculate_profit_of_cycle(self, coin_name, cycle_num):
+    def calculate_profit_of_cycle(self, coin_num, cycle_num):
+        store = self.orderbook_store
         if cycle_num == 1:  # BTC 시장에서 사서 KRW 시장에 판매
-            profit = 1 / self.orderbook_dictionary["BTC-" + coin_name][0]["ap"] * self.orderbook_dictionary["KRW-" + coin_name][0]["bp"] / self.orderbook_dictionary["KRW-BTC"][0]["ap"]
+            profit = 1 / store.ask_price[store.coin_count + coin_num] * store.bid_price[coin_num] / store.ask_price[store.market_id]
         else:  # KRW 시장에서 사서 BTC 시장에 판매
-            profit = 1 / self.orderbook_dictionary["KRW-" + coin_name][0]["ap"] * self.orderbook_dictionary["BTC-" + coin_name][0]["bp"] * self.orderbook_dictionary["KRW-BTC"][0]["bp"]
+            profit = 1 / store.ask_price[coin_num] * store.bid_price[store.coin_count + coin_num] * store.bid_price[store.market_id]
         return profit * 0.996502749375
 
     @staticmethod
@@ -384,28 +781,32 @@ class UpbitMachine:
 
     """ 단위를 i번째 코인의 단위로 변환함 """
 
-    def get_x_coin_volume(self, coin_name, cycle_num, order_volume):
+    def get_x_coin_volume(self, coin_num, cycle_num, order_volume):
+        store = self.orderbook_store
         if cycle_num == 1:
-            return order_volume / self.orderbook_dictionary["BTC-" + coin_name][0]["ap"]
+            return order_volume / store.ask_price[store.coin_count + coin_num]
         elif cycle_num == 2:
-            return order_volume / self.orderbook_dictionary["BTC-" + coin_name][0]["bp"]
+            return order_volume / store.bid_price[store.coin_count + coin_num]
 
     """ 최적 주문 개수를 구함 """
 
-    def get_optimal_volume(self, coin_name, cycle_num=None):
+    def get_optimal_volume(self, coin_num, cycle_num=None):
         if cycle_num is None:
             raise Exception("you need to set param")
+        store = self.orderbook_store
+        krw_id = coin_num
+        btc_id = store.coin_count + coin_num
         if cycle_num == 1:
-            return min(self.orderbook_dictionary["BTC-" + coin_name][0]["ap"] * self.orderbook_dictionary["BTC-" + coin_name][0]["as"],
-                       self.orderbook_dictionary["KRW-" + coin_name][0]["bp"] * self.orderbook_dictionary["KRW-" + coin_name][0]["bs"] / self.orderbook_dictionary["KRW-BTC"][0]["ap"])
+            return min(store.ask_price[btc_id] * store.ask_size[btc_id],
+                       store.bid_price[krw_id] * store.bid_size[krw_id] / store.ask_price[store.market_id])
         elif cycle_num == 2:
-            return min(self.orderbook_dictionary["KRW-" + coin_name][0]["as"] * self.orderbook_dictionary["BTC-" + coin_name][0]["bp"],
-                       self.orderbook_dictionary["BTC-" + coin_name][0]["bs"] * self.orderbook_dictionary["BTC-" + coin_name][0]["bp"])
+            return min(store.ask_size[krw_id] * store.bid_price[btc_id],
+                       store.bid_size[btc_id] * store.bid_price[btc_id])
 
     """ 최적 주문 개수를 실제 주문할 개수로 변환함 """
 
-    def get_order_volume(self, optimal_volume=-1):
-        val = optimal_volume * 0.7
+    def get_order_volume(self, optimal_volume=-1, rate=None):
+        val = optimal_volume * (self.ORDER_VOLUME_RATE if rate is None else rate)
         if val < self.minimum_by_bitcoin:
             return -1
         if val >= self.maximum_by_bitcoin:
@@ -438,109 +839,266 @@ class UpbitMachine:
         else:
             return price - price % 1000
 
-    def orderbook_thread_function(self):
-        asyncio.run(self.get_orderbook_with_websocket())
+    async def run_event_loop(self):
+        self.event_loop = asyncio.get_running_loop()
+        self.event_loop_started.set()
+        if aiohttp is not None:
+            await self.open_async_session()
+        try:
+            await asyncio.gather(*[self.keep_orderbook_with_websocket(codes) for codes in self.subscription_manager.get_local_shards()])
+        finally:
+            await self.close_async_session()
+
+    """ 웹 소켓이 끊기면 기다리는 시간을 두 배씩 늘려가며 다시 연결하고 구독함
+        끊긴 동안 그 샤드의 호가는 오래된 호가로 만들고, 다시 연결하면 마켓마다 처음 받는 SNAPSHOT으로 호가를 맞춘 뒤부터 거래함 """
+    async def keep_orderbook_with_websocket(self, codes):
+        delay = self.WEBSOCKET_RECONNECT_DELAY
+        while True:
+            connected_at = time.time()
+            try:
+                await self.get_orderbook_with_websocket(codes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("웹 소켓 연결이 끊겼습니다. " + repr(e))
+            if time.time() - connected_at > self.WEBSOCKET_MAX_RECONNECT_DELAY:  # 한동안 연결되어 있다가 끊긴 경우 -> 바로 다시 연결함
+                delay = self.WEBSOCKET_RECONNECT_DELAY
+            self.expire_codes(codes)
+            print(str("{:.1f}".format(delay)) + "초 후 웹 소켓에 다시 연결합니다.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.WEBSOCKET_MAX_RECONNECT_DELAY)
 
-    """ 저장된 호가를 통해 i번째 코인이 각 사이클에서 수익을 낼 수 있는지 계산하고 수익을 낼 수 있는 사이클이 있으면 거래를 시작함 """
+    def orderbook_thread_function(self):
+        asyncio.run(self.run_event_loop())
+
+    """ 작업 프로세스를 띄우고, 작업 프로세스가 디코딩해서 보낸 호가를 저장소에 씀 -> 작업 프로세스마다 받는 스레드 하나
+        받는 스레드는 파이프만 읽고, 저장소에 쓰는 건 웹 소켓 이벤트 루프에서 함 -> apply_orderbook은 항상 한 스레드에서만 실행됨 """
+    def start_worker_processes(self):
+        self.worker_decoder = OrderbookDecoder(self.orderbook_depth)  # 이벤트 루프에서만 사용함
+        for shards in self.subscription_manager.get_process_shards():
+            receiver, sender = Pipe(duplex=False)
+            Process(target=subscription_manager.run_worker, args=(shards, self.orderbook_depth, sender, self.WEBSOCKET_PING_INTERVAL, self.WEBSOCKET_RECONNECT_DELAY, self.WEBSOCKET_MAX_RECONNECT_DELAY, self.websocket_url), daemon=True).start()
+            Thread(target=self.receive_from_worker, args=(receiver,), name="worker_receiver").start()
+
+    def receive_from_worker(self, receiver):
+        self.event_loop_started.wait()
+        while True:
+            message = receiver.recv()
+            self.event_loop.call_soon_threadsafe(self.apply_worker_message, message)
+
+    """ 작업 프로세스가 보낸 메시지 하나를 처리함 -> 이벤트 루프에서 실행됨 """
+    def apply_worker_message(self, message):
+        if message[1] == DISCONNECTED:
+            self.expire_codes(message[2])
+            return
+        decoder = self.worker_decoder
+        decoder.code, decoder.stream_type, decoder.timestamp, levels = message[0:4]
+        decoder.levels = levels
+        decoder.ask_price[0:levels] = message[4]
+        decoder.ask_size[0:levels] = message[5]
+        decoder.bid_price[0:levels] = message[6]
+        decoder.bid_size[0:levels] = message[7]
+        self.apply_orderbook(decoder, message[8])
+
+    """ 호가가 바뀐 코인이 각 사이클에서 수익을 낼 수 있는지 계산하고 수익을 낼 수 있는 사이클이 있으면 거래를 시작함
+        웹 소켓 스레드가 호가를 받자마자 깨우고, 그 사이에 여러 번 바뀐 코인은 한 번만 계산함 """
 
     def calculate_profit(self):
         while True:
-            time.sleep(0.05)
-            for coin_name in self.trade_coin_list:
-                """ KRW <-> BTC """
-                profit_btc_krw = 0
-                profit_krw_btc = 0
-                try:
-                    profit_btc_krw = self.calculate_profit_of_cycle(coin_name, 1)  # 1번 사이클 : BTC 시장에서 사서 KRW 시장에 판매
-                    profit_krw_btc = self.calculate_profit_of_cycle(coin_name, 2)  # 2번 사이클 : KRW 시장에서 사서 BTC 시장에 판매
-                except Exception as e:
-                    print(repr(e))
-                    print("calculate_profit_of_cycle에서 에러 발생!")
-
-                """ 몇 번째 사이클이 최대의 수익률을 낼 수 있는지 확인 """
-                max_profit = profit_btc_krw
-                max_profit_cycle_num = 1
-
-                if profit_krw_btc > max_profit:
-                    max_profit = profit_krw_btc
-                    max_profit_cycle_num = 2
-                """
+            all_coins, dirty_coins = self.dirty_coins.wait(self.EVALUATION_TIMEOUT)
+            if self.cycle_engine is not None:
+                self.report_cycle_opportunities()
+            if all_coins is False and len(dirty_coins) == 0:
+                continue
+            self.evaluate_coins(all_coins, dirty_coins)
+
+    """ 바뀐 코인(all_coins가 True면 모든 코인)의 수익률을 계산하고 조건을 만족하면 거래를 시작함 -> 리플레이에서도 같은 코드로 계산함 """
+    def evaluate_coins(self, all_coins, dirty_coins):
+        if not self.feed_connected.is_set():  # 웹 소켓이 끊긴 동안에는 멈춘 호가로 거래하지 않음
+            return
+        if self.vector_scanner is not None:
+            self.scan_coins(None if all_coins else dirty_coins)
+            return
+        store = self.orderbook_store
+        now = time.time()
+        if not store.is_fresh(store.market_id, now, self.stale_market_seconds):
+            return
+        coin_nums = range(0, store.coin_count) if all_coins else sorted(dirty_coins)  # 거래량 순서를 유지함
+        for coin_num in coin_nums:
+            if not store.is_fresh(coin_num, now, self.stale_market_seconds) or not store.is_fresh(store.coin_count + coin_num, now, self.stale_market_seconds):
+                continue
+            """ KRW <-> BTC """
+            profit_btc_krw = 0
+            profit_krw_btc = 0
+            try:
+                profit_btc_krw = self.calculate_profit_of_cycle(coin_num, 1)  # 1번 사이클 : BTC 시장에서 사서 KRW 시장에 판매
+                profit_krw_btc = self.calculate_profit_of_cycle(coin_num, 2)  # 2번 사이클 : KRW 시장에서 사서 BTC 시장에 판매
+            except Exception as e:
+                print(repr(e))
+                print("calculate_profit_of_cycle에서 에러 발생!")
+
+            """ 몇 번째 사이클이 최대의 수익률을 낼 수 있는지 확인 """
+            max_profit = profit_btc_krw
+            max_profit_cycle_num = 1
+
+            if profit_krw_btc > max_profit:
                 max_profit = profit_krw_btc
                 max_profit_cycle_num = 2
+            """
+            max_profit = profit_krw_btc
+            max_profit_cycle_num = 2
+            """
+
+            # print(self.trade_coin_list[coin_num] + " 코인의 최적 거래 사이클 번호 : " + str(max_profit_cycle_num) + "번, 예상 수익률 : " + str(max_profit))
+            if self.profit <= max_profit:
+                """ 두 번째 거래에서 거래할 코인의 가격이 상승세가 아니면 거래하지 않음 """
+                if self.trade_if_rising == 1:
+                    second_id = self.get_market_id(coin_num, self.market[max_profit_cycle_num][1])
+                    if store.bid_price[second_id] <= store.previous_bid_price[second_id]:
+                        print(self.market[max_profit_cycle_num][1] + "시장에서 " + self.trade_coin_list[coin_num] + "코인의 매수호가가 상승세가 아니므로 거래를 하지 않습니다. 얼마 전 가격 : " + str(store.ask_price[second_id]) + ", 현재 가격 : " + str(store.bid_price[second_id]))
+                        continue
+
+                """ 매수 매도 호가의 차이가 많이 나면 거래를 안 함 """
+                if self.trade_if_low_orderbook_difference == 1:
+                    first_id = self.get_market_id(coin_num, self.market[max_profit_cycle_num][0])
+                    orderbook_difference = store.ask_price[first_id] / store.bid_price[first_id]
+                    if orderbook_difference > self.orderbook_difference_rate:
+                        # print(self.market[max_profit_cycle_num][0] + "시장에서 " + self.ALL_COIN[i] + "코인의 매수 매도 호가의 차이가 많이 나므로 거래를 하지 않습니다. 매도 호가 : " + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i]["ask_price"]) + ", 매수 호가 : " + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i]["bid_price"]))
+                        continue
+
                 """
+                time.sleep(0.05)  # 해당 코인에 대해 많은 양의 거래가 한 순간에 이루어졌는데 그 중간 가격을 가지고 수익률을 계산한 경우를 방지
+                if self.profit > self.calculate_profit_of_cycle(coin_num, max_profit_cycle_num):
+                    print("코인 이름: " + self.trade_coin_list[coin_num] + ", 사이클 번호 : " + str(max_profit_cycle_num) + "번, 갑작스러운 시세변동으로 인해 거래를 하지 않습니다.")
+                else:
+                """
+                if True:
+                    optimal_volume = self.get_optimal_volume(coin_num=coin_num, cycle_num=max_profit_cycle_num)  # 비트 기준
+                    self.try_trade(coin_num, max_profit_cycle_num, max_profit, optimal_volume)
+
+    """ 벡터 스캐너로 호가가 바뀐 코인 (None이면 모든 코인)을 한 번에 계산하고, 수익률이 가장 높은 코인을 거래함 """
+    def scan_coins(self, coins=None):
+        store = self.orderbook_store
+        now = time.time()
+        if not store.is_received(store.market_id) or not store.is_fresh(store.market_id, now, self.stale_market_seconds):  # 시장 간 호가를 아직 받지 못했거나 오래됨
+            return
+        candidates = self.vector_scanner.scan(store.ask_price[store.market_id], store.bid_price[store.market_id], self.profit,
+                                              trade_if_rising=self.trade_if_rising,
+                                              trade_if_low_orderbook_difference=self.trade_if_low_orderbook_difference,
+                                              orderbook_difference_rate=self.orderbook_difference_rate,
+                                              volume_rate=self.ORDER_VOLUME_RATE,
+                                              minimum_by_bitcoin=self.minimum_by_bitcoin,
+                                              maximum_by_bitcoin=self.maximum_by_bitcoin,
+                                              now=now,
+                                              max_age=self.stale_market_seconds,
+                                              coins=coins)
+        for i, max_profit_cycle_num, max_profit, optimal_volume, order_volume in candidates:
+            if self.trading is True or self.try_trade(i, max_profit_cycle_num, max_profit, optimal_volume):  # 거래가 끝나면 호가가 바뀌어 있으므로 한 코인만 거래하고 다시 계산함
+                break
+
+    """ 최우선 호가로 수익이 나는 코인의 주문 개수를 정하고 거래를 시작함 -> 호가 여러 단계를 구독하면 평균 체결가로 다시 확인함, 거래를 했으면 True """
+    def try_trade(self, coin_num, max_profit_cycle_num, max_profit, optimal_volume):
+        prices = None
+        rate = None
+        if self.l2_books is not None:
+            sized = self.size_with_depth(coin_num, max_profit_cycle_num)
+            if sized is None:
+                return False
+            max_profit, optimal_volume, prices = sized
+            rate = 1.0  # 평균 체결가로 이미 수익을 확인했으므로 줄이지 않음
+        order_volume = self.get_order_volume(optimal_volume=optimal_volume, rate=rate)  # 비트 기준
+        if order_volume != -1 and self.trading is False:
+            if self.tracer is not None:
+                self.tracer.start_cycle((coin_num, self.orderbook_store.coin_count + coin_num, self.orderbook_store.market_id))
+            self.start_trade(coin_num, max_profit_cycle_num, max_profit, optimal_volume, order_volume, prices)
+            return True
+        return False
+
+    """ 세 거래의 평균 체결가 기준 수익률이 profit 이상인 가장 큰 개수를 찾아서 (수익률, 최적 거래 개수 (비트 기준), 각 거래의 주문 가격)을 반환함 -> 없으면 None """
+    def size_with_depth(self, coin_num, cycle_num):
+        store = self.orderbook_store
+        first_id = self.get_market_id(coin_num, self.market[cycle_num][0])
+        second_id = self.get_market_id(coin_num, self.market[cycle_num][1])
+        result = depth_sizer.find_max_volume(cycle_num, self.l2_books[first_id].get_units(), self.l2_books[second_id].get_units(), self.l2_books[store.market_id].get_units(), self.profit)
+        if result is None:
+            return None
+        quantity, profit, cost, prices = result
+        btc_id = store.coin_count + coin_num
+        btc_price = store.ask_price[btc_id] if cycle_num == 1 else store.bid_price[btc_id]  # get_x_coin_volume에서 다시 코인 개수로 바꿀 때 쓰는 가격
+        return profit, quantity * btc_price, prices
+
+    """ 거래 사이클을 웹 소켓 이벤트 루프에 맡기고 바로 반환함 -> 수익 계산 스레드는 거래를 기다리지 않고, 거래가 끝날 때까지 self.trading으로 다음 거래만 막음 """
+    def start_trade(self, coin_num, max_profit_cycle_num, max_profit, optimal_volume, order_volume, prices=None):
+        coin_name = self.trade_coin_list[coin_num]
+        store = self.orderbook_store
+        self.trading = True
+        print("----------------------------------------------------------------------------------------------------------------------------------------")
+        print("현재시각 : " + str(datetime.now()) + ", " + coin_name + " 코인의 최적 거래 사이클 번호 : " + str(max_profit_cycle_num) + "번, 예상 수익률 : " + str(round(max_profit, 4)) + ", 최적 거래 개수 : " + str(round(optimal_volume, 8)))
+        print(str(datetime.now()) + ", " + str(store.get_unit(self.get_market_id(coin_num, "KRW"))) + ", " + str(store.get_unit(self.get_market_id(coin_num, "BTC"))))
+
+        x_coin_volume = self.get_x_coin_volume(coin_num=coin_num, cycle_num=max_profit_cycle_num, order_volume=order_volume)
+        coroutine = self.run_trade_cycle_async(coin_num, max_profit_cycle_num, max_profit, x_coin_volume, prices)
+        if self.can_use_event_loop():  # 주문도 웹 소켓과 같은 이벤트 루프에서 처리함 -> 거래 스레드를 따로 만들지 않음
+            asyncio.run_coroutine_threadsafe(coroutine, self.event_loop)
+        else:  # aiohttp가 없으면 거래 스레드의 이벤트 루프에서 requests로 거래함
+            Thread(target=asyncio.run, args=(coroutine,), name="trade_cycle").start()
+
+    """ 거래 사이클을 실행하고, 끝나면 지갑을 다시 불러와서 수익을 출력함 -> 오류가 나도 다음 거래를 할 수 있게 함 """
+    async def run_trade_cycle_async(self, coin_num, cycle_num, max_profit, volume, prices=None):
+        store = self.orderbook_store
+        watcher = asyncio.ensure_future(self.watch_profit_async(coin_num, cycle_num, max_profit))
+        try:
+            await self.trade_cycle_async(coin_num, cycle_num, volume, prices)  # 지정가 거래, 느리더라도 안전하게 거래
+            # self.trade_cycle2(coin_num, cycle_num, volume)  # 시장가 거래, 크게 손해 볼 확률이 있지만 무시하고 아주 빠르게 거래 진행
+        except Exception as ex:
+            print("오류가 발생하여 거래가 중지되었습니다.")
+            print(repr(ex))
+            traceback.print_exc()
+        finally:
+            if self.tracer is not None:
+                self.tracer.complete_cycle()
+            watcher.cancel()
+        try:
+            await asyncio.sleep(0.5)
+
+            """ 초기 지갑 내역 불러오기 """
+            krw_balance = self.get_my_balance(self.wallet, "KRW")
+            btc_balance = self.get_my_balance(self.wallet, "BTC")
+
+            """ 거래 후 지갑내역 불러오기 """
+            self.wallet = await self.get_my_wallet_async()
+            krw_balance2 = self.get_my_balance(self.wallet, "KRW")
+            btc_balance2 = self.get_my_balance(self.wallet, "BTC")
+            print("초기 잔액               -> KRW : {}, BTC : {}".format(round(krw_balance), btc_balance))
+            print("최종 잔액               -> KRW : {}, BTC : {}".format(round(krw_balance2), btc_balance2))
+            print("거래를 통해 얻은 수익   -> KRW : {}원, BTC : {}원".format(round(krw_balance2 - krw_balance), round(store.bid_price[store.market_id] * (btc_balance2 - btc_balance))))
+            print("현재까지의 총 이익      -> KRW : {}원, BTC : {}원".format(round(krw_balance2 - self.get_my_balance(self.initial_wallet, "KRW")), round(store.bid_price[store.market_id] * (btc_balance2 - self.get_my_balance(self.initial_wallet, "BTC")))))
+            print("현재시각 : " + str(datetime.now()))
+            print("----------------------------------------------------------------------------------------------------------------------------------------")
+        finally:
+            self.trading = False
 
-                # print(coin_name + " 코인의 최적 거래 사이클 번호 : " + str(max_profit_cycle_num) + "번, 예상 수익률 : " + str(max_profit))
-                if self.profit <= max_profit:
-                    """ 두 번째 거래에서 거래할 코인의 가격이 상승세가 아니면 거래하지 않음 """
-                    if self.trade_if_rising == 1:
-                        if self.orderbook_dictionary[self.market[max_profit_cycle_num][1]+"-"+coin_name][0]["bp"] <= self.previous_orderbook_dictionary[self.market[max_profit_cycle_num][1]+"-"+coin_name][0]["bp"]:
-                            print(self.market[max_profit_cycle_num][1] + "시장에서 " + coin_name + "코인의 매수호가가 상승세가 아니므로 거래를 하지 않습니다. 얼마 전 가격 : " + str(self.orderbook_dictionary[self.market[max_profit_cycle_num][1]+"-"+coin_name][0]["ap"]) + ", 현재 가격 : " + str(self.orderbook_dictionary[self.market[max_profit_cycle_num][1]+"-"+coin_name][0]["bp"]))
-                            return
-
-                    """ 매수 매도 호가의 차이가 많이 나면 거래를 안 함 """
-                    if self.trade_if_low_orderbook_difference == 1:
-                        orderbook_difference = self.orderbook_dictionary[self.market[max_profit_cycle_num][0] + "-" + coin_name][0]["ap"] / self.orderbook_dictionary[self.market[max_profit_cycle_num][0] + "-" + coin_name][0]["bp"]
-                        if orderbook_difference > self.orderbook_difference_rate:
-                            # print(self.market[max_profit_cycle_num][0] + "시장에서 " + self.ALL_COIN[i] + "코인의 매수 매도 호가의 차이가 많이 나므로 거래를 하지 않습니다. 매도 호가 : " + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i]["ask_price"]) + ", 매수 호가 : " + str(self.coin_price[len(self.coin_price)-1][self.market[max_profit_cycle_num][0]][0][i]["bid_price"]))
-                            return
-
-                    """
-                    time.sleep(0.05)  # 해당 코인에 대해 많은 양의 거래가 한 순간에 이루어졌는데 그 중간 가격을 가지고 수익률을 계산한 경우를 방지
-                    if self.profit > self.calculate_profit_of_cycle(coin_name, max_profit_cycle_num):
-                        print("코인 이름: " + coin_name + ", 사이클 번호 : " + str(max_profit_cycle_num) + "번, 갑작스러운 시세변동으로 인해 거래를 하지 않습니다.")
-                    else:
-                    """
-                    if True:
-                        optimal_volume = self.get_optimal_volume(coin_name=coin_name, cycle_num=max_profit_cycle_num)  # 비트 기준
-                        order_volume = self.get_order_volume(optimal_volume=optimal_volume)  # 비트 기준
-                        if order_volume != -1 and self.trading is False:
-                            self.trading = True
-                            print("----------------------------------------------------------------------------------------------------------------------------------------")
-                            print("현재시각 : " + str(datetime.now()) + ", " + coin_name + " 코인의 최적 거래 사이클 번호 : " + str(max_profit_cycle_num) + "번, 예상 수익률 : " + str(round(max_profit, 4)) + ", 최적 거래 개수 : " + str(round(optimal_volume, 8)))
-                            print(str(datetime.now()) + ", " + str(self.orderbook_dictionary["KRW-" + coin_name][0]) + ", " + str(self.orderbook_dictionary["BTC-" + coin_name][0]))
-
-                            x_coin_volume = self.get_x_coin_volume(coin_name=coin_name, cycle_num=max_profit_cycle_num, order_volume=order_volume)
-
-                            try:
-                                t1 = datetime.now()
-                                Thread(target=self.trade_cycle, args=(coin_name, max_profit_cycle_num, x_coin_volume)).start()  # 지정가 거래, 느리더라도 안전하게 거래
-                                print(str(datetime.now()) + ", " + str(datetime.now()) + ", " + coin_name + " 코인의 profit : " + str(max_profit))
-                                while max_profit > self.profit:
-                                    time.sleep(0.1)
-                                    max_profit = self.calculate_profit_of_cycle(coin_name, max_profit_cycle_num)
-                                    print(str(datetime.now()) + ", " + str(self.orderbook_dictionary["KRW-" + coin_name][0]) + ", " + str(self.orderbook_dictionary["BTC-" + coin_name][0]))
-                                t2 = datetime.now()
-                                print(str(datetime.now()) + ", " + coin_name + " 코인의 profit : " + str(max_profit))
-                                print("거래 가능한 시간 : " + str(t2-t1))
-                                # self.trade_cycle2(coin_name, max_profit_cycle_num, x_coin_volume)  # 시장가 거래, 크게 손해 볼 확률이 있지만 무시하고 아주 빠르게 거래 진행
-                            except Exception as ex:
-                                print("오류가 발생하여 거래가 중지되었습니다.")
-                                print(repr(ex))
-                                traceback.print_exc()
-                            while self.trading is True:
-                                time.sleep(0.1)
-                            time.sleep(0.5)
-
-                            """ 초기 지갑 내역 불러오기 """
-                            krw_balance = self.get_my_balance(self.wallet, "KRW")
-                            btc_balance = self.get_my_balance(self.wallet, "BTC")
-
-                            """ 거래 후 지갑내역 불러오기 """
-                            self.wallet = self.get_my_wallet()
-                            krw_balance2 = self.get_my_balance(self.wallet, "KRW")
-                            btc_balance2 = self.get_my_balance(self.wallet, "BTC")
-                            print("초기 잔액               -> KRW : {}, BTC : {}".format(round(krw_balance), btc_balance))
-                            print("최종 잔액               -> KRW : {}, BTC : {}".format(round(krw_balance2), btc_balance2))
-                            print("거래를 통해 얻은 수익   -> KRW : {}원, BTC : {}원".format(round(krw_balance2 - krw_balance), round(float(self.orderbook_dictionary["KRW-BTC"][0]["bp"]) * (btc_balance2 - btc_balance))))
-                            print("현재까지의 총 이익      -> KRW : {}원, BTC : {}원".format(round(krw_balance2 - self.get_my_balance(self.initial_wallet, "KRW")), round(float(self.orderbook_dictionary["KRW-BTC"][0]["bp"]) * (btc_balance2 - self.get_my_balance(self.initial_wallet, "BTC")))))
-                            print("현재시각 : " + str(datetime.now()))
-                            print("----------------------------------------------------------------------------------------------------------------------------------------")
-                            self.trading = False
+    """ 예상 수익률이 profit 밑으로 떨어질 때까지 확인해서 거래 가능한 시간을 출력함 -> 거래가 먼저 끝나면 그때까지의 시간을 출력함 """
+    async def watch_profit_async(self, coin_num, cycle_num, max_profit):
+        coin_name = self.trade_coin_list[coin_num]
+        store = self.orderbook_store
+        t1 = datetime.now()
+        print(str(datetime.now()) + ", " + coin_name + " 코인의 profit : " + str(max_profit))
+        try:
+            while max_profit > self.profit:
+                await asyncio.sleep(0.1)
+                max_profit = self.calculate_profit_of_cycle(coin_num, cycle_num)
+                print(str(datetime.now()) + ", " + str(store.get_unit(self.get_market_id(coin_num, "KRW"))) + ", " + str(store.get_unit(self.get_market_id(coin_num, "BTC"))))
+        finally:
+            print(str(datetime.now()) + ", " + coin_name + " 코인의 profit : " + str(max_profit))
+            print("거래 가능한 시간 : " + str(datetime.now() - t1))
 
     """ 시장가로 즉시 거래 """
-    def trade_cycle2(self, coin_name=None, cycle_num=0, volume=0):
+    def trade_cycle2(self, coin_num=None, cycle_num=0, volume=0):
+        coin_name = self.trade_coin_list[coin_num]
+        store = self.orderbook_store
         """@@@@@@@@@@@@@@@@@@ 첫 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
-        price = volume * self.orderbook_dictionary[self.market[cycle_num][0]+"-"+coin_name][0]["ap"]
+        price = volume * store.ask_price[self.get_market_id(coin_num, self.market[cycle_num][0])]
         if cycle_num == 2:
             price = self.get_correct_krw_price(price)
         self.place_order(self.market[cycle_num][0], coin_name, self.order_type[cycle_num][0], volume=None, price=price, ord_type="price")  # 시장가 매수
@@ -563,123 +1121,136 @@ class UpbitMachine:
         """@@@@@@@@@@@@@@@@@@ 세 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
         volume = abs(volume2 - volume1)  # 거래 전후 BTC 수량 차이
         if cycle_num == 1:
-            self.place_order("KRW", "BTC", "bid", volume=None, price=volume * self.orderbook_dictionary["KRW-BTC"][0]["ap"], ord_type="price")  # 시장가 매수
+            self.place_order("KRW", "BTC", "bid", volume=None, price=volume * store.ask_price[store.market_id], ord_type="price")  # 시장가 매수
         elif cycle_num == 2:
             self.place_order("KRW", "BTC", "ask", volume=volume, price=None, ord_type="market")  # 시장가 매도
         time.sleep(1)
         self.trading = False
         print(str(datetime.now()) + ", 세 번째 거래 완료")
 
-    """ 일반 거래 """
-    def trade_cycle(self, coin_name=None, cycle_num=0, volume=0):
-        coin_bid_price = self.orderbook_dictionary[self.market[cycle_num][0]+"-"+coin_name][0][self.price_type[cycle_num][0]]  # 첫 번째 거래에서 코인 매수할 가격
-        coin_ask_price = self.orderbook_dictionary[self.market[cycle_num][1]+"-"+coin_name][0][self.price_type[cycle_num][1]]  # 두 번째 거래에서 코인 매도할 가격
+    """ 일반 거래 -> 웹 소켓과 같은 이벤트 루프에서 진행하므로 주문을 기다리는 동안에도 호가를 계속 받음, 거래 중 표시는 run_trade_cycle_async가 끔 """
+    async def trade_cycle_async(self, coin_num=None, cycle_num=0, volume=0, prices=None):
+        coin_name = self.trade_coin_list[coin_num]
+        store = self.orderbook_store
+        first_id = self.get_market_id(coin_num, self.market[cycle_num][0])  # 첫 번째 거래 마켓 번호
+        second_id = self.get_market_id(coin_num, self.market[cycle_num][1])  # 두 번째 거래 마켓 번호
+        coin_bid_price = store.get_price(first_id, self.price_type[cycle_num][0])  # 첫 번째 거래에서 코인 매수할 가격
+        coin_ask_price = store.get_price(second_id, self.price_type[cycle_num][1])  # 두 번째 거래에서 코인 매도할 가격
+        market_price = None  # 세 번째 거래의 첫 주문 가격
+        if prices is not None:  # 호가 여러 단계에 걸쳐 체결되도록 평균 체결가 계산에서 구한 가격에 주문함
+            coin_bid_price, coin_ask_price, market_price = prices
         """@@@@@@@@@@@@@@@@@@ 첫 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
-        order_id = self.place_order(trade_market=self.market[cycle_num][0], coin_name=coin_name, side=self.order_type[cycle_num][0], volume=volume, price=coin_bid_price)
+        order_id = await self.place_order_async(trade_market=self.market[cycle_num][0], coin_name=coin_name, side=self.order_type[cycle_num][0], volume=volume, price=coin_bid_price)
         original_price = coin_bid_price
         if order_id is None:
             print(str(datetime.now()) + ", 오류가 발생하여 거래를 종료합니다.")
-            self.trading = False
             return -1
         print(str(datetime.now()) + ", " + self.market[cycle_num][0] + " 시장에서 " + coin_name + " 코인을 " + str(coin_bid_price) + " " + self.market[cycle_num][0] + "에 " + str(volume) + "개 매수주문 함")
         # 주문내역을 불러옴
-        order = self.cancel_order(uuid=order_id, count=5)
+        order = await self.cancel_order_async(uuid=order_id, count=5)
         executed_volume = float(order["executed_volume"])  # 체결된 수량
         if executed_volume == 0.0:  # 체결이 전혀 안 되었으면
             print(str(datetime.now()) + ", 체결이 전혀 안 되었으므로 주문을 취소합니다.")
-            self.trading = False
             return -1
         # 조금이라도 체결 되었으면
+        if self.tracer is not None:
+            self.tracer.leg_filled(1)
         print(str(datetime.now()) + ", " + str(executed_volume) + "만큼 주문이 체결되었습니다.")
 
         """@@@@@@@@@@@@@@@@@@ 두 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
-        temp_wallet = self.get_my_wallet()
+        temp_wallet = await self.get_my_wallet_async()
         volume = self.get_my_balance(temp_wallet, coin_name)
-        order_id = self.place_order(trade_market=self.market[cycle_num][1], coin_name=coin_name, side=self.order_type[cycle_num][1], volume=volume, price=coin_ask_price)
+        order_id = await self.place_order_async(trade_market=self.market[cycle_num][1], coin_name=coin_name, side=self.order_type[cycle_num][1], volume=volume, price=coin_ask_price)
         if order_id is None:
             print(str(datetime.now()) + ", 오류가 발생하여 거래를 종료합니다.")
-            self.trading = False
             return -1
         print(str(datetime.now()) + ", " + self.market[cycle_num][1] + " 시장에서 " + coin_name + "코인을 " + str(coin_ask_price) + " " + self.market[cycle_num][1] + "에 " + str(executed_volume) + "개 매도주문 함")
         # 주문내역을 불러옴
-        self.get_order(order_id)
-        order = self.cancel_order(order_id)
+        await self.get_order_async(order_id)
+        order = await self.cancel_order_async(order_id)
         executed_volume = float(order["executed_volume"])
         state = order["state"]  # 주문 상태
         while state != "done":  # 주문이 완료되지 않았으면
-            order = self.cancel_order(uuid=order_id)  # 해당 주문 취소
-            resell_price = self.orderbook_dictionary[self.market[cycle_num][0]+"-"+coin_name][0]["bp"]  # 되파는 가격
-            profit_cycle = self.calculate_profit_of_cycle(coin_name, cycle_num)
+            order = await self.cancel_order_async(uuid=order_id)  # 해당 주문 취소
+            resell_price = store.bid_price[first_id]  # 되파는 가격
+            profit_cycle = self.calculate_profit_of_cycle(coin_num, cycle_num)
             profit_resell = self.calc_profit_resell(original_price, resell_price, cycle_num)
             my_volume = order["remaining_volume"]  # 미체결된 양
             if profit_cycle < profit_resell:  # 되파는 것이 사이클을 진행하는 것보다 이득이 날 경우
                 if str(my_volume) != "0.0":
-                    order_id = self.place_order(trade_market=self.market[cycle_num][0], coin_name=coin_name, side="ask", volume=my_volume, price=resell_price)
+                    order_id = await self.place_order_async(trade_market=self.market[cycle_num][0], coin_name=coin_name, side="ask", volume=my_volume, price=resell_price)
                     if order_id is None:
                         if executed_volume > 0:  # 사이클을 진행하여 체결된 양이 있으면 -> 오류가 떠도 세 번째 거래로 넘어감
                             break
                         else:  # 오류
                             print(str(datetime.now()) + ", 오류가 발생하여 거래를 종료합니다.")
-                            self.trading = False
                             return -1
                     print(str(datetime.now()) + ", 주문이 완료되지 않았으므로 현재 호가인 " + str(resell_price) + " " + self.market[cycle_num][0] + "에 " + str(my_volume) + "개를 " + self.market[cycle_num][0] + "시장에 되팝니다.")
-                    order = self.get_order(uuid=order_id, count=10)
+                    order = await self.get_order_async(uuid=order_id, count=10)
                     state = order["state"]  # 주문 상태
                     if state == "done":
                         if executed_volume > 0:
                             break
                         else:  # 사이클을 진행하지 않고 되팔기만 한 경우
                             print(str(datetime.now()) + ", 모든 주문이 체결되었습니다.")
-                            self.trading = False
                             return 0
                 else:  # 모두 체결된 경우
                     break
             else:  # 사이클을 계속 진행하는 경우
                 if str(my_volume) != "0.0":
-                    current_price = self.orderbook_dictionary[self.market[cycle_num][1]+"-"+coin_name][0][self.price_type[cycle_num][1]]
-                    order_id = self.place_order(trade_market=self.market[cycle_num][1], coin_name=coin_name, side=self.order_type[cycle_num][1], volume=my_volume, price=current_price)
+                    current_price = store.get_price(second_id, self.price_type[cycle_num][1])
+                    order_id = await self.place_order_async(trade_market=self.market[cycle_num][1], coin_name=coin_name, side=self.order_type[cycle_num][1], volume=my_volume, price=current_price)
                     print(str(datetime.now()) + ", 주문이 완료되지 않았으므로 현재 호가인 " + str(current_price) + " " + self.market[cycle_num][1] + "에 " + str(my_volume) + "개를 다시 주문을 합니다. (체결된 수량 : " + str(executed_volume) + ")")
                     if order_id is None:  # 극소량 주문해서 오류난 경우 -> 다 체결되었다 생각하고 넘어감
                         break
                     else:
-                        order = self.cancel_order(order_id)
+                        order = await self.cancel_order_async(order_id)
                         executed_volume = executed_volume + float(order["executed_volume"])
                         state = order["state"]  # 주문 상태
                 else:
                     break
         if executed_volume > 0.0:  # 조금이라도 체결 되었으면
             if order_id is not None:
-                self.cancel_order(uuid=order_id)  # 해당 주문 취소
+                await self.cancel_order_async(uuid=order_id)  # 해당 주문 취소
+            if self.tracer is not None:
+                self.tracer.leg_filled(2)
             print(str(datetime.now()) + ", " + str(executed_volume) + "만큼 주문이 체결되었습니다.")
 
             volume1 = self.get_my_balance(self.wallet, "BTC")  # 초기에 보유한 BTC 수량
 
-            temp_wallet = self.get_my_wallet()
+            temp_wallet = await self.get_my_wallet_async()
             volume2 = self.get_my_balance(temp_wallet, "BTC")  # 두 번째 거래 이후에 보유한 BTC 수량
 
             volume = abs(volume2 - volume1)  # 거래 전후 BTC 수량 차이
 
             """@@@@@@@@@@@@@@@@@@ 세 번째 거래 시작 @@@@@@@@@@@@@@@@@@"""
             while True:
-                price = self.orderbook_dictionary["KRW-BTC"][0][self.price_type[cycle_num][2]]
-                order_id = self.place_order(trade_market="KRW", coin_name="BTC", side=self.order_type[cycle_num][2], volume=volume, price=price)
+                price = market_price if market_price is not None else store.get_price(store.market_id, self.price_type[cycle_num][2])
+                market_price = None
+                order_id = await self.place_order_async(trade_market="KRW", coin_name="BTC", side=self.order_type[cycle_num][2], volume=volume, price=price)
                 if order_id is None:
                     print(str(datetime.now()) + ", 오류가 발생하여 거래를 종료합니다.")
-                    self.trading = False
                     return -1
                 if self.order_type[cycle_num][2] == "ask":
                     order_type = "매도"
                 else:
                     order_type = "매수"
                 print(str(datetime.now()) + ", KRW 시장에서 BTC를 " + str(price) + " 원에 " + str(volume) + "개를 " + order_type + " 주문하였습니다.")
-                order = self.cancel_order(order_id)
+                order = await self.cancel_order_async(order_id)
                 executed_volume = float(order["executed_volume"])  # 체결된 수량
                 print(str(datetime.now()) + ", " + str(executed_volume) + "만큼 주문이 체결되었습니다.")
                 if order["remaining_volume"] == "0.0":
-                    self.trading = False
+                    if self.tracer is not None:
+                        self.tracer.leg_filled(3)
                     return 0
                 volume = order["remaining_volume"]
 
+    """ 단계별 지연 시간을 주기적으로 출력함 """
+    def report_latency_periodically(self):
+        while True:
+            time.sleep(self.latency_report_interval)
+            print(self.tracer.get_report())
+
     def print_wallet(self):
         my_wallet = self.get_my_wallet()
         krw_balance = self.get_my_balance(my_wallet, "KRW")
@@ -687,11 +1258,33 @@ class UpbitMachine:
         print("현재시각 : " + str(datetime.now()) + ", KRW : " + str(krw_balance) + ", BTC : " + str(btc_balance))
 
     def start_threads(self):
-        Thread(target=self.get_my_wallet_periodically).start()  # 주기적으로 지갑 불러오는 스레드 시작
-        Thread(target=self.orderbook_thread_function).start()  # 각 코인 호가 불러오는 스레드 시작
-        time.sleep(2)
-        Thread(target=self.calculate_profit).start()  # 메인 스레드 시작
-        print(self.orderbook_dictionary)
+        if self.cycle_search == 1:
+            self.build_cycle_engine()
+        if self.vectorized_scan == 1:
+            if vector_scanner.is_available():
+                self.vector_scanner = VectorScanner(self.orderbook_store)
+            else:
+                print("numpy가 설치되어 있지 않아 코인별로 수익률을 계산합니다.")
+        self.profiler = StackProfiler(self.profiling_directory, self.profiling_interval)
+        install_signal_toggle(self.profiler, self.profiling_duration)  # kill -USR1 <pid>로 켜고 끔
+        watch_flag_file(self.profiler, self.profiling_directory, self.profiling_duration)  # profiling_directory/PROFILE 파일을 만들면 켜고 지우면 끔
+        if self.profiling == 1:
+            self.profiler.start(self.profiling_duration)
+        Thread(target=self.get_my_wallet_periodically, name="wallet").start()  # 주기적으로 지갑 불러오는 스레드 시작
+        Thread(target=self.orderbook_thread_function, name="websocket").start()  # 각 코인 호가 불러오는 스레드 시작
+        self.start_worker_processes()  # websocket_processes가 1 이상이면 나머지 연결은 작업 프로세스에서 받음
+        self.orderbook_ready.wait(2)  # 모든 코인의 호가를 받을 때까지 최대 2초 기다림
+        self.dirty_coins.mark_all()  # 기다리는 동안 받은 호가로 처음 한 번은 모든 코인을 계산함
+        Thread(target=self.calculate_profit, name="calculate_profit").start()  # 메인 스레드 시작
+        if self.snapshot_ttl > 0:
+            Thread(target=self.save_snapshot_periodically, name="snapshot").start()  # 재시작할 때 사용할 상태를 저장하는 스레드 시작
+        if self.tracer is not None:
+            if self.metrics_port > 0:
+                start_metrics_server(self.tracer, self.metrics_port)  # http://127.0.0.1:metrics_port/metrics
+            if self.latency_report_interval > 0:
+                Thread(target=self.report_latency_periodically, name="latency_report").start()  # 단계별 지연 시간을 주기적으로 출력하는 스레드 시작
+        print(self.orderbook_store.to_dict())
+        print("로딩까지 걸린 시간 : " + str("{:.3f}".format(time.time() - self.before)) + "초")
         print("현재시각 : " + str(datetime.now()))
         print("프로그램이 정상적으로 실행되었습니다.\n")
 
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+try:
+    import numpy as np  # 벡터 스캐너에만 필요함
+except ImportError:
+    np = None
+
+KRW = 0  # 배열의 첫 번째 축에서 KRW 시장의 번호
+BTC = 1  # 배열의 첫 번째 축에서 BTC 시장의 번호
+FEE = 0.996502749375  # 세 번의 거래 수수료를 모두 뺀 비율
+
+
+def is_available():
+    return np is not None
+
+
+class VectorScanner:
+    """ 모든 코인의 KRW, BTC 시장 최우선 호가를 2 x 코인 수 배열로 보고, 두 사이클의 수익률과 필터, 최적 주문 개수를 배열 연산 몇 번으로 한 번에 계산함
+        호가는 OrderbookStore.for_coins로 만든 저장소의 배열을 복사하지 않고 그대로 읽음 """
+
+    def __init__(self, store):
+        if np is None:
+            raise Exception("벡터 스캐너를 사용하려면 numpy를 설치해주세요")
+        self.coin_count = store.coin_count
+        self.index = np.arange(self.coin_count)
+        # [시장 번호, 코인 번호] -> 값
+        self.ask_price = self.get_view(store.ask_price)
+        self.bid_price = self.get_view(store.bid_price)
+        self.ask_size = self.get_view(store.ask_size)
+        self.bid_size = self.get_view(store.bid_size)
+        self.previous_ask_price = self.get_view(store.previous_ask_price)  # 상승세 확인에 사용할 예전 호가
+        self.previous_bid_price = self.get_view(store.previous_bid_price)
+        self.updated_at = self.get_view(store.updated_at)  # 마지막으로 호가를 받은 시각
+
+    """ 저장소의 앞쪽 (KRW 마켓들, BTC 마켓들)을 [시장 번호, 코인 번호] 모양의 뷰로 만듦 """
+    def get_view(self, buffer):
+        return np.frombuffer(buffer, dtype=np.float64)[0:2 * self.coin_count].reshape(2, self.coin_count)
+
+    """ 모든 코인의 두 사이클 수익률을 계산하고 필터를 통과한 코인을 수익률이 높은 순으로 [(코인 번호, 사이클 번호, 예상 수익률, 최적 거래 개수, 주문할 개수), ...] 형태로 반환함
+        market_ask_price, market_bid_price : KRW 시장의 BTC 매도, 매수 호가
+        cycles : 계산할 사이클 번호 (1번 : BTC 시장에서 사서 KRW 시장에 판매, 2번 : KRW 시장에서 사서 BTC 시장에 판매)
+        check_first_leg_ask : True면 첫 번째 거래 시장의 매도 호가가 올랐을 때도 거래하지 않음 (REST 버전의 상승세 조건)
+        max_age : 0보다 크면 now 기준으로 max_age초 안에 KRW, BTC 시장 호가를 모두 받은 코인만 거래함
+        coins : 계산할 코인 번호 (None이면 모든 코인) -> 호가가 바뀐 코인의 열만 꺼내서 계산함 """
+    def scan(self, market_ask_price, market_bid_price, profit, cycles=(1, 2), trade_if_rising=1, trade_if_low_orderbook_difference=1,
+             orderbook_difference_rate=1.0, check_first_leg_ask=False, volume_rate=0.7, minimum_by_bitcoin=0.0, maximum_by_bitcoin=float("inf"),
+             now=0.0, max_age=0.0, coins=None):
+        if coins is None:
+            coin_nums = self.index  # 계산하는 열 번호 -> 코인 번호
+            ap, bp, ask_size, bid_size = self.ask_price, self.bid_price, self.ask_size, self.bid_size
+            previous_ask_price, previous_bid_price, updated_at = self.previous_ask_price, self.previous_bid_price, self.updated_at
+        else:
+            coin_nums = np.fromiter(coins, dtype=np.intp)
+            ap, bp, ask_size, bid_size = self.ask_price[:, coin_nums], self.bid_price[:, coin_nums], self.ask_size[:, coin_nums], self.bid_size[:, coin_nums]
+            previous_ask_price, previous_bid_price, updated_at = self.previous_ask_price[:, coin_nums], self.previous_bid_price[:, coin_nums], self.updated_at[:, coin_nums]
+        index = np.arange(len(coin_nums))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            profit1 = bp[KRW] / ap[BTC] / market_ask_price * FEE
+            profit2 = bp[BTC] / ap[KRW] * market_bid_price * FEE
+            profit1 = np.where(np.isfinite(profit1), profit1, 0.0) if 1 in cycles else np.zeros(len(coin_nums))
+            profit2 = np.where(np.isfinite(profit2), profit2, 0.0) if 2 in cycles else np.zeros(len(coin_nums))
+
+            """ 몇 번째 사이클이 최대의 수익률을 낼 수 있는지 확인 """
+            is_cycle2 = profit2 > profit1
+            max_profit = np.where(is_cycle2, profit2, profit1)
+            mask = max_profit >= profit
+            mask &= updated_at.min(axis=0) > 0  # 연결이 끊겨서 expire 된 호가로는 거래하지 않음
+            if max_age > 0:  # 오래된 호가로는 거래하지 않음
+                mask &= (now - updated_at).max(axis=0) <= max_age
+            first_market = np.where(is_cycle2, KRW, BTC)  # 첫 번째 거래 시장
+            second_market = np.where(is_cycle2, BTC, KRW)  # 두 번째 거래 시장
+
+            """ 두 번째 거래에서 거래할 코인의 가격이 상승세가 아니면 거래하지 않음 """
+            if trade_if_rising == 1:
+                mask &= bp[second_market, index] > previous_bid_price[second_market, index]
+                if check_first_leg_ask:
+                    mask &= ap[first_market, index] <= previous_ask_price[first_market, index]
+
+            """ 매수 매도 호가의 차이가 많이 나면 거래를 안 함 """
+            if trade_if_low_orderbook_difference == 1:
+                mask &= ap[first_market, index] / bp[first_market, index] <= orderbook_difference_rate
+
+            """ 최적 주문 개수 (비트 기준) 와 실제 주문할 개수 """
+            optimal_volume = np.where(is_cycle2,
+                                      np.minimum(ask_size[KRW] * bp[BTC], bid_size[BTC] * bp[BTC]),
+                                      np.minimum(ap[BTC] * ask_size[BTC], bp[KRW] * bid_size[KRW] / market_ask_price))
+            order_volume = optimal_volume * volume_rate
+            mask &= order_volume >= minimum_by_bitcoin
+            order_volume = np.minimum(order_volume, maximum_by_bitcoin)
+
+        candidates = np.nonzero(mask)[0]
+        candidates = candidates[np.argsort(-max_profit[candidates])]
+        return [(int(coin_nums[i]), 2 if is_cycle2[i] else 1, float(max_profit[i]), float(optimal_volume[i]), float(order_volume[i])) for i in candidates]